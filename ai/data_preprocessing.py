@@ -1,74 +1,243 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import time
+
 import pandas as pd
 import chess
 import chess.pgn
 import numpy as np
-import os
+
+from ai.packed_positions import PLANES_BYTES, POSITION_DTYPE, make_records, pack_board, position_hashes, shard_paths
 
 # Paths
 DATA_PATH = os.path.join(os.path.dirname(__file__), "../games.csv")
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "processed_data")
+DEDUP_DIR_NAME = "deduplicated"  # Subdirectory of the output directory for deduplicated shards
+
+CHUNK_GAMES = 2000  # Games per chunk read from the CSV; each chunk becomes one output shard
+MIN_TURNS = 10
+SHARD_PATTERN = "shard_{:05d}.npy"
+META_FILE = "meta.json"
+DEDUP_BUCKETS = 64  # Hash partitions; each one is deduplicated in memory on its own
+DEDUP_READ_BLOCK = 1 << 18  # Records read at a time while partitioning
 
-# Ensure output directory exists
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+WINNER_LABELS = {"white": 1, "black": -1}  # Anything else is a draw
 
-def parse_moves_to_fen(moves):
+
+def replay_game(moves):
     """
-    Parse the moves column into FEN (Forsyth-Edwards Notation) board states.
+    Replay the moves column, stopping at the first move that does not parse.
     :param moves: A string of moves in algebraic notation.
-    :return: A list of FEN strings representing board states.
+    :return: Iterator over the chess.Board after each move. The same Board object is yielded
+             every time, updated in place; board.peek() is the move just played.
     """
     board = chess.Board()
-    fens = []
     for move in moves.split():
         try:
             board.push_san(move)
-            fens.append(board.fen())
         except ValueError:
             print(f"Skipping invalid move: {move}")
-            break
-    return fens
+            return
+        yield board
+
 
-def preprocess_data():
+def parse_moves_to_planes(moves):
     """
-    Preprocess the chess dataset and save training data.
+    Replay the moves column and pack every board state reached.
+    :param moves: A string of moves in algebraic notation.
+    :return: A list of packed positions (twelve bitboards each, see ai/packed_positions.py).
     """
-    print("Reading dataset...")
-    df = pd.read_csv(DATA_PATH)
+    return [pack_board(board) for board in replay_game(moves)]
+
+
+def shard_path(output_dir, index):
+    return os.path.join(output_dir, SHARD_PATTERN.format(index))
 
-    # Filter games with sufficient moves
-    print("Filtering games with at least 10 turns...")
-    df = df[df['turns'] >= 10]
 
-    # Prepare data
-    input_data = []
+def process_chunk(index, moves, winners, output_dir):
+    """
+    Replay one chunk of games and write its positions to a shard. Runs in a worker process.
+    :param index: Shard number.
+    :param moves: List of move strings, one per game.
+    :param winners: List of winner strings ('white', 'black' or anything else for a draw).
+    :param output_dir: Directory to write the shard to.
+    :return: (index, number of games, number of positions).
+    """
+    planes = []
     labels = []
+    for game_moves, winner in zip(moves, winners):
+        positions = parse_moves_to_planes(game_moves)
+        planes.extend(positions)
+        labels.extend([WINNER_LABELS.get(winner, 0)] * len(positions))
+
+    # Write to a temporary name first, so a shard file on disk is always complete
+    path = shard_path(output_dir, index)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        np.save(f, make_records(planes, labels))
+    os.replace(temp_path, path)
+    return index, len(moves), len(labels)
+
+
+def read_chunks(data_path, chunk_games, min_turns):
+    """
+    Stream the games CSV in chunks of chunk_games rows.
+    :return: Iterator of (shard index, moves list, winners list).
+    """
+    reader = pd.read_csv(data_path, usecols=["turns", "winner", "moves"], chunksize=chunk_games)
+    for index, chunk in enumerate(reader):
+        chunk = chunk[chunk["turns"] >= min_turns]
+        yield index, chunk["moves"].tolist(), chunk["winner"].tolist()
+
+
+def check_meta(output_dir, chunk_games, min_turns):
+    """
+    Record the chunking settings, or check that a resumed run uses the same ones. Shard numbers
+    are only comparable between runs that split the CSV the same way.
+    """
+    meta = {"chunk_games": chunk_games, "min_turns": min_turns}
+    path = os.path.join(output_dir, META_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f)
+        if existing != meta:
+            raise ValueError(f"{output_dir} was written with {existing}, not {meta}; use another output directory")
+    else:
+        with open(path, "w") as f:
+            json.dump(meta, f)
+
+
+def deduplicate_shards(input_dir, output_dir, buckets=DEDUP_BUCKETS):
+    """
+    Merge repeated positions into one record each, with the visit-weighted mean label and the
+    summed visit count.
 
-    print("Parsing moves and extracting FEN states...")
-    for _, row in df.iterrows():
-        fens = parse_moves_to_fen(row['moves'])
-        winner = row['winner']
+    Records are first partitioned into bucket files by position hash, so every copy of a position
+    lands in the same bucket. Each bucket is then deduplicated in memory on its own, keeping memory
+    use near the dataset size divided by the number of buckets.
+    :return: (positions read, unique positions written)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for path in shard_paths(output_dir):
+        os.remove(path)  # Output from an earlier run, possibly with a different bucket count
+
+    bucket_paths = [os.path.join(output_dir, f"bucket_{bucket:05d}.tmp") for bucket in range(buckets)]
+    bucket_files = [open(path, "wb") for path in bucket_paths]
+    total = 0
+    try:
+        for path in shard_paths(input_dir):
+            shard = np.load(path, mmap_mode="r")
+            for start in range(0, len(shard), DEDUP_READ_BLOCK):
+                records = np.array(shard[start:start + DEDUP_READ_BLOCK])
+                bucket_of = position_hashes(records["planes"]) % np.uint64(buckets)
+                order = np.argsort(bucket_of, kind="stable")
+                bounds = np.searchsorted(bucket_of[order], np.arange(buckets + 1, dtype=np.uint64))
+                for bucket in range(buckets):
+                    if bounds[bucket] < bounds[bucket + 1]:
+                        bucket_files[bucket].write(records[order[bounds[bucket]:bounds[bucket + 1]]].tobytes())
+                total += len(records)
+    finally:
+        for f in bucket_files:
+            f.close()
 
-        # Assign labels based on the winner
-        if winner == "white":
-            label = 1
-        elif winner == "black":
-            label = -1
-        else:  # Draw
-            label = 0
+    unique = 0
+    for bucket, bucket_path in enumerate(bucket_paths):
+        records = np.fromfile(bucket_path, dtype=POSITION_DTYPE)
+        os.remove(bucket_path)
+        # Group on the exact planes, so a hash collision can never merge two different positions
+        keys = np.ascontiguousarray(records["planes"]).view(np.dtype((np.void, PLANES_BYTES))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        visits = np.bincount(inverse, weights=records["visits"], minlength=len(first))
+        label_sums = np.bincount(inverse, weights=records["label"] * records["visits"], minlength=len(first))
+        merged = make_records(records["planes"][first], label_sums / visits, visits)
 
-        # Add each board state and corresponding label
-        for fen in fens:
-            input_data.append(fen)
-            labels.append(label)
+        path = shard_path(output_dir, bucket)
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, merged)
+        os.replace(path + ".tmp", path)
+        unique += len(merged)
+    return total, unique
 
-    print(f"Processed {len(input_data)} board states.")
 
-    # Save the processed data
-    print("Saving data...")
-    np.save(os.path.join(OUTPUT_DIR, "board_states.npy"), input_data)
-    np.save(os.path.join(OUTPUT_DIR, "labels.npy"), labels)
+def preprocess_data(data_path=DATA_PATH, output_dir=OUTPUT_DIR, workers=None, chunk_games=CHUNK_GAMES,
+                    min_turns=MIN_TURNS, dedup=True, dedup_buckets=DEDUP_BUCKETS):
+    """
+    Preprocess the chess dataset into shards of positions and labels.
+
+    The CSV is read chunk by chunk and each chunk is replayed in a process pool, so memory stays
+    bounded by a few chunks however large the dataset is. Shards already on disk are skipped,
+    so an interrupted run resumes where it stopped.
+    :param workers: Number of worker processes, default one per CPU.
+    :param dedup: Also write deduplicated shards to the deduplicated/ subdirectory, with one
+                  record per distinct position.
+    :param dedup_buckets: Number of hash partitions used by the deduplication pass.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    check_meta(output_dir, chunk_games, min_turns)
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2  # Chunks read ahead of the workers
+
+    print(f"Reading {data_path} in chunks of {chunk_games} games with {workers} workers...")
+    start_time = time.perf_counter()
+    games = positions = skipped = 0
+    pending = set()
+
+    def collect(done):
+        nonlocal games, positions
+        for future in done:
+            index, shard_games, shard_positions = future.result()
+            games += shard_games
+            positions += shard_positions
+            elapsed = time.perf_counter() - start_time
+            print(f"Shard {index}: {shard_games} games, {shard_positions} positions "
+                  f"(total {games} games, {positions} positions, {games / elapsed:.0f} games/s)")
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        for index, moves, winners in read_chunks(data_path, chunk_games, min_turns):
+            if os.path.exists(shard_path(output_dir, index)):
+                skipped += 1
+                continue
+            if len(pending) >= max_pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(process_chunk, index, moves, winners, output_dir))
+        collect(concurrent.futures.as_completed(pending))
+
+    if skipped:
+        print(f"Skipped {skipped} shards already on disk.")
+    print(f"Processed {positions} board states from {games} games in {time.perf_counter() - start_time:.1f}s.")
+
+    if dedup:
+        dedup_dir = os.path.join(output_dir, DEDUP_DIR_NAME)
+        print(f"Deduplicating positions into {dedup_dir}...")
+        total, unique = deduplicate_shards(output_dir, dedup_dir, dedup_buckets)
+        print(f"Kept {unique} distinct positions out of {total} ({unique / max(total, 1):.1%}).")
+    print("Data preprocessing completed. Files saved to:", output_dir)
+
+
+def load_shards(output_dir=OUTPUT_DIR):
+    """
+    Load every shard in output_dir.
+    :return: (planes, labels, visits) arrays concatenated in shard order: uint64 (N, 12) packed
+             planes, float32 (N,) labels and uint32 (N,) visit counts.
+    """
+    records = np.concatenate([np.load(path) for path in shard_paths(output_dir)] or
+                             [np.empty(0, dtype=POSITION_DTYPE)])
+    return records["planes"], records["label"], records["visits"]
 
-    print("Data preprocessing completed. Files saved to:", OUTPUT_DIR)
 
 if __name__ == "__main__":
-    preprocess_data()
+    parser = argparse.ArgumentParser(description="Replay games.csv into training shards.")
+    parser.add_argument("--input", default=DATA_PATH)
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-games", type=int, default=CHUNK_GAMES)
+    parser.add_argument("--min-turns", type=int, default=MIN_TURNS)
+    parser.add_argument("--no-dedup", action="store_true", help="Skip the deduplication pass")
+    parser.add_argument("--dedup-buckets", type=int, default=DEDUP_BUCKETS)
+    args = parser.parse_args()
+    preprocess_data(args.input, args.output, args.workers, args.chunk_games, args.min_turns,
+                    not args.no_dedup, args.dedup_buckets)
@@ -0,0 +1,61 @@
+"""
+LRU cache for model evaluations, keyed by position hash.
+"""
+from collections import OrderedDict
+
+
+class EvaluationCache:
+    def __init__(self, max_entries=100000):
+        """
+        :param max_entries: Number of scores kept before the least recently used one is evicted.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self._scores = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._scores)
+
+    def get(self, key):
+        """
+        Return the cached score for a position hash, or None.
+        """
+        score = self._scores.get(key)
+        if score is None:
+            self.misses += 1
+            return None
+        self._scores.move_to_end(key)
+        self.hits += 1
+        return score
+
+    def put(self, key, score):
+        self._scores[key] = score
+        self._scores.move_to_end(key)
+        if len(self._scores) > self.max_entries:
+            self._scores.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._scores.clear()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """
+        :return: Dict with size, hits, misses, evictions and hit_rate.
+        """
+        return {
+            "size": len(self._scores),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+        }
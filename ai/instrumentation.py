@@ -0,0 +1,216 @@
+"""
+Engine instrumentation: counters and timers for move generation, legality checks, encoding,
+evaluation, model inference and search, collected into one report per engine move.
+
+Instrumentation is off by default and then costs nothing: enable() wraps the measured methods
+on their classes with timing wrappers and disable() puts the original functions back, so the
+hot paths carry no flag checks while it is off. Timers are inclusive, e.g. the 'legality' time
+of either move generator (Board.is_legal_move for 'pieces', the pin and king-safety checks of
+BitboardPosition for 'bitboard') is also part of its 'movegen' time.
+
+Every Search.run() and Board.choose_ai_move() call made while enabled (make_ai_move goes through
+choose_ai_move) appends a report to instrumentation.reports, which export_json() writes out:
+
+    from ai import instrumentation
+    instrumentation.enable()
+    board.make_ai_move(depth=3)
+    instrumentation.export_json("profile.json")
+    instrumentation.disable()
+
+Counts are shared by every thread in the process, so profile one search at a time.
+"""
+import functools
+import json
+import time
+
+# (module, class, method, timer name)
+INSTRUMENTED_METHODS = [
+    ("logic.board", "Board", "legal_moves", "movegen"),
+    ("logic.board", "Board", "is_legal_move", "legality"),
+    ("logic.bitboard", "BitboardPosition", "pinned", "legality"),
+    ("logic.bitboard", "BitboardPosition", "is_legal", "legality"),
+    ("logic.board", "Board", "is_in_check", "check_detection"),
+    ("logic.board", "Board", "to_matrix", "encoding"),
+    ("logic.board", "Board", "candidate_matrices", "encoding"),
+    ("logic.board", "Board", "to_bitboards", "encoding"),
+    ("logic.board", "Board", "tablebase_probe", "tablebase"),
+    ("ai.model_loader", "ModelLoader", "predict", "inference"),
+    ("ai.search", "MaterialEvaluator", "evaluate_moves", "evaluation"),
+    ("ai.search", "ModelEvaluator", "evaluate_moves", "evaluation"),
+]
+
+timers = {}  # timer name -> [calls, seconds]
+counters = {}  # counter name -> count
+reports = []  # One dict per instrumented engine move
+
+_originals = []  # (class, method name, original function) while enabled
+_move_depth = 0  # Nesting of move-level calls: choose_ai_move runs a Search inside
+
+
+def is_enabled():
+    return bool(_originals)
+
+
+def count(name, amount=1):
+    """
+    Add to a counter. Meant for code that only runs while profiling; ordinary engine code is
+    measured through INSTRUMENTED_METHODS instead.
+    """
+    counters[name] = counters.get(name, 0) + amount
+
+
+def reset():
+    """
+    Zero the counters and timers of the move being measured.
+    """
+    timers.clear()
+    counters.clear()
+
+
+def _timed(function, name):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            entry = timers.get(name)
+            if entry is None:
+                entry = timers[name] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += time.perf_counter() - start
+    return wrapper
+
+
+def _format_move(move):
+    from logic.bitboard import square_from_position, square_name
+
+    if move is None:
+        return None
+    text = square_name(square_from_position(move[0])) + square_name(square_from_position(move[1]))
+    return text + move[2] if len(move) > 2 else text
+
+
+def _measure_move(function, kind):
+    """
+    Wrap a move-level entry point so each outermost call produces one report.
+    """
+    @functools.wraps(function)
+    def wrapper(self, *args, **kwargs):
+        global _move_depth
+        if _move_depth:
+            # A search run by choose_ai_move: its nodes belong to the enclosing move's report
+            result = function(self, *args, **kwargs)
+            if kind == "search":
+                count("search.nodes", result.nodes)
+                count("search.depth", result.depth)
+            return result
+        board = self.board if kind == "search" else self
+        cache = board.eval_cache
+        cache_before = (cache.hits, cache.misses) if cache is not None else (0, 0)
+        fen = board.get_fen()
+        reset()
+        _move_depth += 1
+        start = time.perf_counter()
+        try:
+            result = function(self, *args, **kwargs)
+        finally:
+            _move_depth -= 1
+        elapsed = time.perf_counter() - start
+
+        if kind == "search":
+            move = result.best_move
+            count("search.nodes", result.nodes)
+            count("search.depth", result.depth)
+        else:
+            move = result
+        if cache is not None:
+            count("eval_cache.hits", cache.hits - cache_before[0])
+            count("eval_cache.misses", cache.misses - cache_before[1])
+        reports.append(report(kind, fen, move, elapsed))
+        return result
+    return wrapper
+
+
+def report(kind, fen, move, elapsed):
+    """
+    Snapshot the current counters and timers as a JSON-serializable dict.
+    :param kind: 'search' for Search.run, 'ai_move' for Board.choose_ai_move.
+    :param fen: Position the move was chosen in.
+    :param move: The chosen move tuple, or None.
+    :param elapsed: Wall-clock seconds of the whole move.
+    """
+    nodes = counters.get("search.nodes", 0)
+    return {
+        "kind": kind,
+        "fen": fen,
+        "move": _format_move(move),
+        "elapsed_ms": round(elapsed * 1000, 3),
+        "nps": round(nodes / elapsed) if nodes and elapsed > 0 else None,
+        "timers": {
+            name: {"calls": calls, "total_ms": round(seconds * 1000, 3),
+                   "mean_us": round(seconds * 1e6 / calls, 3) if calls else 0.0,
+                   "share": round(seconds / elapsed, 4) if elapsed > 0 else 0.0}
+            for name, (calls, seconds) in sorted(timers.items())
+        },
+        "counters": dict(sorted(counters.items())),
+    }
+
+
+def enable():
+    """
+    Start measuring. Wraps the methods in INSTRUMENTED_METHODS and the move-level entry points.
+    """
+    import importlib
+
+    if _originals:
+        return
+    targets = [(module, cls, method, _timed, name) for module, cls, method, name in INSTRUMENTED_METHODS]
+    targets.append(("ai.search", "Search", "run", _measure_move, "search"))
+    targets.append(("logic.board", "Board", "choose_ai_move", _measure_move, "ai_move"))
+    for module, cls, method, wrap, name in targets:
+        owner = getattr(importlib.import_module(module), cls)
+        original = owner.__dict__[method]
+        _originals.append((owner, method, original))
+        setattr(owner, method, wrap(original, name))
+
+
+def disable():
+    """
+    Stop measuring and restore the original methods. Collected reports are kept.
+    """
+    while _originals:
+        owner, method, original = _originals.pop()
+        setattr(owner, method, original)
+
+
+def clear_reports():
+    reports.clear()
+
+
+def summary(move_reports=None):
+    """
+    Add up the timers and counters of several move reports.
+    :return: Dict with the move count, total milliseconds and per-timer calls and milliseconds.
+    """
+    move_reports = reports if move_reports is None else move_reports
+    total = {"moves": len(move_reports), "elapsed_ms": 0.0, "timers": {}, "counters": {}}
+    for move_report in move_reports:
+        total["elapsed_ms"] += move_report["elapsed_ms"]
+        for name, timer in move_report["timers"].items():
+            entry = total["timers"].setdefault(name, {"calls": 0, "total_ms": 0.0})
+            entry["calls"] += timer["calls"]
+            entry["total_ms"] += timer["total_ms"]
+        for name, value in move_report["counters"].items():
+            total["counters"][name] = total["counters"].get(name, 0) + value
+    return total
+
+
+def export_json(path, move_reports=None):
+    """
+    Write the move reports and their summary to a JSON file.
+    """
+    move_reports = reports if move_reports is None else move_reports
+    with open(path, "w") as f:
+        json.dump({"moves": move_reports, "summary": summary(move_reports)}, f, indent=2)
+    print(f"Wrote {len(move_reports)} move reports to {path}")
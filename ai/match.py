@@ -0,0 +1,182 @@
+"""
+Headless engine-vs-engine matches with an Elo estimate.
+
+Each engine is a comma-separated list of key=value settings:
+    model     model file (default ai/chess_model.h5; .tflite files work too)
+    backend   'keras' or 'numpy' for .h5 models (default numpy)
+    depth     search depth; 1 plays the best-scored reply (default 1)
+    movetime  seconds per move (default none)
+    nodes     nodes per move (default none)
+
+Games are played in pairs from the same random opening with colors swapped, concurrently in a
+process pool. A move that overruns movetime by more than the allowed margin loses on time.
+
+Run from the project root:
+    python -m ai.match --games 40 --engine1 depth=1 --engine2 depth=3,movetime=0.5
+    python -m ai.match --games 100 --engine1 model=ai/new_model.h5 --engine2 model=ai/chess_model.h5
+"""
+import argparse
+import concurrent.futures
+import math
+import os
+import random
+import time
+
+ENGINE_DEFAULTS = {"model": None, "backend": "numpy", "depth": 1, "movetime": None, "nodes": None}
+ENGINE_TYPES = {"model": str, "backend": str, "depth": int, "movetime": float, "nodes": int}
+OPENING_PLIES = 4  # Random plies played before the engines take over, shared by each pair of games
+MAX_PLIES = 400  # Games still running after this many plies are scored as draws
+TIME_MARGIN = 0.5  # Seconds a move may exceed movetime before it loses on time
+Z_95 = 1.96
+
+_transposition_tables = {}  # Per worker process, one per engine
+
+
+def parse_engine(spec):
+    """
+    Parse 'key=value,key=value' into an engine settings dict.
+    """
+    engine = dict(ENGINE_DEFAULTS)
+    for item in filter(None, spec.split(",")):
+        key, _, value = item.partition("=")
+        if key not in ENGINE_TYPES:
+            raise ValueError(f"Unknown engine setting: {key}")
+        engine[key] = ENGINE_TYPES[key](value)
+    return engine
+
+
+def describe_engine(engine):
+    return ",".join(f"{key}={value}" for key, value in engine.items() if value != ENGINE_DEFAULTS[key]) or "default"
+
+
+def select_move(board, engine, slot):
+    """
+    Search the position with an engine's settings.
+    :return: (move, seconds used)
+    """
+    from ai.search import Search
+    from ai.transposition import TranspositionTable
+
+    table = _transposition_tables.get(slot)
+    if table is None:
+        table = _transposition_tables[slot] = TranspositionTable()
+    start = time.perf_counter()
+    search = Search(board, max_depth=engine["depth"], time_limit=engine["movetime"],
+                    node_limit=engine["nodes"], transposition_table=table)
+    move = search.run().best_move
+    return move, time.perf_counter() - start
+
+
+def play_match_game(game_index, engines, white_slot, opening_seed, max_plies=MAX_PLIES, opening_plies=OPENING_PLIES):
+    """
+    Play one game. Runs in a worker process.
+    :param engines: (engine 1, engine 2) settings.
+    :param white_slot: Index into engines of the engine playing White.
+    :return: (game index, white slot, result, reason, plies)
+    """
+    from logic.board import Board
+
+    # One board per engine, each with its own model and evaluation cache, kept in step by pushing
+    # every move to both
+    boards = [Board(model_path=engine["model"], model_backend=engine["backend"]) for engine in engines]
+    for table in _transposition_tables.values():
+        table.clear()
+
+    rng = random.Random(opening_seed)
+    for _ in range(opening_plies):
+        moves = boards[0].legal_moves(boards[0].current_turn)
+        if not moves:
+            break
+        move = rng.choice(moves)
+        for board in boards:
+            board.push(move)
+
+    for ply in range(max_plies):
+        slot = white_slot if boards[0].current_turn == "white" else 1 - white_slot
+        board, engine = boards[slot], engines[slot]
+        moves = board.legal_moves(board.current_turn)
+        over = board.outcome(moves)
+        if over:
+            return game_index, white_slot, over[0], over[1], ply
+        move, seconds = select_move(board, engine, slot)
+        if engine["movetime"] is not None and seconds > engine["movetime"] + TIME_MARGIN:
+            result = "0-1" if board.current_turn == "white" else "1-0"
+            return game_index, white_slot, result, f"time forfeit ({seconds:.2f}s)", ply
+        for board in boards:
+            board.push(move)
+    return game_index, white_slot, "1/2-1/2", "max plies", max_plies
+
+
+def elo_difference(wins, draws, losses):
+    """
+    Elo difference implied by a match score, with a 95% confidence interval.
+    :return: (elo, lower, upper). Infinite values mean a perfect or zero score.
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, -math.inf, math.inf
+    score = (wins + draws / 2) / games
+    # Standard error of the mean per-game score (1, 0.5 or 0)
+    variance = (wins + draws / 4) / games - score * score
+    margin = Z_95 * math.sqrt(max(variance, 0) / games)
+
+    def to_elo(p):
+        if p <= 0:
+            return -math.inf
+        if p >= 1:
+            return math.inf
+        return -400 * math.log10(1 / p - 1)
+
+    return to_elo(score), to_elo(score - margin), to_elo(score + margin)
+
+
+def run_match(engine1, engine2, games, workers=None, seed=0, max_plies=MAX_PLIES, opening_plies=OPENING_PLIES):
+    """
+    Play games between two engines and print results from engine 1's point of view.
+    :return: (wins, draws, losses) for engine 1.
+    """
+    workers = workers or os.cpu_count() or 1
+    engines = (engine1, engine2)
+    print(f"Engine 1: {describe_engine(engine1)}")
+    print(f"Engine 2: {describe_engine(engine2)}")
+    print(f"Playing {games} games with {workers} workers...")
+
+    wins = draws = losses = 0
+    start_time = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(play_match_game, index, engines, index % 2, seed * 1000003 + index // 2, max_plies,
+                        opening_plies)
+            for index in range(games)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            index, white_slot, result, reason, plies = future.result()
+            if result == "1/2-1/2":
+                draws += 1
+            elif (result == "1-0") == (white_slot == 0):
+                wins += 1
+            else:
+                losses += 1
+            white, black = ("engine 1", "engine 2") if white_slot == 0 else ("engine 2", "engine 1")
+            print(f"Game {index + 1}: {white} vs {black}: {result} by {reason} after {plies} plies "
+                  f"[+{wins} ={draws} -{losses}]")
+
+    elo, lower, upper = elo_difference(wins, draws, losses)
+    print(f"\n{games} games in {time.perf_counter() - start_time:.1f}s")
+    print(f"Engine 1: +{wins} ={draws} -{losses}, score {(wins + draws / 2) / max(games, 1):.1%}")
+    print(f"Elo difference: {elo:+.0f} (95% CI {lower:+.0f} to {upper:+.0f})")
+    return wins, draws, losses
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine1", default="", help="Settings of the engine being measured")
+    parser.add_argument("--engine2", default="", help="Settings of the reference engine")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES)
+    parser.add_argument("--opening-plies", type=int, default=OPENING_PLIES)
+    args = parser.parse_args()
+    run_match(parse_engine(args.engine1), parse_engine(args.engine2), args.games, args.workers, args.seed,
+              args.max_plies, args.opening_plies)
@@ -0,0 +1,234 @@
+"""
+Lightweight inference for the evaluation model, without going through tf.keras.
+
+convert_model turns chess_model.h5 into a .tflite flatbuffer, optionally with int8 quantization.
+TFLiteEvaluator loads it with the smallest interpreter available: the standalone LiteRT
+(ai_edge_litert) or tflite_runtime packages, which do not need TensorFlow, falling back to
+tf.lite when only full TensorFlow is installed. XNNPACK is the default CPU delegate in all three.
+
+NumpyEvaluator reads the weights straight out of chess_model.h5 with h5py and runs the forward
+pass in NumPy, which has the least per-call overhead for the small batches a search scores.
+Both evaluators expose evaluate_batch(planes).
+
+Convert from the project root:
+    python -m ai.model_inference
+    python -m ai.model_inference --quantize
+"""
+import argparse
+import os
+import threading
+
+import numpy as np
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "chess_model.h5")
+TFLITE_PATH = os.path.join(os.path.dirname(__file__), "chess_model.tflite")
+TFLITE_INT8_PATH = os.path.join(os.path.dirname(__file__), "chess_model_int8.tflite")
+DATA_DIR = os.path.join(os.path.dirname(__file__), "processed_data")
+CALIBRATION_POSITIONS = 1000  # Positions used to calibrate int8 activation ranges
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "tanh": lambda x: np.tanh(x, out=x),
+    "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+}
+
+
+def load_interpreter_class():
+    """
+    :return: The Interpreter class of the lightest TFLite runtime installed.
+    """
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+def calibration_positions(data_dir=DATA_DIR, count=CALIBRATION_POSITIONS, seed=0):
+    """
+    Model inputs for int8 calibration: preprocessed positions when shards exist, otherwise
+    positions from random play.
+    :return: float32 array of shape (count, 8, 8, 12).
+    """
+    from ai.packed_positions import pack_board, shard_paths, unpack_planes
+
+    if os.path.isdir(data_dir) and shard_paths(data_dir):
+        planes = np.concatenate([np.load(path, mmap_mode="r")["planes"] for path in shard_paths(data_dir)])
+        rng = np.random.default_rng(seed)
+        return unpack_planes(planes[rng.choice(len(planes), min(count, len(planes)), replace=False)])
+
+    import random
+    import chess
+    rng = random.Random(seed)
+    board = chess.Board()
+    planes = []
+    while len(planes) < count:
+        moves = list(board.legal_moves)
+        if not moves or board.ply() > 120:
+            board = chess.Board()
+            continue
+        board.push(rng.choice(moves))
+        planes.append(pack_board(board))
+    return unpack_planes(np.array(planes, dtype=np.uint64))
+
+
+def convert_model(model_path=MODEL_PATH, output_path=None, quantize=False, data_dir=DATA_DIR):
+    """
+    Convert the Keras model to TFLite.
+    :param quantize: Quantize weights and activations to int8, calibrated on sample positions.
+                     Input and output stay float32, so callers do not change.
+    :return: Path of the written .tflite file.
+    """
+    import tensorflow as tf
+
+    if output_path is None:
+        output_path = TFLITE_INT8_PATH if quantize else TFLITE_PATH
+    model = tf.keras.models.load_model(model_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize:
+        samples = calibration_positions(data_dir)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([sample[None, ...]] for sample in samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+    print(f"Saved {'int8 ' if quantize else ''}TFLite model to {output_path} ({os.path.getsize(output_path)} bytes)")
+    return output_path
+
+
+class TFLiteEvaluator:
+    def __init__(self, path=TFLITE_PATH, num_threads=None):
+        """
+        :param path: .tflite file written by convert_model.
+        :param num_threads: Interpreter threads, default chosen by the runtime.
+        """
+        Interpreter = load_interpreter_class()
+        self.path = path
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self._input = self.interpreter.get_input_details()[0]["index"]
+        self._output = self.interpreter.get_output_details()[0]["index"]
+        self._batch_size = None
+        self._lock = threading.Lock()  # An interpreter must not be invoked from two threads at once
+
+    def evaluate_batch(self, planes):
+        """
+        Score a batch of positions.
+        :param planes: Array of shape (N, 8, 8, 12).
+        :return: A 1D float32 array of N scores from White's point of view.
+        """
+        planes = np.ascontiguousarray(planes, dtype=np.float32)
+        with self._lock:
+            if len(planes) != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input, planes.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = len(planes)
+            self.interpreter.set_tensor(self._input, planes)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output)[:, 0].copy()
+
+    def predict(self, batch, **kwargs):
+        """
+        Keras-style predict returning shape (N, 1), for code written against the Keras model.
+        """
+        return self.evaluate_batch(batch)[:, None]
+
+
+class NumpyEvaluator:
+    def __init__(self, path=MODEL_PATH):
+        """
+        Load the layer weights of a Keras Sequential model saved as .h5. Supports the layers
+        ai/model_training.py uses: Conv2D (stride 1, 'valid' or 'same' padding), Flatten and Dense.
+        :param path: Keras .h5 file.
+        """
+        import json
+        import h5py
+
+        self.path = path
+        self.layers = []  # (kind, weights, activation, padding)
+        with h5py.File(path, "r") as f:
+            config = json.loads(f.attrs["model_config"])
+            weights_group = f["model_weights"] if "model_weights" in f else f
+            for layer in config["config"]["layers"]:
+                kind, layer_config = layer["class_name"], layer["config"]
+                if kind in ("InputLayer", "Dropout"):
+                    continue
+                if kind == "Flatten":
+                    self.layers.append(("flatten", None, "linear", None))
+                    continue
+                if kind not in ("Conv2D", "Dense"):
+                    raise ValueError(f"NumpyEvaluator does not support {kind} layers")
+                group = weights_group[layer_config["name"]]
+                names = [name.decode() if isinstance(name, bytes) else name for name in group.attrs["weight_names"]]
+                values = {name.rsplit("/", 1)[-1]: np.asarray(group[name], dtype=np.float32) for name in names}
+                if kind == "Conv2D":
+                    if tuple(layer_config.get("strides", (1, 1))) != (1, 1) or \
+                            tuple(layer_config.get("dilation_rate", (1, 1))) != (1, 1):
+                        raise ValueError("NumpyEvaluator only supports stride 1, undilated convolutions")
+                    kernel = values["kernel"]
+                    kh, kw, channels, filters = kernel.shape
+                    weights = (kernel.reshape(kh * kw * channels, filters), values.get("bias"), kh, kw)
+                    self.layers.append(("conv", weights, layer_config["activation"], layer_config["padding"]))
+                else:
+                    self.layers.append(("dense", (values["kernel"], values.get("bias")),
+                                        layer_config["activation"], None))
+
+    @staticmethod
+    def _conv(x, weights, padding):
+        """
+        Convolution as im2col + one matmul: the kh x kw patches around every output square are
+        laid side by side (in the kernel's (row, col, channel) order) and multiplied by the
+        flattened kernel.
+        """
+        kernel, bias, kh, kw = weights
+        if padding == "same":
+            x = np.pad(x, ((0, 0), ((kh - 1) // 2, kh // 2), ((kw - 1) // 2, kw // 2), (0, 0)))
+        n, height, width, _ = x.shape
+        out_h, out_w = height - kh + 1, width - kw + 1
+        patches = np.concatenate(
+            [x[:, i:i + out_h, j:j + out_w, :] for i in range(kh) for j in range(kw)], axis=-1,
+        )
+        y = patches.reshape(n * out_h * out_w, -1) @ kernel
+        if bias is not None:
+            y += bias
+        return y.reshape(n, out_h, out_w, -1)
+
+    def evaluate_batch(self, planes):
+        """
+        Score a batch of positions.
+        :param planes: Array of shape (N, 8, 8, 12).
+        :return: A 1D float32 array of N scores from White's point of view.
+        """
+        x = np.asarray(planes, dtype=np.float32)
+        for kind, weights, activation, padding in self.layers:
+            if kind == "conv":
+                x = self._conv(x, weights, padding)
+            elif kind == "flatten":
+                x = x.reshape(len(x), -1)
+            else:
+                kernel, bias = weights
+                x = x @ kernel
+                if bias is not None:
+                    x += bias
+            x = ACTIVATIONS[activation](x)
+        return x[:, 0]
+
+    def predict(self, batch, **kwargs):
+        """
+        Keras-style predict returning shape (N, 1), for code written against the Keras model.
+        """
+        return self.evaluate_batch(batch)[:, None]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert chess_model.h5 to TFLite.")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--quantize", action="store_true", help="Quantize to int8")
+    parser.add_argument("--data", default=DATA_DIR, help="Shards to draw int8 calibration positions from")
+    args = parser.parse_args()
+    convert_model(args.model, args.output, args.quantize, args.data)
@@ -0,0 +1,117 @@
+"""
+Shared, lazily loaded Keras model.
+
+TensorFlow is only imported here, on a background thread, the first time a model is requested.
+Every Board in the process shares the same loader, so the model is deserialized once.
+A .tflite path is loaded with ai.model_inference.TFLiteEvaluator instead of Keras, so a host with
+only a TFLite runtime can play without TensorFlow. The 'numpy' backend runs an .h5 model through
+ai.model_inference.NumpyEvaluator, without TensorFlow at all.
+"""
+import logging
+import os
+import threading
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(__file__), "chess_model.h5")
+BACKENDS = ("keras", "numpy")
+
+logger = logging.getLogger(__name__)
+
+_loaders = {}
+_loaders_lock = threading.Lock()
+
+
+class ModelLoader:
+    def __init__(self, path=DEFAULT_MODEL_PATH, backend="keras"):
+        """
+        :param path: Path to the saved Keras model, or a .tflite file from ai/model_inference.py.
+        :param backend: 'keras' to load an .h5 file with tf.keras, 'numpy' to run its weights with
+                        NumpyEvaluator. Ignored for .tflite files.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown model backend: {backend}")
+        self.path = path
+        self.backend = backend
+        self.model = None
+        self.error = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._predict_fn = None
+
+    @property
+    def ready(self):
+        """
+        True once loading has finished, whether or not it succeeded.
+        """
+        return self._loaded.is_set()
+
+    def start(self):
+        """
+        Begin loading in a background thread. Does nothing if loading has already started.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._load, name="model-loader", daemon=True)
+                self._thread.start()
+        return self
+
+    def _load(self):
+        try:
+            if self.path.endswith(".tflite"):
+                from ai.model_inference import TFLiteEvaluator
+                self.model = TFLiteEvaluator(self.path)
+            elif self.backend == "numpy":
+                from ai.model_inference import NumpyEvaluator
+                self.model = NumpyEvaluator(self.path)
+            else:
+                import tensorflow as tf
+                self.model = tf.keras.models.load_model(self.path)
+            logger.info("Model loaded successfully.")
+        except Exception as e:
+            self.error = e
+            logger.error("Error loading model: %s", e)
+        finally:
+            self._loaded.set()
+
+    def get(self, timeout=None):
+        """
+        Return the model, starting the load if needed and waiting for it to finish.
+        :param timeout: Seconds to wait, or None to wait until loading is done.
+        :return: The Keras model, or None if it failed to load or is still loading after timeout.
+        """
+        self.start()
+        self._loaded.wait(timeout)
+        return self.model
+
+    def predict(self, batch):
+        """
+        Run the model on a batch of board matrices through a compiled inference function.
+        :param batch: Array of shape (N, 8, 8, 12).
+        :return: A 1D array of N scores.
+        """
+        model = self.get()
+        if hasattr(model, "evaluate_batch"):
+            return model.evaluate_batch(batch)
+
+        import tensorflow as tf
+        if self._predict_fn is None:
+            with self._lock:
+                if self._predict_fn is None:
+                    self._predict_fn = tf.function(
+                        lambda x: model(x, training=False),
+                        input_signature=[tf.TensorSpec(shape=(None, 8, 8, 12), dtype=tf.float32)],
+                    )
+        batch = tf.convert_to_tensor(batch, dtype=tf.float32)
+        return self._predict_fn(batch).numpy()[:, 0]
+
+
+def get_model_loader(path=DEFAULT_MODEL_PATH, backend="keras"):
+    """
+    Return the process-wide loader for a model file and backend, creating it on first use.
+    """
+    key = (os.path.abspath(path), backend)
+    with _loaders_lock:
+        loader = _loaders.get(key)
+        if loader is None:
+            loader = _loaders[key] = ModelLoader(key[0], backend)
+        return loader
@@ -1,65 +1,75 @@
-import numpy as np
+import argparse
 import tensorflow as tf
-import chess
-import chess.engine
 import os
 
+from ai.training_data import PositionShards, SAMPLE_WEIGHTS, SHUFFLE_BUFFER
+
 # Paths
-DATA_DIR = os.path.join(os.path.dirname(__file__), "processed_data")
+DATA_DIR = os.path.join(os.path.dirname(__file__), "processed_data", "deduplicated")
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "chess_model.h5")
 
-# Load the preprocessed data
-board_states = np.load(os.path.join(DATA_DIR, "board_states.npy"))
-labels = np.load(os.path.join(DATA_DIR, "labels.npy"))
+BATCH_SIZE = 64
+EPOCHS = 10
+VALIDATION_SPLIT = 0.1
+SAMPLE_WEIGHT = "log"  # Weight deduplicated positions by 1 + log(visits)
+
 
-def fen_to_matrix(fen):
+def build_model():
     """
-    Convert FEN string into an 8x8x12 matrix representation.
-    :param fen: FEN string.
-    :return: A 3D NumPy array representing the board state.
+    Define the neural network model.
     """
-    board = chess.Board(fen)
-    matrix = np.zeros((8, 8, 12), dtype=int)
-
-    piece_to_channel = {
-        'P': 0, 'N': 1, 'B': 2, 'R': 3, 'Q': 4, 'K': 5,  # White pieces
-        'p': 6, 'n': 7, 'b': 8, 'r': 9, 'q': 10, 'k': 11  # Black pieces
-    }
-
-    for square in chess.SQUARES:
-        piece = board.piece_at(square)
-        if piece:
-            row, col = divmod(square, 8)
-            matrix[row, col, piece_to_channel[piece.symbol()]] = 1
+    model = tf.keras.Sequential([
+        tf.keras.layers.Conv2D(32, (3, 3), activation='relu', input_shape=(8, 8, 12)),
+        tf.keras.layers.Conv2D(32, (3, 3), activation='relu'),
+        tf.keras.layers.Flatten(),
+        tf.keras.layers.Dense(64, activation='relu'),
+        tf.keras.layers.Dense(1, activation='tanh')
+    ])
+    model.compile(optimizer='adam', loss='mean_squared_error', metrics=['mae'])
+    return model
 
-    return matrix
 
-# Convert FEN strings to matrices
-print("Converting FEN strings to matrices...")
-X = np.array([fen_to_matrix(fen) for fen in board_states])
-y = np.array(labels)
-
-# Normalize labels to -1, 0, 1
-y = y.astype(float)
+def train(data_dir=DATA_DIR, model_path=MODEL_PATH, epochs=EPOCHS, batch_size=BATCH_SIZE,
+          validation_split=VALIDATION_SPLIT, shuffle_buffer=SHUFFLE_BUFFER, sample_weight=SAMPLE_WEIGHT):
+    """
+    Train the model on the memory-mapped position shards in data_dir and save it to model_path.
+    Positions are streamed from disk, so the dataset does not have to fit in memory.
+    :param sample_weight: How visit counts weight the loss: 'none', 'visits', 'sqrt' or 'log'.
+    """
+    # Memory-map the preprocessed shards: packed uint64 planes, 104 bytes per position
+    shards = PositionShards(data_dir)
+    train_blocks, validation_blocks = shards.split(validation_split)
+    print(f"Streaming {len(shards)} positions from {len(shards.paths)} shards "
+          f"({len(train_blocks)} training and {len(validation_blocks)} validation blocks)...")
+    train_dataset = shards.dataset(train_blocks, batch_size, shuffle=True, shuffle_buffer=shuffle_buffer,
+                                   sample_weight=sample_weight)
+    validation_dataset = None
+    if validation_blocks:
+        validation_dataset = shards.dataset(validation_blocks, batch_size, shuffle=False, sample_weight=sample_weight)
 
-# Define the model
-print("Building the neural network model...")
-model = tf.keras.Sequential([
-    tf.keras.layers.Conv2D(32, (3, 3), activation='relu', input_shape=(8, 8, 12)),
-    tf.keras.layers.Conv2D(32, (3, 3), activation='relu'),
-    tf.keras.layers.Flatten(),
-    tf.keras.layers.Dense(64, activation='relu'),
-    tf.keras.layers.Dense(1, activation='tanh')
-])
+    print("Building the neural network model...")
+    model = build_model()
 
+    # Train the model
+    print("Training the model...")
+    model.fit(train_dataset, validation_data=validation_dataset, epochs=epochs)
 
-model.compile(optimizer='adam', loss='mean_squared_error', metrics=['mae'])
+    # Save the model
+    print("Saving the trained model...")
+    model.save(model_path)
+    print("Model saved to:", model_path)
+    return model
 
-# Train the model
-print("Training the model...")
-model.fit(X, y, validation_split=0.1, epochs=10, batch_size=64)
 
-# Save the model
-print("Saving the trained model...")
-model.save(MODEL_PATH)
-print("Model saved to:", MODEL_PATH)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the position evaluation model.")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--output", default=MODEL_PATH)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--validation-split", type=float, default=VALIDATION_SPLIT)
+    parser.add_argument("--shuffle-buffer", type=int, default=SHUFFLE_BUFFER)
+    parser.add_argument("--sample-weight", choices=sorted(SAMPLE_WEIGHTS), default=SAMPLE_WEIGHT)
+    args = parser.parse_args()
+    train(args.data, args.output, args.epochs, args.batch_size, args.validation_split, args.shuffle_buffer,
+          args.sample_weight)
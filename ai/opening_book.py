@@ -0,0 +1,182 @@
+"""
+Opening book built from games.csv.
+
+build_book replays the first plies of every game with the replay logic of
+ai/data_preprocessing.py and counts, for each position and each move played in it, how many
+games played the move and how they ended. Positions are keyed by the Zobrist hash Board keeps
+up to date (logic/zobrist.py), so a lookup needs no encoding at all.
+
+The book is a .npy file of BOOK_DTYPE records sorted by key (then by games, most played first).
+OpeningBook memory-maps it: a lookup is a binary search that touches a few pages, and an
+unused book costs no memory.
+
+Build from the project root:
+    python -m ai.opening_book
+    python -m ai.opening_book --plies 20 --min-games 3
+"""
+import argparse
+import os
+import threading
+from collections import defaultdict, namedtuple
+
+import numpy as np
+
+from ai.transposition import decode_move, encode_move
+from logic.bitboard import (
+    BLACK_KINGSIDE, BLACK_QUEENSIDE, PIECE_SYMBOLS, WHITE_KINGSIDE, WHITE_QUEENSIDE, position_from_square,
+)
+from logic.zobrist import compute_hash
+
+BOOK_PATH = os.path.join(os.path.dirname(__file__), "opening_book.npy")
+BOOK_DTYPE = np.dtype([
+    ("key", "<u8"), ("move", "<u2"), ("games", "<u4"), ("white_wins", "<u4"), ("draws", "<u4"), ("black_wins", "<u4"),
+])
+BOOK_PLIES = 16  # Plies of each game that go into the book
+MIN_GAMES = 2  # Moves played in fewer games than this are left out
+
+BookEntry = namedtuple("BookEntry", ["move", "games", "white_wins", "draws", "black_wins"])
+
+_books = {}
+_books_lock = threading.Lock()
+
+
+def position_key(board):
+    """
+    The Board.zobrist_hash of a python-chess board's position.
+    """
+    import chess
+    from ai.packed_positions import PLANE_PIECES
+
+    pieces = [(channel, square) for channel, (piece_type, color) in enumerate(PLANE_PIECES)
+              for square in chess.SquareSet(board.pieces_mask(piece_type, color))]
+    rights = board.clean_castling_rights()
+    castling = 0
+    for right, square in ((WHITE_KINGSIDE, chess.H1), (WHITE_QUEENSIDE, chess.A1),
+                          (BLACK_KINGSIDE, chess.H8), (BLACK_QUEENSIDE, chess.A8)):
+        if rights & chess.BB_SQUARES[square]:
+            castling |= right
+    # Like Board, python-chess keeps the en passant square after every double step
+    ep_file = chess.square_file(board.ep_square) if board.ep_square is not None else None
+    return compute_hash(pieces, board.turn, castling, ep_file)
+
+
+def board_move(move):
+    """
+    python-chess Move to a Board move ((row, col), (row, col)[, promotion]).
+    """
+    start, end = position_from_square(move.from_square), position_from_square(move.to_square)
+    return (start, end, PIECE_SYMBOLS[move.promotion - 1]) if move.promotion else (start, end)
+
+
+def build_book(data_path=None, output_path=BOOK_PATH, plies=BOOK_PLIES, min_games=MIN_GAMES):
+    """
+    Build the book from a games CSV.
+    :param data_path: games.csv, default the one ai/data_preprocessing.py reads.
+    :param plies: Plies of each game to include.
+    :param min_games: Leave out moves played in fewer games.
+    :return: Number of book entries written.
+    """
+    import chess
+    from ai.data_preprocessing import CHUNK_GAMES, DATA_PATH, MIN_TURNS, read_chunks, replay_game
+
+    start_key = position_key(chess.Board())
+    results = {"white": 1, "draw": 2, "black": 3}  # Column of the result counter; anything else is a draw
+    counts = defaultdict(lambda: [0, 0, 0, 0])  # (key, encoded move) -> [games, white wins, draws, black wins]
+    games = 0
+    for _, moves, winners in read_chunks(data_path or DATA_PATH, CHUNK_GAMES, MIN_TURNS):
+        for game_moves, winner in zip(moves, winners):
+            key = start_key
+            for ply, board in enumerate(replay_game(game_moves)):
+                if ply >= plies:
+                    break
+                entry = counts[(key, encode_move(board_move(board.peek())))]
+                entry[0] += 1
+                entry[results.get(winner, 2)] += 1
+                key = position_key(board)
+            games += 1
+
+    kept = [(key, move, *entry) for (key, move), entry in counts.items() if entry[0] >= min_games]
+    book = np.array(kept, dtype=BOOK_DTYPE)
+    book = book[np.lexsort((-book["games"].astype(np.int64), book["key"]))]
+
+    temp_path = output_path + ".tmp"
+    with open(temp_path, "wb") as f:
+        np.save(f, book)
+    os.replace(temp_path, output_path)
+    positions = len(np.unique(book["key"]))
+    print(f"Opening book: {len(book)} moves in {positions} positions from {games} games "
+          f"({plies} plies, at least {min_games} games per move), saved to {output_path}")
+    return len(book)
+
+
+class OpeningBook:
+    def __init__(self, path=BOOK_PATH):
+        """
+        :param path: Book file written by build_book.
+        """
+        self.path = path
+        self.entries = np.load(path, mmap_mode="r")
+        self.keys = self.entries["key"]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, key):
+        """
+        :param key: Position hash (Board.zobrist_hash).
+        :return: List of BookEntry for the position, most played first.
+        """
+        key = np.uint64(key)
+        low = np.searchsorted(self.keys, key, side="left")
+        high = np.searchsorted(self.keys, key, side="right")
+        return [
+            BookEntry(decode_move(int(entry["move"])), int(entry["games"]), int(entry["white_wins"]),
+                      int(entry["draws"]), int(entry["black_wins"]))
+            for entry in self.entries[low:high]
+        ]
+
+    def choose(self, board, rng=None):
+        """
+        Pick a book move for the side to move.
+        :param board: logic.board.Board.
+        :param rng: random.Random to sample moves in proportion to how often they were played;
+                    without one the most played move is returned.
+        :return: A legal move, or None when the position is not in the book.
+        """
+        entries = self.lookup(board.zobrist_hash)
+        color = board.current_turn
+        # Legality guards against hash collisions. Checking the moves one by one is cheaper than
+        # generating every legal move, and without rng only the first legal one is needed.
+        if rng is None:
+            for entry in entries:
+                if board.is_legal_move(entry.move[0], entry.move[1], color):
+                    return entry.move
+            return None
+        entries = [entry for entry in entries if board.is_legal_move(entry.move[0], entry.move[1], color)]
+        if not entries:
+            return None
+        return rng.choices([entry.move for entry in entries], [entry.games for entry in entries])[0]
+
+
+def get_opening_book(path=BOOK_PATH):
+    """
+    The OpeningBook for a file, opened once per process and shared.
+    :return: The book, or None when the file does not exist.
+    """
+    path = os.path.abspath(path)
+    with _books_lock:
+        if path not in _books:
+            if not os.path.exists(path):
+                return None  # Not cached, so a book built later is still picked up
+            _books[path] = OpeningBook(path)
+        return _books[path]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the opening book from games.csv.")
+    parser.add_argument("--input", default=None, help="Games CSV, default games.csv in the project root")
+    parser.add_argument("--output", default=BOOK_PATH)
+    parser.add_argument("--plies", type=int, default=BOOK_PLIES)
+    parser.add_argument("--min-games", type=int, default=MIN_GAMES)
+    args = parser.parse_args()
+    build_book(args.input, args.output, args.plies, args.min_games)
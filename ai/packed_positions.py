@@ -0,0 +1,82 @@
+"""
+Compact on-disk position format for training data.
+
+Each position is stored as twelve uint64 bitboards, one per piece plane in model channel order
+(white P, N, B, R, Q, K, then black), a float32 game outcome label and a uint32 visit count.
+Bit n of a bitboard is python-chess square n (a1 = 0), which lands on matrix[n // 8, n % 8], the
+same layout as fen_to_matrix. A record is 104 bytes, against 6 KB for an int64 8x8x12 matrix.
+
+Freshly replayed positions have visits 1 and a label of 1, 0 or -1. After deduplication the
+label is the mean outcome over all visits of the position.
+"""
+import os
+
+import chess
+import numpy as np
+
+PLANES = 12
+POSITION_DTYPE = np.dtype([("planes", "<u8", (PLANES,)), ("label", "<f4"), ("visits", "<u4")])
+PLANES_BYTES = PLANES * 8
+
+# (piece type, color) for each plane, in model channel order
+PLANE_PIECES = [(piece_type, chess.WHITE) for piece_type in chess.PIECE_TYPES] + \
+               [(piece_type, chess.BLACK) for piece_type in chess.PIECE_TYPES]
+
+
+def pack_board(board):
+    """
+    :param board: chess.Board.
+    :return: List of twelve bitboards as Python ints.
+    """
+    return [board.pieces_mask(piece_type, color) for piece_type, color in PLANE_PIECES]
+
+
+def make_records(planes, labels, visits=1):
+    """
+    Build an array of POSITION_DTYPE records.
+    :param planes: Sequence of 12-bitboard rows.
+    :param labels: Sequence of labels, one per row.
+    :param visits: Visit count for every row, or a sequence of counts.
+    """
+    records = np.empty(len(labels), dtype=POSITION_DTYPE)
+    if len(labels):
+        records["planes"] = np.asarray(planes, dtype=np.uint64)
+        records["label"] = labels
+        records["visits"] = visits
+    return records
+
+
+def shard_paths(data_dir):
+    """
+    :return: Sorted paths of the shard_NNNNN.npy files in data_dir.
+    """
+    return [os.path.join(data_dir, name) for name in sorted(os.listdir(data_dir))
+            if name.startswith("shard_") and name.endswith(".npy")]
+
+
+def position_hashes(planes):
+    """
+    64-bit hash of every packed position, computed with vectorized splitmix64 mixing.
+    :param planes: uint64 array of shape (N, 12).
+    :return: uint64 array of shape (N,).
+    """
+    planes = np.asarray(planes, dtype=np.uint64)
+    hashes = np.zeros(len(planes), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for plane in range(PLANES):
+            z = planes[:, plane] + np.uint64(0x9E3779B97F4A7C15) * np.uint64(plane + 1)
+            z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            hashes = (hashes * np.uint64(0x100000001B3)) ^ z ^ (z >> np.uint64(31))
+    return hashes
+
+
+def unpack_planes(planes):
+    """
+    Expand packed bitboards into model input.
+    :param planes: uint64 array of shape (N, 12).
+    :return: float32 array of shape (N, 8, 8, 12).
+    """
+    planes = np.ascontiguousarray(planes, dtype="<u8")
+    bits = np.unpackbits(planes.view(np.uint8).reshape(len(planes), PLANES, 8), axis=-1, bitorder="little")
+    return bits.reshape(len(planes), PLANES, 8, 8).transpose(0, 2, 3, 1).astype(np.float32)
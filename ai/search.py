@@ -0,0 +1,333 @@
+"""
+Negamax alpha-beta search over logic.board.Board.
+
+Scores are always from the point of view of the side to move at the node being searched.
+Positions already searched are looked up in a transposition table keyed by Board.zobrist_hash.
+Leaf positions are scored in batches: a depth-1 node evaluates all of its children in one
+call to the evaluator, so the Keras model runs one forward pass per frontier node instead of
+one per leaf. Endgames with few enough pieces for the tablebase (ai/tablebase.py) are scored by a
+lookup instead of being searched.
+"""
+import math
+import time
+from collections import namedtuple
+
+from ai.transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+
+# Larger than any evaluation the model (tanh, [-1, 1]) or the material fallback can return
+MATE_SCORE = 100.0
+MATE_THRESHOLD = MATE_SCORE / 2  # Scores beyond this are mate scores
+# Tablebase wins whose mate is too far away to be told apart as a mate score
+TABLEBASE_WIN_SCORE = MATE_THRESHOLD / 2
+INFINITY = float("inf")
+
+PIECE_VALUES = {"Pawn": 1, "Knight": 3, "Bishop": 3, "Rook": 5, "Queen": 9, "King": 0}
+PROMOTION_NAMES = {"q": "Queen", "r": "Rook", "b": "Bishop", "n": "Knight"}
+# PIECE_VALUES indexed by Piece.kind, so hot loops skip the class name lookup
+KIND_VALUES = (1, 3, 3, 5, 9, 0)
+# How many nodes to search between clock and node-limit checks
+CHECK_INTERVAL = 256
+
+SearchResult = namedtuple("SearchResult", ["best_move", "score", "depth", "nodes", "elapsed"])
+
+
+def _score_to_table(score, ply):
+    """
+    Store mate scores relative to the node rather than the root, so they stay valid when the
+    same position is reached at a different ply.
+    """
+    if score > MATE_THRESHOLD:
+        return score + ply
+    if score < -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _score_from_table(score, ply):
+    if score > MATE_THRESHOLD:
+        return score - ply
+    if score < -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+def tablebase_score(value, ply=0):
+    """
+    Search score of an ai/tablebase.py value for the side to move, ply plies from the root.
+    """
+    if value == 0:
+        return 0.0
+    plies = ply + abs(value) - 1
+    score = MATE_SCORE - plies if plies < MATE_SCORE - MATE_THRESHOLD else TABLEBASE_WIN_SCORE
+    return score if value > 0 else -score
+
+
+class SearchAborted(Exception):
+    """
+    Raised inside the search when the time or node budget runs out, or stop() is called.
+    """
+
+
+class MaterialEvaluator:
+    """
+    Cheap fallback evaluation: material balance squashed into the model's [-1, 1] range.
+    """
+
+    def evaluate(self, board):
+        """
+        :return: Score from White's point of view.
+        """
+        balance = 0
+        for piece in board.pieces["white"]:
+            balance += KIND_VALUES[piece.kind]
+        for piece in board.pieces["black"]:
+            balance -= KIND_VALUES[piece.kind]
+        return math.tanh(balance / 10)
+
+    def evaluate_moves(self, board, moves):
+        """
+        Score the position after each move.
+        :return: List of scores from White's point of view.
+        """
+        scores = []
+        for move in moves:
+            board.push(move)
+            scores.append(self.evaluate(board))
+            board.pop()
+        return scores
+
+
+class ModelEvaluator:
+    """
+    Scores positions with the board's Keras model, one batched forward pass per call.
+    """
+
+    def evaluate(self, board):
+        return float(board.predict_batch(board.to_matrix()[None, ...])[0])
+
+    def evaluate_moves(self, board, moves):
+        return board.score_moves_batched(moves).tolist()
+
+
+class Search:
+    def __init__(self, board, evaluator=None, max_depth=4, time_limit=None, node_limit=None,
+                 transposition_table=None, on_iteration=None, stop_event=None):
+        """
+        :param board: Board to search from. It is modified during the search and restored afterwards.
+        :param evaluator: Object with evaluate_moves(board, moves). Defaults to the model when the
+                          board has one loaded, otherwise to material counting.
+        :param max_depth: Deepest iteration of iterative deepening.
+        :param time_limit: Seconds allowed for the search, or None for no limit.
+        :param node_limit: Nodes allowed for the search, or None for no limit.
+        :param transposition_table: TranspositionTable to use. Pass the same table to consecutive
+                                    searches to reuse results across moves; a new 16 MB table is
+                                    created if omitted.
+        :param on_iteration: Called with a SearchResult after every completed iteration, e.g. to
+                             report progress while the search is still running.
+        :param stop_event: Optional threading.Event; setting it has the same effect as stop(), for
+                           callers that need to cancel before the Search exists.
+        """
+        if evaluator is None:
+            evaluator = ModelEvaluator() if board.model else MaterialEvaluator()
+        self.board = board
+        self.evaluator = evaluator
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.tt = transposition_table if transposition_table is not None else TranspositionTable()
+        self.on_iteration = on_iteration
+        self.stop_event = stop_event
+        self.nodes = 0
+        self._next_check = CHECK_INTERVAL
+        self.stopped = False
+        self.killers = []
+        self.history = {}
+        self._deadline = None
+
+    def stop(self):
+        """
+        Ask the search to return as soon as possible. Safe to call from another thread, and also
+        honoured when called before run(), which then returns without completing an iteration.
+        """
+        self.stopped = True
+
+    def run(self):
+        """
+        Search with iterative deepening until max_depth, the budget or stop().
+        :return: SearchResult with the best move of the deepest completed iteration, its score for
+                 the side to move, that depth, the total node count and the elapsed seconds. When
+                 stopped before the first iteration completes, depth is 0 and the move is
+                 the first legal one, with score 0.
+        """
+        start_time = time.perf_counter()
+        self._deadline = start_time + self.time_limit if self.time_limit is not None else None
+        self.nodes = 0
+        self._next_check = CHECK_INTERVAL
+        self.killers = [[None, None] for _ in range(self.max_depth + 1)]
+        self.history = {}
+        self.tt.new_search()
+
+        board = self.board
+        root_moves = board.legal_moves(board.current_turn)
+        if not root_moves:
+            score = -MATE_SCORE if board.is_in_check(board.current_turn) else 0.0
+            return SearchResult(None, score, 0, 0, time.perf_counter() - start_time)
+
+        best_move, best_score, completed_depth = root_moves[0], 0.0, 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                move, score = self._search_root(root_moves, depth, best_move if completed_depth else None)
+            except SearchAborted:
+                break
+            best_move, best_score, completed_depth = move, score, depth
+            if self.on_iteration is not None:
+                self.on_iteration(SearchResult(move, score, depth, self.nodes, time.perf_counter() - start_time))
+            if abs(score) >= MATE_SCORE - self.max_depth:
+                break  # Forced mate found, deeper iterations cannot improve on it
+
+        return SearchResult(best_move, best_score, completed_depth, self.nodes, time.perf_counter() - start_time)
+
+    def _search_root(self, moves, depth, previous_best):
+        # The first iteration ignores the node limit, so there is always a move to play, but not
+        # stop() or the clock. Its children are scored in one call, so they are checked around it.
+        check_budget = depth > 1
+        self._order_moves(moves, 0, previous_best)
+        if depth == 1:
+            self._check_stop()
+            scores = self._evaluate_children(moves)
+            if self._stop_requested():
+                raise SearchAborted()
+            best_index = max(range(len(moves)), key=scores.__getitem__)
+            return moves[best_index], scores[best_index]
+
+        board = self.board
+        alpha, best_move = -INFINITY, moves[0]
+        for move in moves:
+            board.push(move)
+            try:
+                score = -self._negamax(depth - 1, -INFINITY, -alpha, 1, check_budget)
+            finally:
+                board.pop()
+            if score > alpha:
+                alpha, best_move = score, move
+        self.tt.store(board.zobrist_hash, depth, EXACT, best_move, alpha)
+        return best_move, alpha
+
+    def _negamax(self, depth, alpha, beta, ply, check_budget=True):
+        self.nodes += 1
+        if check_budget and (self.nodes >= self._next_check or self.stopped):
+            self._next_check = self.nodes + CHECK_INTERVAL
+            self._check_budget()
+
+        board = self.board
+        key = board.zobrist_hash
+        if board.halfmove_clock >= 100 or board.position_counts[key] > 1 or board.is_insufficient_material():
+            return 0.0  # Fifty-move rule, a repeated position or no mating material left
+        value = board.tablebase_probe()
+        if value is not None:
+            return tablebase_score(value, ply)  # Solved endgame, no need to search it
+
+        tt_move = None
+        entry = self.tt.probe(key)
+        if entry:
+            tt_move = entry.move
+            if entry.depth >= depth:
+                score = _score_from_table(entry.score, ply)
+                if (
+                        entry.bound == EXACT or
+                        (entry.bound == LOWER_BOUND and score >= beta) or
+                        (entry.bound == UPPER_BOUND and score <= alpha)
+                ):
+                    return score
+
+        moves = board.legal_moves(board.current_turn)
+        if not moves:
+            return -(MATE_SCORE - ply) if board.is_in_check(board.current_turn) else 0.0
+
+        if depth == 1:
+            scores = self._evaluate_children(moves)
+            best_index = max(range(len(moves)), key=scores.__getitem__)
+            self.tt.store(key, 1, EXACT, moves[best_index], _score_to_table(scores[best_index], ply))
+            return scores[best_index]
+
+        original_alpha = alpha
+        best_score, best_move = -INFINITY, None
+        self._order_moves(moves, ply, tt_move)
+        for move in moves:
+            is_quiet = board.board[move[1][0]][move[1][1]] is None
+            board.push(move)
+            try:
+                score = -self._negamax(depth - 1, -beta, -alpha, ply + 1, check_budget)
+            finally:
+                board.pop()
+            if score > best_score:
+                best_score, best_move = score, move
+            if score >= beta:
+                if is_quiet:
+                    killers = self.killers[ply]
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                    self.history[move] = self.history.get(move, 0) + depth * depth
+                break
+            if score > alpha:
+                alpha = score
+
+        if best_score >= beta:
+            bound = LOWER_BOUND
+        elif best_score > original_alpha:
+            bound = EXACT
+        else:
+            bound = UPPER_BOUND
+        self.tt.store(key, depth, bound, best_move, _score_to_table(best_score, ply))
+        return best_score
+
+    def _evaluate_children(self, moves):
+        """
+        Static scores of the positions after each move, from the mover's point of view.
+        """
+        self.nodes += len(moves)
+        scores = self.evaluator.evaluate_moves(self.board, moves)
+        if self.board.current_turn == "black":
+            return [-score for score in scores]
+        return list(scores)
+
+    def _order_moves(self, moves, ply, first=None):
+        """
+        Sort moves in place: a known best move, then captures by most valuable victim and least
+        valuable attacker, then promotions, killer moves and the history heuristic.
+        """
+        grid = self.board.board
+        killers = self.killers[ply] if ply < len(self.killers) else (None, None)
+        history = self.history
+
+        def priority(move):
+            if move == first:
+                return 1000000
+            start, end = move[0], move[1]
+            victim = grid[end[0]][end[1]]
+            if victim:
+                attacker = grid[start[0]][start[1]]
+                return 100000 + KIND_VALUES[victim.kind] * 10 - KIND_VALUES[attacker.kind]
+            if len(move) > 2:
+                return 90000 + PIECE_VALUES[PROMOTION_NAMES[move[2]]]
+            if move == killers[0] or move == killers[1]:
+                return 80000
+            return history.get(move, 0)
+
+        moves.sort(key=priority, reverse=True)
+
+    def _stop_requested(self):
+        return self.stopped or (self.stop_event is not None and self.stop_event.is_set())
+
+    def _check_stop(self):
+        if self._stop_requested():
+            raise SearchAborted()
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchAborted()
+
+    def _check_budget(self):
+        self._check_stop()
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchAborted()
+
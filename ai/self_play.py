@@ -0,0 +1,183 @@
+"""
+Self-play data generation.
+
+Engine-vs-engine games run in a process pool, each worker with its own Board and model. Every
+task plays a fixed number of games and writes them as one training shard in the format of
+ai/packed_positions.py, next to a moves_NNNNN.npy file with the move chosen in each position.
+Shards already on disk are skipped, so an interrupted run resumes.
+
+Run from the project root:
+    python -m ai.self_play --games 200 --workers 4
+    python -m ai.self_play --games 50 --depth 2 --backend keras --output ai/self_play_data
+"""
+import argparse
+import concurrent.futures
+import math
+import os
+import random
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from ai.packed_positions import make_records
+from ai.transposition import TranspositionTable, encode_move
+
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "self_play_data")
+GAMES_PER_SHARD = 10
+MAX_PLIES = 300  # Games still running after this many plies are scored as draws
+SAMPLING_PLIES = 10  # Opening plies chosen by sampling instead of the best move, for variety
+TEMPERATURE = 0.1  # Softmax temperature over the [-1, 1] scores while sampling
+
+RESULT_LABELS = {"1-0": 1, "0-1": -1, "1/2-1/2": 0}
+
+
+def choose_move(board, moves, ply, config, rng, transposition_table):
+    """
+    Pick the move for the side to move: sampled from the scored replies during the opening,
+    otherwise the result of an alpha-beta search.
+    """
+    from ai.search import MaterialEvaluator, ModelEvaluator, Search
+
+    if ply < config["sampling_plies"]:
+        evaluator = ModelEvaluator() if board.model else MaterialEvaluator()
+        scores = evaluator.evaluate_moves(board, moves)
+        sign = 1 if board.current_turn == "white" else -1
+        best = max(sign * score for score in scores)
+        weights = [math.exp((sign * score - best) / config["temperature"]) for score in scores]
+        return rng.choices(moves, weights)[0]
+
+    search = Search(board, max_depth=config["depth"], time_limit=config["time_limit"],
+                    node_limit=config["node_limit"], transposition_table=transposition_table)
+    return search.run().best_move
+
+
+def play_game(board, config, rng, transposition_table):
+    """
+    Play one game from the starting position.
+    :return: (packed positions, encoded moves, result, reason). Each position is the board before
+             the corresponding move.
+    """
+    positions, moves_played = [], []
+    result = reason = None
+    for ply in range(config["max_plies"]):
+        moves = board.legal_moves(board.current_turn)
+        over = board.outcome(moves)
+        if over:
+            result, reason = over
+            break
+        move = choose_move(board, moves, ply, config, rng, transposition_table)
+        positions.append(board.to_bitboards())
+        moves_played.append(encode_move(move))
+        board.push(move)
+    if result is None:
+        result, reason = "1/2-1/2", "max plies"
+    return positions, moves_played, result, reason
+
+
+def play_shard(index, games, output_dir, config):
+    """
+    Play a batch of games and write them as one shard. Runs in a worker process.
+    :return: (index, worker pid, games, positions, seconds, {result: count})
+    """
+    from logic.board import Board
+
+    start_time = time.perf_counter()
+    rng = random.Random(config["seed"] * 1000003 + index)
+    planes, labels, moves = [], [], []
+    results = defaultdict(int)
+    transposition_table = TranspositionTable()  # Allocated once per shard, not once per move
+    for _ in range(games):
+        board = Board(model_path=config["model_path"], model_backend=config["backend"])
+        transposition_table.clear()
+        positions, moves_played, result, _ = play_game(board, config, rng, transposition_table)
+        planes.extend(positions)
+        labels.extend([RESULT_LABELS[result]] * len(positions))
+        moves.extend(moves_played)
+        results[result] += 1
+
+    path = os.path.join(output_dir, f"shard_{index:05d}.npy")
+    moves_path = os.path.join(output_dir, f"moves_{index:05d}.npy")
+    # Moves first, then the shard: a shard on disk always has its moves file
+    for target, array in ((moves_path, np.array(moves, dtype=np.uint16)), (path, make_records(planes, labels))):
+        with open(target + ".tmp", "wb") as f:
+            np.save(f, array)
+        os.replace(target + ".tmp", target)
+    return index, os.getpid(), games, len(labels), time.perf_counter() - start_time, dict(results)
+
+
+def self_play(games, output_dir=OUTPUT_DIR, workers=None, games_per_shard=GAMES_PER_SHARD, depth=1,
+              time_limit=None, node_limit=None, model_path=None, backend="numpy", sampling_plies=SAMPLING_PLIES,
+              temperature=TEMPERATURE, max_plies=MAX_PLIES, seed=0):
+    """
+    Generate self-play games into output_dir.
+    :param games: Total number of games.
+    :param workers: Worker processes, default one per CPU.
+    :param depth: Search depth per move after the sampled opening. 1 plays the best-scored reply.
+    :param backend: Model backend for each worker's Board. 'numpy' keeps every worker single
+                    threaded and free of TensorFlow, so throughput scales with the process count.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    config = {
+        "depth": depth, "time_limit": time_limit, "node_limit": node_limit, "model_path": model_path,
+        "backend": backend, "sampling_plies": sampling_plies, "temperature": temperature,
+        "max_plies": max_plies, "seed": seed,
+    }
+    tasks = [(index, min(games_per_shard, games - start))
+             for index, start in enumerate(range(0, games, games_per_shard))]
+    pending = [(index, count) for index, count in tasks
+               if not os.path.exists(os.path.join(output_dir, f"shard_{index:05d}.npy"))]
+    if len(pending) < len(tasks):
+        print(f"Skipping {len(tasks) - len(pending)} shards already on disk.")
+    print(f"Playing {sum(count for _, count in pending)} games with {workers} workers...")
+
+    start_time = time.perf_counter()
+    total_games = total_positions = 0
+    results = defaultdict(int)
+    per_worker = defaultdict(lambda: [0, 0, 0.0])  # pid -> [games, positions, busy seconds]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_shard, index, count, output_dir, config) for index, count in pending]
+        for future in concurrent.futures.as_completed(futures):
+            index, pid, shard_games, positions, seconds, shard_results = future.result()
+            total_games += shard_games
+            total_positions += positions
+            for result, count in shard_results.items():
+                results[result] += count
+            stats = per_worker[pid]
+            stats[0] += shard_games
+            stats[1] += positions
+            stats[2] += seconds
+            elapsed = time.perf_counter() - start_time
+            print(f"Shard {index}: {shard_games} games, {positions} positions in {seconds:.1f}s "
+                  f"(total {total_games} games, {total_games / elapsed * 3600:.0f} games/hour)")
+
+    elapsed = time.perf_counter() - start_time
+    print(f"\nPlayed {total_games} games, {total_positions} positions in {elapsed:.1f}s: "
+          f"{total_games / elapsed * 3600:.0f} games/hour")
+    print("Results: " + ", ".join(f"{result} {results[result]}" for result in RESULT_LABELS))
+    for pid, (worker_games, worker_positions, busy) in sorted(per_worker.items()):
+        print(f"  worker {pid}: {worker_games} games, {worker_positions} positions, "
+              f"{worker_games / busy * 3600:.0f} games/hour, {worker_positions / busy:.0f} positions/s")
+    return total_games, total_positions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate training shards from engine self-play.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--games-per-shard", type=int, default=GAMES_PER_SHARD)
+    parser.add_argument("--depth", type=int, default=1)
+    parser.add_argument("--time-limit", type=float, default=None, help="Seconds per searched move")
+    parser.add_argument("--node-limit", type=int, default=None, help="Nodes per searched move")
+    parser.add_argument("--model", default=None, help="Model file, default ai/chess_model.h5")
+    parser.add_argument("--backend", choices=("numpy", "keras"), default="numpy")
+    parser.add_argument("--sampling-plies", type=int, default=SAMPLING_PLIES)
+    parser.add_argument("--temperature", type=float, default=TEMPERATURE)
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    self_play(args.games, args.output, args.workers, args.games_per_shard, args.depth, args.time_limit,
+              args.node_limit, args.model, args.backend, args.sampling_plies, args.temperature,
+              args.max_plies, args.seed)
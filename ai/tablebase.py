@@ -0,0 +1,699 @@
+"""
+Endgame tablebases for positions with three or four pieces, kings included.
+
+generate_table solves one material configuration, such as KQvKR, by retrograde analysis.
+Checkmates are found first, then results are carried backwards one ply at a time with
+un-moves. A position is won in n plies if some move reaches a position lost in n - 1. It is
+lost in n plies once every move reaches a won position, the slowest of them won in n - 1.
+Captures and promotions leave the table; their results are looked up in the smaller or
+pawn-poorer tables, which are generated first. Positions never resolved this way are draws.
+
+A table is a .npy file of int8 values with one row per side to move (white, black), indexed by
+the piece squares (see position_index). 0 is a draw. Any other value gives the result for the
+side to move by its sign, and abs(value) - 1 plies to mate with best play: -1 is checkmated and
+2 mates in one. Only positions with the white king on files a-d are stored. The others are
+looked up through their left-right mirror image. Pawnless tables use all eight symmetries of the
+board and store only the white king on the a1-d1-d4 triangle, a third of the size. Positions with
+that king on the a1-h8 diagonal are stored both as themselves and reflected in it, so the king
+square alone picks the stored image. Tables ignore castling, en passant and the fifty-move rule.
+
+Tablebase memory-maps the tables, so a probe reads one byte and an unused table costs no memory.
+
+Generate from the project root (all 35 tables take about 260 MB and 7 minutes):
+    python -m ai.tablebase
+    python -m ai.tablebase KQvK KRvK KQvKR
+"""
+import argparse
+import os
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from logic.bitboard import (
+    BETWEEN, BISHOP, BISHOP_RAYS, KING, KING_ATTACKS, KNIGHT, KNIGHT_ATTACKS, PAWN, PAWN_ATTACKS, PROMOTION_PIECES,
+    QUEEN, ROOK, ROOK_RAYS,
+)
+
+TABLEBASE_DIR = os.path.join(os.path.dirname(__file__), "tablebases")
+MAX_PIECES = 4
+DRAW = 0
+CHECKMATED = -1
+MAX_PLIES = 126  # Longest distance to mate an int8 value can hold
+
+LETTERS = "PNBRQK"  # Indexed by piece kind
+EXTRA_KINDS = (QUEEN, ROOK, BISHOP, KNIGHT, PAWN)  # Non-king pieces, in signature order
+SLIDERS = (BISHOP, ROOK, QUEEN)
+
+
+def _union(rays, square):
+    bb = 0
+    for table, _ in rays:
+        bb |= table[square]
+    return bb
+
+
+def _square_table(bitboards):
+    """
+    List of 64 bitboards to a flattened (64 * 64) bool array indexed by from * 64 + to.
+    """
+    return np.array([[bb >> target & 1 for target in range(64)] for bb in bitboards], dtype=bool).ravel()
+
+
+_BISHOP_LINES = [_union(BISHOP_RAYS, square) for square in range(64)]
+_ROOK_LINES = [_union(ROOK_RAYS, square) for square in range(64)]
+# Squares each kind reaches on an empty board; sliding pieces are stopped by checking BETWEEN
+_REACH = {
+    KNIGHT: KNIGHT_ATTACKS, BISHOP: _BISHOP_LINES, ROOK: _ROOK_LINES,
+    QUEEN: [b | r for b, r in zip(_BISHOP_LINES, _ROOK_LINES)], KING: KING_ATTACKS,
+}
+_ATTACKS = {kind: _square_table(reach) for kind, reach in _REACH.items()}
+_PAWN_ATTACKS = (_square_table(PAWN_ATTACKS[0]), _square_table(PAWN_ATTACKS[1]))
+_BETWEEN = np.array(BETWEEN, dtype=np.uint64).ravel()
+
+
+def _target_table(reach):
+    """
+    (64, n) array of the squares a piece reaches from each square, padded with -1.
+    """
+    targets = [[target for target in range(64) if reach[square] >> target & 1] for square in range(64)]
+    width = max(len(row) for row in targets)
+    return np.array([row + [-1] * (width - len(row)) for row in targets], dtype=np.int16)
+
+
+_TARGETS = {kind: _target_table(reach) for kind, reach in _REACH.items()}
+# Squares of the white king stored in tables with pawns (files a-d) and without (the a1-d1-d4
+# triangle), in king index order, and the king index of every square (-1 if not stored)
+_KING_SQUARES = {
+    False: np.array([rank * 8 + file for rank in range(8) for file in range(4)], dtype=np.int16),
+    True: np.array([rank * 8 + file for rank in range(4) for file in range(rank, 4)], dtype=np.int16),
+}
+_KING_INDEX = {}
+for _pawnless, _squares in _KING_SQUARES.items():
+    _KING_INDEX[_pawnless] = np.full(64, -1, dtype=np.intp)
+    _KING_INDEX[_pawnless][_squares] = np.arange(len(_squares))
+_TRANSPOSED = np.array([(square & 7) << 3 | square >> 3 for square in range(64)], dtype=np.intp)  # a1-h8 mirror
+
+
+def signature(white, black):
+    """
+    Table name of a material configuration, e.g. 'KQvKR'.
+    :param white: Kinds of White's pieces besides the king.
+    :param black: Kinds of Black's pieces besides the king.
+    """
+    def side(kinds):
+        return "K" + "".join(LETTERS[kind] for kind in sorted(kinds, reverse=True))
+    return side(white) + "v" + side(black)
+
+
+def parse_signature(name):
+    """
+    :return: (white kinds, black kinds), each sorted strongest first.
+    """
+    white, _, black = name.upper().partition("V")
+    if not (white.startswith("K") and black.startswith("K")):
+        raise ValueError(f"Not a tablebase name: {name}")
+    return tuple(sorted((LETTERS.index(letter) for letter in white[1:]), reverse=True)), \
+        tuple(sorted((LETTERS.index(letter) for letter in black[1:]), reverse=True))
+
+
+def canonical(white, black):
+    """
+    Tables are stored with the stronger material as White.
+    :return: (white, black, flipped), where flipped means the colors were swapped.
+    """
+    white, black = tuple(sorted(white, reverse=True)), tuple(sorted(black, reverse=True))
+    if (len(white), white) >= (len(black), black):
+        return white, black, False
+    return black, white, True
+
+
+def all_tables(max_pieces=MAX_PIECES):
+    """
+    Names of every table with up to max_pieces pieces, smaller tables and fewer pawns first.
+    """
+    names = set()
+    for extra in range(1, max_pieces - 1):
+        for kinds in _multisets(EXTRA_KINDS, extra):
+            for split in range(len(kinds) + 1):
+                white, black, _ = canonical(kinds[:split], kinds[split:])
+                names.add(signature(white, black))
+    return sorted(names, key=_generation_order)
+
+
+def _multisets(kinds, size):
+    if size == 0:
+        return [()]
+    return [(kind,) + rest for index, kind in enumerate(kinds) for rest in _multisets(kinds[index:], size - 1)]
+
+
+def _generation_order(name):
+    white, black = parse_signature(name)
+    kinds = white + black
+    return len(kinds), kinds.count(PAWN), name
+
+
+def dependencies(name):
+    """
+    Tables reached from this one by a capture or a promotion. Bare kings need no table.
+    """
+    white, black = parse_signature(name)
+    reached = set()
+    for own, other, white_moves in ((white, black, True), (black, white, False)):
+        captures = [other] + [other[:index] + other[index + 1:] for index in range(len(other))]
+        promotions = [own] + [own[:index] + own[index + 1:] + (promoted,)
+                              for index, kind in enumerate(own) if kind == PAWN for promoted in PROMOTION_PIECES]
+        for changed_own in promotions:
+            for changed_other in captures:
+                if changed_own == own and changed_other == other:
+                    continue  # Quiet moves stay in the table
+                pair = (changed_own, changed_other) if white_moves else (changed_other, changed_own)
+                if pair[0] or pair[1]:
+                    reached.add(signature(*canonical(*pair)[:2]))
+    return sorted(reached, key=_generation_order)
+
+
+def is_pawnless(pieces):
+    """
+    :param pieces: (is_white, kind) of every piece.
+    """
+    return all(kind != PAWN for _, kind in pieces)
+
+
+def table_pieces(name):
+    """
+    Pieces of a table in index order: white king, black king, White's other pieces, Black's.
+    :return: List of (is_white, kind).
+    """
+    white, black = parse_signature(name)
+    return [(True, KING), (False, KING)] + [(True, kind) for kind in white] + [(False, kind) for kind in black]
+
+
+def table_size(pieces):
+    return len(_KING_SQUARES[is_pawnless(pieces)]) * 64 ** (len(pieces) - 1)
+
+
+def position_index(squares, pawnless):
+    """
+    Index of positions in a table.
+    :param squares: Square (a1 = 0) of every piece in table_pieces order, as ints or arrays,
+                    already brought into the stored part of the board by _normalize.
+    :param pawnless: The table has no pawns.
+    """
+    index = _KING_INDEX[pawnless][squares[0]]
+    for square in squares[1:]:
+        index = index * 64 + square
+    return index
+
+
+def _normalize(squares, pawnless):
+    """
+    Move every position to its stored symmetric image: the white king on files a-d, and for
+    pawnless material also on ranks 1-4 and not above the a1-h8 diagonal.
+    """
+    flip = (squares[0] & 7) >= 4
+    squares = [np.where(flip, square ^ 7, square) for square in squares]
+    if pawnless:
+        flip = squares[0] >= 32
+        squares = [np.where(flip, square ^ 56, square) for square in squares]
+        flip = (squares[0] >> 3) > (squares[0] & 7)
+        squares = [np.where(flip, (square & 7) << 3 | square >> 3, square) for square in squares]
+    return squares
+
+
+def _on_diagonal(square):
+    return (square >> 3) == (square & 7)
+
+
+def _on_long_diagonal(square):
+    """
+    On the a1-h8 or the a8-h1 diagonal, the squares _normalize takes to the a1-h8 diagonal.
+    """
+    return ((square >> 3) == (square & 7)) | ((square >> 3) + (square & 7) == 7)
+
+
+def _decode(indices, count, pawnless):
+    squares = []
+    for _ in range(count - 1):
+        squares.append((indices % 64).astype(np.int16))
+        indices = indices // 64
+    squares.append(_KING_SQUARES[pawnless][indices])
+    return squares[::-1]
+
+
+def mover_value(value):
+    """
+    Value of a position for the side that just moved into it.
+    """
+    return -(value + np.sign(value))
+
+
+def preference(value):
+    """
+    Sort key for values of the side to move, larger is better: quick wins, then longer wins,
+    then draws, then the slowest losses.
+    """
+    return np.where(value > 0, 300 - value, np.where(value == 0, 150, -value))
+
+
+def _from_preference(key):
+    return np.where(key > 150, 300 - key, np.where(key == 150, 0, -key))
+
+
+def _attacked(target, attackers, squares):
+    """
+    :param target: Square array.
+    :param attackers: (kind, is_white, square array) of each piece that may attack it.
+    :param squares: Square arrays of every piece on the board, which block sliding pieces.
+    :return: Bool array, True where some attacker reaches the target.
+    """
+    hit = np.zeros(len(target), dtype=bool)
+    for kind, white, origin in attackers:
+        pair = origin.astype(np.intp) * 64 + target
+        attacks = _PAWN_ATTACKS[0 if white else 1][pair] if kind == PAWN else _ATTACKS[kind][pair]
+        if kind in SLIDERS:
+            between = _BETWEEN[pair]
+            for square in squares:
+                attacks &= (between >> square.astype(np.uint64)) & np.uint64(1) == 0
+        hit |= attacks
+    return hit
+
+
+def _occupied(target, squares):
+    occupied = np.zeros(len(target), dtype=bool)
+    for square in squares:
+        occupied |= square == target
+    return occupied
+
+
+def _clear_path(origin, target, squares):
+    between = _BETWEEN[origin.astype(np.intp) * 64 + target]
+    clear = np.ones(len(target), dtype=bool)
+    for square in squares:
+        clear &= (between >> square.astype(np.uint64)) & np.uint64(1) == 0
+    return clear
+
+
+def _valid(pieces, squares, white_to_move):
+    """
+    Positions that can occur: no shared squares, no pawns on the first or last rank and the
+    side that just moved not in check.
+    """
+    valid = np.ones(len(squares[0]), dtype=bool)
+    for i in range(len(pieces)):
+        for j in range(i + 1, len(pieces)):
+            valid &= squares[i] != squares[j]
+        if pieces[i][1] == PAWN:
+            rank = squares[i] >> 3
+            valid &= (rank >= 1) & (rank <= 6)
+    king = squares[1] if white_to_move else squares[0]
+    attackers = [(kind, white, squares[i]) for i, (white, kind) in enumerate(pieces) if white == white_to_move]
+    return valid & ~_attacked(king, attackers, squares)
+
+
+def _moves(pieces, squares, white_to_move):
+    """
+    Pseudo-legal moves of the side to move, one candidate per piece and destination slot.
+    :return: Iterator of (mask, piece index, target squares, captured piece index or None,
+             promotion kind or None).
+    """
+    others = [j for j in range(len(pieces)) if pieces[j][0] != white_to_move and pieces[j][1] != KING]
+    for i, (white, kind) in enumerate(pieces):
+        if white != white_to_move:
+            continue
+        origin = squares[i]
+        rest = squares[:i] + squares[i + 1:]
+        if kind != PAWN:
+            table = _TARGETS[kind]
+            for slot in range(table.shape[1]):
+                target = table[origin, slot]
+                mask = target >= 0
+                target = np.where(mask, target, 0)
+                if kind in SLIDERS:
+                    mask &= _clear_path(origin, target, rest)
+                empty = ~_occupied(target, rest)
+                yield mask & empty, i, target, None, None
+                for j in others:
+                    yield mask & (squares[j] == target), i, target, j, None
+            continue
+
+        step = 8 if white else -8
+        last_rank = 7 if white else 0
+        target = origin + step
+        empty = ~_occupied(target, rest)
+        promotes = (target >> 3) == last_rank
+        yield empty & ~promotes, i, target, None, None
+        for promoted in PROMOTION_PIECES:
+            yield empty & promotes, i, target, None, promoted
+        start = (origin >> 3) == (1 if white else 6)
+        double = np.where(start, origin + 2 * step, 0)
+        yield start & empty & ~_occupied(double, rest), i, double, None, None
+        for side_step, edge in ((-1, 0), (1, 7)):
+            mask = (origin & 7) != edge
+            target = np.where(mask, origin + step + side_step, 0)
+            promotes = (target >> 3) == last_rank
+            for j in others:
+                capture = mask & (squares[j] == target)
+                yield capture & ~promotes, i, target, j, None
+                for promoted in PROMOTION_PIECES:
+                    yield capture & promotes, i, target, j, promoted
+
+
+def _lookup(pieces, squares, white_to_move, tables):
+    """
+    Values of positions from any table, with colors swapped and pieces reordered as needed.
+    :param pieces: (is_white, kind) of every piece, kings included, in any order.
+    :param tables: Table name -> (2, size) array.
+    """
+    white = [kind for is_white, kind in pieces if is_white and kind != KING]
+    black = [kind for is_white, kind in pieces if not is_white and kind != KING]
+    if not white and not black:
+        return np.zeros(len(squares[0]), dtype=np.int8)
+    white, black, flipped = canonical(white, black)
+    if flipped:
+        pieces = [(not is_white, kind) for is_white, kind in pieces]
+        squares = [square ^ 56 for square in squares]
+        white_to_move = not white_to_move
+    order = sorted(range(len(pieces)), key=lambda i: (pieces[i][1] != KING, not pieces[i][0], -pieces[i][1]))
+    pawnless = is_pawnless(pieces)
+    ordered = _normalize([squares[i] for i in order], pawnless)
+    table = tables[signature(white, black)]
+    return table[0 if white_to_move else 1][position_index([square.astype(np.intp) for square in ordered], pawnless)]
+
+
+def _forward(pieces, squares, white_to_move, tables):
+    """
+    Look at every move once: count the legal moves that stay in the table and find the best
+    capture or promotion.
+    :return: (quiet move counts, best exit as a preference key or 0 for none, in check flags,
+             flags for having any legal move).
+    """
+    size = len(squares[0])
+    count = np.zeros(size, dtype=np.uint8)
+    exit_key = np.zeros(size, dtype=np.int16)
+    any_move = np.zeros(size, dtype=bool)
+    king = 0 if white_to_move else 1
+    pawnless = is_pawnless(pieces)
+    for mask, i, target, captured, promoted in _moves(pieces, squares, white_to_move):
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            continue
+        moved = [square[rows] for square in squares]
+        moved[i] = target[rows]
+        remaining = [j for j in range(len(pieces)) if j != captured]
+        after = [moved[j] for j in remaining]
+        attackers = [(pieces[j][1], pieces[j][0], moved[j]) for j in remaining if pieces[j][0] != white_to_move]
+        legal = ~_attacked(moved[king], attackers, after)
+        rows, after = rows[legal], [square[legal] for square in after]
+        any_move[rows] = True
+        if captured is None and promoted is None:
+            if pawnless and i == 0:
+                # The white king stepping from off the diagonal onto a long diagonal reaches a
+                # position stored twice (see _predecessors), and both copies count this move
+                # when they are settled
+                twice = ~_on_diagonal(squares[0][rows]) & _on_long_diagonal(target[rows])
+                count[rows] += np.where(twice, 2, 1).astype(np.uint8)
+            else:
+                count[rows] += 1
+            continue
+        successor = [pieces[j] for j in remaining]
+        if promoted is not None:
+            successor[remaining.index(i)] = (white_to_move, promoted)
+        value = _lookup(successor, after, not white_to_move, tables).astype(np.int16)
+        key = preference(mover_value(value))
+        exit_key[rows] = np.maximum(exit_key[rows], key)
+
+    attackers = [(kind, white, squares[j]) for j, (white, kind) in enumerate(pieces) if white != white_to_move]
+    in_check = _attacked(squares[king], attackers, squares)
+    return count, exit_key, in_check, any_move
+
+
+def _predecessors(pieces, indices, white_to_move, valid):
+    """
+    Positions from which the side that just moved reached these positions without a capture or
+    promotion.
+    :param white_to_move: Side to move in the given positions.
+    :param valid: Valid-position flags of the predecessors' table (the other side to move).
+    :return: Predecessor indices, with repeats.
+    """
+    pawnless = is_pawnless(pieces)
+    squares = _decode(indices, len(pieces), pawnless)
+    mover = not white_to_move
+    found = []
+    for i, (white, kind) in enumerate(pieces):
+        if white != mover:
+            continue
+        origin = squares[i]
+        rest = squares[:i] + squares[i + 1:]
+        candidates = []
+        if kind != PAWN:
+            table = _TARGETS[kind]
+            for slot in range(table.shape[1]):
+                target = table[origin, slot]
+                mask = target >= 0
+                target = np.where(mask, target, 0)
+                mask &= ~_occupied(target, rest)
+                if kind in SLIDERS:
+                    mask &= _clear_path(origin, target, rest)
+                candidates.append((mask, target))
+        else:
+            step = -8 if white else 8  # Backwards
+            rank = origin >> 3
+            single = origin + step
+            empty = ~_occupied(single, rest)
+            candidates.append((empty & ((single >> 3) >= 1) & ((single >> 3) <= 6), single))
+            double = np.where(rank == (3 if white else 4), origin + 2 * step, 0)
+            candidates.append((empty & (rank == (3 if white else 4)) & ~_occupied(double, rest), double))
+
+        for mask, target in candidates:
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                continue
+            before = [square[rows] for square in squares]
+            before[i] = target[rows]
+            if i == 0:
+                before = _normalize(before, pawnless)
+                if pawnless:
+                    # A position with the white king on the diagonal is stored twice, as itself
+                    # and reflected. When the king stepped off the diagonal, the reflection's
+                    # move leads to the reflected position, which is stored here as well.
+                    reflect = _on_diagonal(before[0]) & ~_on_diagonal(squares[0][rows])
+                    reflected = [_TRANSPOSED[square[reflect]] for square in before]
+                    index = position_index([square.astype(np.intp) for square in reflected], pawnless)
+                    found.append(index[valid[index]])
+            index = position_index([square.astype(np.intp) for square in before], pawnless)
+            found.append(index[valid[index]])
+    return np.concatenate(found) if found else np.zeros(0, dtype=np.intp)
+
+
+def generate_table(name, directory=TABLEBASE_DIR):
+    """
+    Solve one table and save it. The tables it depends on must already be in the directory.
+    :param name: Table name such as 'KRvK'.
+    :return: Dict of the wins, draws and losses for White to move and the longest mate in plies.
+    """
+    pieces = table_pieces(name)
+    size = table_size(pieces)
+    tables = {dependency: np.load(os.path.join(directory, dependency + ".npy"), mmap_mode="r")
+              for dependency in dependencies(name)}
+
+    squares = _decode(np.arange(size, dtype=np.intp), len(pieces), is_pawnless(pieces))
+    valid = [_valid(pieces, squares, side == 0) for side in range(2)]
+    value = [np.zeros(size, dtype=np.int8) for _ in range(2)]
+    decided = [np.zeros(size, dtype=bool) for _ in range(2)]
+    count = [np.zeros(size, dtype=np.uint8) for _ in range(2)]
+    exit_key = [np.zeros(size, dtype=np.int16) for _ in range(2)]
+    wins, losses = defaultdict(list), defaultdict(list)  # Plies -> [(side, indices)] waiting to be settled
+
+    for side in range(2):
+        rows = np.flatnonzero(valid[side])
+        counts, keys, in_check, any_move = _forward(pieces, [square[rows] for square in squares], side == 0, tables)
+        count[side][rows], exit_key[side][rows] = counts, keys
+        losses[0].append((side, rows[~any_move & in_check]))
+        decided[side][rows[~any_move & ~in_check]] = True  # Stalemate
+        # Captures and promotions that win settle the position unless a quicker win turns up
+        exit_plies = _from_preference(keys).astype(np.int64) - 1
+        for plies in np.unique(exit_plies[keys > 150]):
+            wins[int(plies)].append((side, rows[(keys > 150) & (exit_plies == plies)]))
+        _exhausted(rows[any_move & (counts == 0)], side, 0, exit_key, decided, losses)
+    del squares
+
+    # Wins settle at odd plies and losses at even ones, so each step handles one kind
+    plies = 0
+    while wins or losses:
+        winning = plies % 2 == 1
+        settled = wins.pop(plies, []) if winning else losses.pop(plies, [])
+        for side in range(2):
+            parts = [indices for owner, indices in settled if owner == side]
+            if not parts:
+                continue
+            indices = np.unique(np.concatenate(parts))
+            indices = indices[~decided[side][indices]]
+            if not len(indices):
+                continue
+            if plies > MAX_PLIES:
+                raise ValueError(f"{name}: mates longer than {MAX_PLIES} plies do not fit the table")
+            decided[side][indices] = True
+            value[side][indices] = plies + 1 if winning else -(plies + 1)
+            other = 1 - side
+            before = _predecessors(pieces, indices, side == 0, valid[other])
+            before = before[~decided[other][before]]
+            if winning:
+                # One more of their moves leads to a win for us
+                before, times = np.unique(before, return_counts=True)
+                count[other][before] -= times.astype(np.uint8)
+                _exhausted(before[count[other][before] == 0], other, plies + 1, exit_key, decided, losses)
+            else:
+                wins[plies + 1].append((other, before))
+        plies += 1
+
+    data = np.stack(value)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name + ".npy")
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        np.save(f, data)
+    os.replace(temp_path, path)
+
+    white = data[0][valid[0]]
+    return {"wins": int((white > 0).sum()), "draws": int((white == 0).sum()), "losses": int((white < 0).sum()),
+            "longest": max(int(np.abs(data).max()) - 1, 0)}
+
+
+def _exhausted(indices, side, plies, exit_key, decided, losses):
+    """
+    Settle positions whose moves inside the table all lose, the slowest in plies: the best
+    capture or promotion decides whether they are lost, drawn or, if it wins, left to its win.
+    """
+    keys = exit_key[side][indices]
+    draws = keys == 150
+    decided[side][indices[draws]] = True
+    lost = keys < 150
+    # A losing exit may hold out longer than the moves inside the table
+    lost_plies = np.maximum(plies, np.where(keys > 0, keys.astype(np.int64) - 1, 0))[lost]
+    for loss in np.unique(lost_plies):
+        losses[int(loss)].append((side, indices[lost][lost_plies == loss]))
+
+
+def generate(names=None, directory=TABLEBASE_DIR, force=False):
+    """
+    Generate tables together with every table they depend on.
+    :param names: Table names, default all tables with up to MAX_PIECES pieces.
+    :param force: Regenerate tables that already exist.
+    """
+    wanted = set()
+    pending = list(names or all_tables())
+    while pending:
+        name = signature(*canonical(*parse_signature(pending.pop()))[:2])
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(dependencies(name))
+
+    for name in sorted(wanted, key=_generation_order):
+        path = os.path.join(directory, name + ".npy")
+        if _is_current(path, name) and not force:
+            continue
+        start = time.perf_counter()
+        stats = generate_table(name, directory)
+        print(f"{name}: {stats['wins']} wins, {stats['draws']} draws, {stats['losses']} losses with White to move, "
+              f"longest mate {stats['longest']} plies ({time.perf_counter() - start:.1f}s)")
+
+
+def _is_current(path, name):
+    """
+    True if the table file exists and has the layout of this version, not an older one.
+    """
+    return os.path.exists(path) and np.load(path, mmap_mode="r").shape == (2, table_size(table_pieces(name)))
+
+
+class Tablebase:
+    max_pieces = MAX_PIECES
+
+    def __init__(self, directory=TABLEBASE_DIR):
+        """
+        :param directory: Directory of .npy tables written by generate().
+        """
+        self.directory = directory
+        self._tables = {}  # Name -> memory-mapped table, or None when the file is missing
+        self._materials = {}  # Sorted (is_white, kind) pairs -> (table, colors flipped)
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        """
+        The table for a name, memory-mapped on first use, or None if it was not generated.
+        """
+        if name not in self._tables:
+            with self._lock:
+                path = os.path.join(self.directory, name + ".npy")
+                # A plain ndarray view of the mapping skips np.memmap's per-access overhead
+                self._tables[name] = np.load(path, mmap_mode="r").view(np.ndarray) if _is_current(path, name) else None
+        return self._tables[name]
+
+    def probe(self, pieces, white_to_move):
+        """
+        Look up a position without castling rights or an en passant capture.
+        :param pieces: (is_white, kind, square) of every piece, kings included, with squares
+                       numbered a1 = 0.
+        :param white_to_move: Side to move.
+        :return: Table value for the side to move (see the module docstring), or None when the
+                 position has too many pieces or its table was not generated.
+        """
+        if len(pieces) > MAX_PIECES:
+            return None
+        if len(pieces) == 2:
+            return DRAW  # Bare kings
+        material = tuple(sorted((is_white, kind) for is_white, kind, _ in pieces))
+        entry = self._materials.get(material)
+        if entry is None:
+            white = [kind for is_white, kind in material if is_white and kind != KING]
+            black = [kind for is_white, kind in material if not is_white and kind != KING]
+            white, black, flipped = canonical(white, black)
+            pawnless = PAWN not in white + black
+            entry = self._materials[material] = (self.table(signature(white, black)), flipped, pawnless)
+        table, flipped, pawnless = entry
+        if table is None:
+            return None
+        if flipped:
+            pieces = [(not is_white, kind, square ^ 56) for is_white, kind, square in pieces]
+            white_to_move = not white_to_move
+        pieces = sorted(pieces, key=lambda piece: (piece[1] != KING, not piece[0], -piece[1]))
+        squares = [square for _, _, square in pieces]
+        # _normalize on plain ints
+        if squares[0] & 7 >= 4:
+            squares = [square ^ 7 for square in squares]
+        if pawnless:
+            if squares[0] >= 32:
+                squares = [square ^ 56 for square in squares]
+            if squares[0] >> 3 > squares[0] & 7:
+                squares = [(square & 7) << 3 | square >> 3 for square in squares]
+        return int(table[0 if white_to_move else 1, position_index(squares, pawnless)])
+
+
+_tablebases = {}
+_tablebases_lock = threading.Lock()
+
+
+def get_tablebase(directory=TABLEBASE_DIR):
+    """
+    The Tablebase for a directory, opened once per process and shared.
+    :return: The tablebase, or None when the directory does not exist. A missing directory is
+             remembered as well, so tables generated later need a new process.
+    """
+    if directory in _tablebases:
+        return _tablebases[directory]
+    path = os.path.abspath(directory)
+    with _tablebases_lock:
+        if path not in _tablebases:
+            _tablebases[path] = Tablebase(path) if os.path.isdir(path) else None
+        _tablebases[directory] = _tablebases[path]
+        return _tablebases[path]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate endgame tablebases by retrograde analysis.")
+    parser.add_argument("tables", nargs="*", help="Table names such as KQvKR, default every 3- and 4-piece table")
+    parser.add_argument("--output", default=TABLEBASE_DIR, help="Directory the .npy tables are written to")
+    parser.add_argument("--force", action="store_true", help="Regenerate tables that already exist")
+    args = parser.parse_args()
+    generate(args.tables, args.output, args.force)
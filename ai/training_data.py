@@ -0,0 +1,113 @@
+"""
+Out-of-core training input: memory-mapped position shards streamed through tf.data.
+
+Shards written by ai/data_preprocessing.py are opened with np.load(mmap_mode="r"), so only the
+blocks being read are paged in. Each epoch visits the blocks in a new random order, reads them in
+parallel, mixes their positions in a shuffle buffer and unpacks the bitboards batch by batch.
+"""
+import numpy as np
+
+from ai.packed_positions import PLANES, shard_paths, unpack_planes
+
+BLOCK_SIZE = 4096  # Consecutive records read from a shard at a time
+SHUFFLE_BUFFER = 65536  # Positions mixed across blocks
+
+# How a record's visit count becomes its sample weight. Visits measure how much the averaged label
+# can be trusted, but weighting by raw counts would let the opening positions dominate again.
+SAMPLE_WEIGHTS = {
+    "none": None,
+    "visits": lambda visits: visits,
+    "sqrt": np.sqrt,
+    "log": lambda visits: 1 + np.log(visits),
+}
+
+
+class PositionShards:
+    def __init__(self, data_dir, block_size=BLOCK_SIZE):
+        """
+        :param data_dir: Directory of shard_NNNNN.npy files.
+        :param block_size: Records per read. Larger blocks mean fewer, more sequential reads but
+                           coarser shuffling before the shuffle buffer.
+        """
+        self.paths = shard_paths(data_dir)
+        if not self.paths:
+            raise FileNotFoundError(f"No position shards in {data_dir}; run ai/data_preprocessing.py first")
+        self.shards = [np.load(path, mmap_mode="r") for path in self.paths]
+        self.block_size = block_size
+        # (shard index, first record) for every block
+        self.blocks = [(index, start) for index, shard in enumerate(self.shards)
+                       for start in range(0, len(shard), block_size)]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+    def block_length(self, block):
+        shard, start = self.blocks[block]
+        return min(self.block_size, len(self.shards[shard]) - start)
+
+    def split(self, validation_fraction):
+        """
+        Hold out the last blocks for validation.
+        :return: (training block indices, validation block indices)
+        """
+        cut = len(self.blocks) - int(round(len(self.blocks) * validation_fraction))
+        if validation_fraction > 0 and cut == len(self.blocks) and len(self.blocks) > 1:
+            cut -= 1  # Keep at least one validation block
+        blocks = list(range(len(self.blocks)))
+        return blocks[:cut], blocks[cut:]
+
+    def read_block(self, block, sample_weight="none"):
+        """
+        Copy one block out of its memory-mapped shard.
+        :param sample_weight: Key of SAMPLE_WEIGHTS deciding how visit counts become weights.
+        :return: (uint64 (n, 12) packed planes, float32 (n,) labels, float32 (n,) sample weights)
+        """
+        shard, start = self.blocks[int(block)]
+        records = self.shards[shard][start:start + self.block_size]
+        weight = SAMPLE_WEIGHTS[sample_weight]
+        if weight is None:
+            weights = np.ones(len(records), dtype=np.float32)
+        else:
+            weights = weight(records["visits"].astype(np.float32)).astype(np.float32)
+        return np.ascontiguousarray(records["planes"]), records["label"].astype(np.float32), weights
+
+    def dataset(self, blocks, batch_size, shuffle=True, shuffle_buffer=SHUFFLE_BUFFER, sample_weight="none"):
+        """
+        Build a tf.data pipeline over the given blocks.
+        :param blocks: Block indices to read, e.g. one half of split().
+        :param shuffle: Shuffle block order and positions every epoch.
+        :param sample_weight: Key of SAMPLE_WEIGHTS. Anything but 'none' adds per-sample weights
+                              derived from each position's visit count.
+        :return: tf.data.Dataset of (float32 (batch, 8, 8, 12), float32 (batch,)) batches, with a
+                 third float32 (batch,) weight element when sample weights are used.
+        """
+        import tensorflow as tf
+
+        if sample_weight not in SAMPLE_WEIGHTS:
+            raise ValueError(f"Unknown sample weight: {sample_weight}")
+        weighted = SAMPLE_WEIGHTS[sample_weight] is not None
+
+        def read(block):
+            planes, labels, weights = tf.numpy_function(
+                lambda index: self.read_block(index, sample_weight), [block], (tf.uint64, tf.float32, tf.float32),
+            )
+            planes.set_shape((None, PLANES))
+            labels.set_shape((None,))
+            weights.set_shape((None,))
+            return planes, labels, weights
+
+        def unpack(planes, labels, weights):
+            x = tf.numpy_function(unpack_planes, [planes], tf.float32)
+            x.set_shape((None, 8, 8, 12))
+            if weighted:
+                return x, labels, weights
+            return x, labels
+
+        dataset = tf.data.Dataset.from_tensor_slices(np.asarray(blocks, dtype=np.int64))
+        if shuffle:
+            dataset = dataset.shuffle(len(blocks), reshuffle_each_iteration=True)
+        dataset = dataset.map(read, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle).unbatch()
+        if shuffle:
+            dataset = dataset.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+        dataset = dataset.batch(batch_size).map(unpack, num_parallel_calls=tf.data.AUTOTUNE)
+        return dataset.prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,136 @@
+"""
+Fixed-size transposition table keyed by Board.zobrist_hash.
+
+Entries live in three preallocated arrays (key, packed data, score), so the memory used is
+fixed by the size given at construction and never grows during a search.
+"""
+from array import array
+from collections import namedtuple
+
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+ENTRY_BYTES = 24  # 8-byte key + 8-byte packed depth/bound/move/generation + 8-byte score
+REPLACEMENT_POLICIES = ("depth", "always")
+
+PROMOTION_CODES = {"n": 1, "b": 2, "r": 3, "q": 4}
+PROMOTION_SYMBOLS = {code: symbol for symbol, code in PROMOTION_CODES.items()}
+
+# Packed data layout: depth (8 bits) | bound (2) | move (15) | generation (8) | occupied flag (1)
+_BOUND_SHIFT = 8
+_MOVE_SHIFT = 10
+_GENERATION_SHIFT = 25
+_OCCUPIED = 1 << 33
+
+TTEntry = namedtuple("TTEntry", ["depth", "bound", "move", "score"])
+
+
+def encode_move(move):
+    """
+    Pack a Board move ((row, col), (row, col)[, promotion]) into 15 bits.
+    """
+    if move is None:
+        return 0
+    start, end = move[0], move[1]
+    code = start[0] * 8 + start[1] | (end[0] * 8 + end[1]) << 6
+    if len(move) > 2:
+        code |= PROMOTION_CODES[move[2]] << 12
+    return code
+
+
+def decode_move(code):
+    """
+    Unpack a move stored by encode_move. Code 0 (a8 to a8) means no move.
+    """
+    if not code:
+        return None
+    start = divmod(code & 63, 8)
+    end = divmod(code >> 6 & 63, 8)
+    promotion = code >> 12
+    if promotion:
+        return start, end, PROMOTION_SYMBOLS[promotion]
+    return start, end
+
+
+class TranspositionTable:
+    def __init__(self, memory_mb=16, replacement="depth"):
+        """
+        :param memory_mb: Memory budget in megabytes. The table holds the largest power-of-two number
+                          of entries that fits.
+        :param replacement: 'depth' keeps the deeper entry unless the stored one is from an earlier
+                            search; 'always' overwrites on every store.
+        """
+        if replacement not in REPLACEMENT_POLICIES:
+            raise ValueError(f"Unknown replacement policy: {replacement}")
+        entries = max(1, int(memory_mb * 1024 * 1024) // ENTRY_BYTES)
+        self.capacity = 1 << (entries.bit_length() - 1)
+        self.mask = self.capacity - 1
+        self.replacement = replacement
+        self.keys = array("Q", bytes(8 * self.capacity))
+        self.data = array("Q", bytes(8 * self.capacity))
+        self.scores = array("d", bytes(8 * self.capacity))
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    @property
+    def memory_bytes(self):
+        return self.capacity * ENTRY_BYTES
+
+    def new_search(self):
+        """
+        Mark the start of a new search so entries from older searches become preferred victims.
+        """
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        for table in (self.keys, self.data, self.scores):
+            table[:] = array(table.typecode, bytes(8 * self.capacity))
+        self.generation = 0
+
+    def probe(self, key):
+        """
+        Look up a position.
+        :return: TTEntry or None if the position is not stored.
+        """
+        self.probes += 1
+        index = key & self.mask
+        data = self.data[index]
+        if not data & _OCCUPIED or self.keys[index] != key:
+            return None
+        self.hits += 1
+        return TTEntry(
+            data & 0xFF, data >> _BOUND_SHIFT & 3, decode_move(data >> _MOVE_SHIFT & 0x7FFF), self.scores[index],
+        )
+
+    def store(self, key, depth, bound, move, score):
+        """
+        Store a search result, subject to the replacement policy.
+        :param depth: Remaining depth the score was searched to.
+        :param bound: EXACT, LOWER_BOUND (score >= value) or UPPER_BOUND (score <= value).
+        :param move: Best move found, or None.
+        """
+        index = key & self.mask
+        old = self.data[index]
+        if self.replacement == "depth" and old & _OCCUPIED and self.keys[index] != key:
+            same_search = (old >> _GENERATION_SHIFT & 0xFF) == self.generation
+            if same_search and (old & 0xFF) > depth:
+                return
+        self.stores += 1
+        self.keys[index] = key
+        self.scores[index] = score
+        self.data[index] = (
+            min(depth, 0xFF) | bound << _BOUND_SHIFT | encode_move(move) << _MOVE_SHIFT |
+            self.generation << _GENERATION_SHIFT | _OCCUPIED
+        )
+
+    def hashfull(self, sample=1000):
+        """
+        Permille of sampled slots filled by the current search.
+        """
+        sample = min(sample, self.capacity)
+        used = 0
+        for index in range(sample):
+            data = self.data[index]
+            if data & _OCCUPIED and (data >> _GENERATION_SHIFT & 0xFF) == self.generation:
+                used += 1
+        return used * 1000 // sample
@@ -0,0 +1,68 @@
+"""
+Compare per-move and batched model evaluation in Board.make_ai_move.
+
+Run from the project root:
+    python -m benchmarks.ai_move_benchmark
+"""
+import time
+
+import numpy as np
+
+from logic.board import Board
+
+# Opening moves (start, end) played before timing, so Black has a realistic number of replies.
+OPENING = [
+    ((6, 4), (4, 4)),  # e4
+    ((1, 4), (3, 4)),  # e5
+    ((7, 6), (5, 5)),  # Nf3
+    ((0, 1), (2, 2)),  # Nc6
+    ((7, 5), (4, 2)),  # Bc4
+    ((0, 6), (2, 5)),  # Nf6
+    ((6, 3), (5, 3)),  # d3
+]
+REPEATS = 5
+
+
+def time_call(fn, repeats=REPEATS):
+    """
+    Run fn several times and return (best seconds, last result).
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    # Time the model itself, not cache hits, book moves or tablebase lookups
+    board = Board(eval_cache_size=0, opening_book=None, tablebase=None)
+    if not board.model:
+        print("Model not available; train it with ai/model_training.py first.")
+        return
+
+    for start, end in OPENING:
+        board.move_piece(start, end)
+
+    moves = board.legal_moves("black")
+    print(f"Scoring {len(moves)} candidate moves for Black...")
+
+    # Warm up both paths so graph tracing is not part of the measurement
+    board.score_moves_batched(moves)
+    board.score_moves_sequential(moves[:1])
+
+    sequential_time, sequential_scores = time_call(lambda: board.score_moves_sequential(moves))
+    batched_time, batched_scores = time_call(lambda: board.score_moves_batched(moves))
+
+    max_diff = float(np.max(np.abs(np.asarray(sequential_scores) - batched_scores)))
+    print(f"Per-move predict: {sequential_time * 1000:8.1f} ms")
+    print(f"Batched forward:  {batched_time * 1000:8.1f} ms")
+    print(f"Speedup:          {sequential_time / batched_time:8.1f}x")
+    print(f"Max score difference: {max_diff:.2e}")
+    print(f"Same choice: {np.argmin(sequential_scores) == np.argmin(batched_scores)}")
+
+
+if __name__ == "__main__":
+    main()
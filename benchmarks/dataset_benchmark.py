@@ -0,0 +1,43 @@
+"""
+Measure the throughput of the memory-mapped tf.data training input pipeline.
+
+Run from the project root after ai/data_preprocessing.py:
+    python -m benchmarks.dataset_benchmark
+    python -m benchmarks.dataset_benchmark --data ai/processed_data --batches 500
+"""
+import argparse
+import resource
+import time
+
+from ai.model_training import DATA_DIR, BATCH_SIZE
+from ai.training_data import PositionShards
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--batches", type=int, default=1000)
+    args = parser.parse_args()
+
+    shards = PositionShards(args.data)
+    train_blocks, _ = shards.split(0)
+    dataset = shards.dataset(train_blocks, args.batch_size)
+    print(f"{len(shards)} positions in {len(shards.paths)} shards, {len(shards.blocks)} blocks")
+
+    iterator = iter(dataset.repeat())
+    next(iterator)  # Build the pipeline before timing
+    start = time.perf_counter()
+    positions = 0
+    for _ in range(args.batches):
+        x, y = next(iterator)
+        positions += len(y)
+    elapsed = time.perf_counter() - start
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{positions} positions in {elapsed:.2f}s: {positions / elapsed:,.0f} positions/s, "
+          f"batch shape {tuple(x.shape)}, peak RSS {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Check the direct board encoder against fen_to_matrix and time both paths.
+
+Run from the project root:
+    python -m benchmarks.encoding_benchmark
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.positions import benchmark_positions
+
+
+def fen_candidates(board, moves):
+    """
+    Reference candidate batch built through get_fen and fen_to_matrix.
+    """
+    batch = []
+    for move in moves:
+        board.push(move)
+        batch.append(board.fen_to_matrix(board.get_fen()))
+        board.pop()
+    return np.array(batch)
+
+
+def main():
+    positions = 0
+    candidates = 0
+    fen_time = 0.0
+    direct_time = 0.0
+
+    for board in benchmark_positions():
+        moves = board.legal_moves(board.current_turn)
+        if not moves:
+            continue
+
+        if not np.array_equal(board.to_matrix(), board.fen_to_matrix(board.get_fen())):
+            print(f"Mismatch in position encoding: {board.get_fen()}")
+            sys.exit(1)
+
+        start = time.perf_counter()
+        expected = fen_candidates(board, moves)
+        fen_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = board.candidate_matrices(moves)
+        direct_time += time.perf_counter() - start
+
+        if actual.dtype != np.float32 or not np.array_equal(actual, expected):
+            print(f"Mismatch in candidate encoding: {board.get_fen()}")
+            sys.exit(1)
+
+        positions += 1
+        candidates += len(moves)
+
+    print(f"Parity OK on {positions} positions / {candidates} candidate moves.")
+    print(f"FEN round-trip: {fen_time * 1e6 / candidates:8.1f} us per candidate")
+    print(f"Direct encoder: {direct_time * 1e6 / candidates:8.1f} us per candidate")
+    print(f"Speedup:        {fen_time / direct_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
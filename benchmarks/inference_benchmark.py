@@ -0,0 +1,80 @@
+"""
+Compare evaluation latency and throughput of the Keras model, its TFLite conversions and the
+NumPy forward pass.
+
+Run from the project root (converts the model first if the .tflite files are missing):
+    python -m benchmarks.inference_benchmark
+    python -m benchmarks.inference_benchmark --batch-sizes 1 32 --no-int8
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from ai.model_inference import (
+    MODEL_PATH, TFLITE_INT8_PATH, TFLITE_PATH, NumpyEvaluator, TFLiteEvaluator, calibration_positions,
+    convert_model,
+)
+from ai.model_loader import ModelLoader
+
+BATCH_SIZES = [1, 8, 32, 256]
+MIN_SECONDS = 0.5  # Minimum timing window per backend and batch size
+
+
+def time_batches(evaluate, batch, min_seconds=MIN_SECONDS):
+    """
+    Call evaluate(batch) repeatedly for at least min_seconds.
+    :return: Median seconds per call.
+    """
+    evaluate(batch)  # Warm up: graph tracing, tensor allocation
+    timings = []
+    deadline = time.perf_counter() + min_seconds
+    while time.perf_counter() < deadline or len(timings) < 5:
+        start = time.perf_counter()
+        evaluate(batch)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--no-int8", action="store_true", help="Skip the int8 quantized model")
+    args = parser.parse_args()
+
+    if not os.path.exists(MODEL_PATH):
+        print("Model not available; train it with ai/model_training.py first.")
+        return
+    if not os.path.exists(TFLITE_PATH):
+        convert_model()
+    if not args.no_int8 and not os.path.exists(TFLITE_INT8_PATH):
+        convert_model(quantize=True)
+
+    backends = [
+        ("keras", ModelLoader(MODEL_PATH).predict),
+        ("numpy", NumpyEvaluator(MODEL_PATH).evaluate_batch),
+        ("tflite", TFLiteEvaluator(TFLITE_PATH).evaluate_batch),
+    ]
+    if not args.no_int8:
+        backends.append(("tflite-int8", TFLiteEvaluator(TFLITE_INT8_PATH).evaluate_batch))
+
+    positions = calibration_positions(data_dir="", count=max(args.batch_sizes + [1000]), seed=1)
+    reference = backends[0][1](positions[:1000])
+    for name, evaluate in backends[1:]:
+        diff = np.abs(evaluate(positions[:1000]) - reference)
+        print(f"{name:<12} vs keras: max |diff| {diff.max():.2e}, mean |diff| {diff.mean():.2e}")
+    for path in (TFLITE_PATH, TFLITE_INT8_PATH) if not args.no_int8 else (TFLITE_PATH,):
+        print(f"{os.path.basename(path)}: {os.path.getsize(path) / 1024:.0f} KB "
+              f"(h5: {os.path.getsize(MODEL_PATH) / 1024:.0f} KB)")
+
+    print(f"\n{'backend':<12} {'batch':>6} {'ms/call':>9} {'positions/s':>12}")
+    for batch_size in args.batch_sizes:
+        batch = positions[:batch_size]
+        for name, evaluate in backends:
+            seconds = time_batches(evaluate, batch)
+            print(f"{name:<12} {batch_size:>6} {seconds * 1000:>9.3f} {batch_size / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Check the vectorized batch legality checker against Board and compare their throughput.
+
+Legal-move masks, in-check flags and mobility must agree with Board.legal_moves and
+Board.is_in_check on every benchmark position, then on positions from longer random games.
+
+Most of the gain is in the check + mobility mode, which skips the 64x64 move masks
+(about 40-50x Board's throughput here). Building the full masks is only 2-3x faster
+than Board, so the larger figure does not apply to mask generation.
+
+Run from the project root:
+    python -m benchmarks.legality_benchmark
+    python -m benchmarks.legality_benchmark --games 500
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.positions import benchmark_positions, random_positions
+from logic.batch_legality import batch_legality, board_arrays
+from logic.bitboard import square_from_position
+
+
+def board_reference(boards):
+    """
+    :return: (masks, in-check flags, mobility) computed one position at a time with Board, and the seconds it took.
+    """
+    masks = np.zeros((len(boards), 64, 64), dtype=bool)
+    in_check = np.zeros(len(boards), dtype=bool)
+    mobility = np.zeros(len(boards), dtype=np.int64)
+    start = time.perf_counter()
+    for index, board in enumerate(boards):
+        moves = board.legal_moves(board.current_turn)
+        in_check[index] = board.is_in_check(board.current_turn)
+        mobility[index] = len(moves)
+        for move in moves:
+            masks[index, square_from_position(move[0]), square_from_position(move[1])] = True
+    return masks, in_check, mobility, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=200, help="Random games added to the benchmark positions")
+    parser.add_argument("--plies", type=int, default=80)
+    args = parser.parse_args()
+
+    # benchmark_positions() reuses one Board per game, so keep a copy of each position
+    boards = [board.copy() for board in benchmark_positions()]
+    boards += [board.copy() for board in random_positions(games=args.games, plies=args.plies, seed=99)]
+    masks, in_check, mobility, board_seconds = board_reference(boards)
+
+    arrays = board_arrays(boards)
+    start = time.perf_counter()
+    result = batch_legality(*arrays)
+    batch_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    batch_legality(*arrays, masks=False)
+    counts_seconds = time.perf_counter() - start
+
+    for index, board in enumerate(boards):
+        if not (np.array_equal(result.masks[index], masks[index]) and result.in_check[index] == in_check[index]
+                and result.mobility[index] == mobility[index]):
+            extra = list(zip(*np.nonzero(result.masks[index] & ~masks[index])))
+            missing = list(zip(*np.nonzero(masks[index] & ~result.masks[index])))
+            print(f"Mismatch in {board.get_fen()}: in check {result.in_check[index]} vs {in_check[index]}, "
+                  f"mobility {result.mobility[index]} vs {mobility[index]}, extra {extra}, missing {missing}")
+            sys.exit(1)
+
+    count = len(boards)
+    print(f"Batch results agree with Board on {count} positions ({int(mobility.sum())} moves, "
+          f"{int(in_check.sum())} in check).")
+    print(f"Board, one at a time:     {count / board_seconds:>10,.0f} positions/s")
+    print(f"Batch, with move masks:   {count / batch_seconds:>10,.0f} positions/s "
+          f"({board_seconds / batch_seconds:.1f}x)")
+    print(f"Batch, check + mobility:  {count / counts_seconds:>10,.0f} positions/s "
+          f"({board_seconds / counts_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
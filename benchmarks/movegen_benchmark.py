@@ -0,0 +1,47 @@
+"""
+Compare the bitboard move generator with the piece-class generator.
+
+Both generators must produce the same set of moves for every reference position.
+
+Run from the project root:
+    python -m benchmarks.movegen_benchmark
+"""
+import sys
+import time
+
+from benchmarks.positions import benchmark_positions
+
+
+def main():
+    positions = 0
+    moves = 0
+    pieces_time = 0.0
+    bitboard_time = 0.0
+
+    for board in benchmark_positions():
+        color = board.current_turn
+        start = time.perf_counter()
+        expected = board.legal_moves_pieces(color)
+        pieces_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = board.legal_moves_bitboard(color)
+        bitboard_time += time.perf_counter() - start
+
+        if set(actual) != set(expected):
+            print(f"Move lists differ for {color} in {board.get_fen()}")
+            print(f"  pieces only:   {sorted(set(expected) - set(actual))}")
+            print(f"  bitboard only: {sorted(set(actual) - set(expected))}")
+            sys.exit(1)
+
+        positions += 1
+        moves += len(expected)
+
+    print(f"Move lists agree on {positions} positions ({moves} moves).")
+    print(f"Piece classes: {pieces_time * 1000 / positions:8.2f} ms per position")
+    print(f"Bitboards:     {bitboard_time * 1000 / positions:8.2f} ms per position")
+    print(f"Speedup:       {pieces_time / bitboard_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
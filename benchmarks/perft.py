@@ -0,0 +1,50 @@
+"""
+Perft correctness and throughput benchmark for Board move generation.
+
+Counts the leaf nodes of the legal move tree for standard test positions, compares them with
+the published reference values and reports nodes per second.
+
+Run from the project root:
+    python -m benchmarks.perft                      # bitboard generator, default depths
+    python -m benchmarks.perft --generator pieces --max-depth 2
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.positions import PERFT_POSITIONS
+from logic.board import Board
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--generator", choices=Board.MOVE_GENERATORS, default="bitboard")
+    parser.add_argument("--max-depth", type=int, default=3)
+    parser.add_argument("--position", action="append", help="Only run the named position(s)")
+    args = parser.parse_args()
+
+    board = Board(move_generator=args.generator, preload_model=False)
+    failures = 0
+
+    print(f"{'position':<10} {'depth':>5} {'nodes':>10} {'expected':>10} {'seconds':>8} {'nps':>10}")
+    for name, fen, expected in PERFT_POSITIONS:
+        if args.position and name not in args.position:
+            continue
+        for depth, expected_nodes in enumerate(expected[:args.max_depth], start=1):
+            board.set_fen(fen)
+            start = time.perf_counter()
+            nodes = board.perft(depth)
+            elapsed = time.perf_counter() - start
+
+            status = "" if nodes == expected_nodes else "  MISMATCH"
+            failures += nodes != expected_nodes
+            print(f"{name:<10} {depth:>5} {nodes:>10} {expected_nodes:>10} {elapsed:>8.2f} "
+                  f"{nodes / elapsed:>10.0f}{status}")
+
+    if failures:
+        print(f"{failures} perft mismatch(es).")
+        sys.exit(1)
+    print("All perft counts match.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Shared position sources for the benchmark scripts.
+"""
+import random
+
+from logic.board import Board
+
+GAMES = 10
+PLIES_PER_GAME = 40
+SEED = 1234
+
+# (name, FEN, reference node counts for depth 1, 2, ...)
+PERFT_POSITIONS = [
+    ("start", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def random_positions(games=GAMES, plies=PLIES_PER_GAME, seed=SEED):
+    """
+    Yield boards reached by random legal play from the starting position.
+    """
+    rng = random.Random(seed)
+    for _ in range(games):
+        board = Board(preload_model=False)
+        for _ in range(plies):
+            moves = board.legal_moves(board.current_turn)
+            if not moves:
+                break
+            board.move_piece(*rng.choice(moves))
+            yield board
+
+
+def reference_positions():
+    """
+    Yield a board for each standard perft position, followed by every position one move later.
+    These cover castling, en passant, promotions and pins that random play rarely reaches.
+    """
+    for _, fen, _ in PERFT_POSITIONS:
+        board = Board(preload_model=False)
+        board.set_fen(fen)
+        yield board
+        for move in board.legal_moves(board.current_turn):
+            board.push(move)
+            yield board
+            board.pop()
+
+
+def benchmark_positions():
+    """
+    Yield the random-play positions followed by the reference positions.
+    """
+    yield from random_positions()
+    yield from reference_positions()
@@ -0,0 +1,69 @@
+"""
+Measure the alpha-beta search: depth reached, nodes and time per position.
+
+Run from the project root:
+    python -m benchmarks.search_benchmark
+    python -m benchmarks.search_benchmark --evaluator model --depth 3 --time-limit 5
+    python -m benchmarks.search_benchmark --evaluator model --depth 3 --eval-cache 0
+    python -m benchmarks.search_benchmark --profile search_profile.json
+"""
+import argparse
+
+from ai import instrumentation
+from ai.search import MATE_SCORE, MaterialEvaluator, ModelEvaluator, Search
+from logic.board import Board
+
+POSITIONS = [
+    ("after 1.e4", "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"),
+    ("italian", "r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    ("back rank mate", "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--evaluator", choices=("material", "model"), default="material")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--time-limit", type=float, default=None)
+    parser.add_argument("--eval-cache", type=int, default=100000,
+                        help="Evaluation cache entries for the model evaluator (0 disables it)")
+    parser.add_argument("--profile", default=None, metavar="PATH",
+                        help="Instrument the searches and write per-move reports to a JSON file")
+    args = parser.parse_args()
+
+    board = Board(eval_cache_size=args.eval_cache)
+    if args.evaluator == "model" and not board.model:
+        print("Model not available; train it with ai/model_training.py first.")
+        return
+    evaluator = ModelEvaluator() if args.evaluator == "model" else MaterialEvaluator()
+
+    if args.profile:
+        instrumentation.enable()
+    print(f"{'position':<16} {'depth':>5} {'nodes':>8} {'seconds':>8} {'nps':>8} {'tt hit':>7} {'score':>8}  best move")
+    for name, fen in POSITIONS:
+        board.set_fen(fen)
+        search = Search(board, evaluator, max_depth=args.depth, time_limit=args.time_limit)
+        result = search.run()
+        hit_rate = search.tt.hits / max(search.tt.probes, 1)
+        mate = "  (mate)" if abs(result.score) >= MATE_SCORE - args.depth else ""
+        print(f"{name:<16} {result.depth:>5} {result.nodes:>8} {result.elapsed:>8.2f} "
+              f"{result.nodes / result.elapsed:>8.0f} {hit_rate:>7.1%} {result.score:>8.3f}  {result.best_move}{mate}")
+
+    if args.evaluator == "model" and board.eval_cache is not None:
+        stats = board.eval_cache.stats()
+        print(f"eval cache: {stats['size']}/{stats['max_entries']} entries, {stats['hits']} hits, "
+              f"{stats['misses']} misses ({stats['hit_rate']:.1%} hit rate), {stats['evictions']} evictions")
+
+    if args.profile:
+        instrumentation.disable()
+        total = instrumentation.summary()
+        print(f"\n{'timer':<16} {'calls':>9} {'ms':>10} {'share':>7}")
+        for name, timer in sorted(total["timers"].items(), key=lambda item: -item[1]["total_ms"]):
+            print(f"{name:<16} {timer['calls']:>9} {timer['total_ms']:>10.1f} "
+                  f"{timer['total_ms'] / total['elapsed_ms']:>7.1%}")
+        instrumentation.export_json(args.profile)
+
+
+if __name__ == "__main__":
+    main()
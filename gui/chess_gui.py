@@ -1,17 +1,41 @@
+import logging
+import queue
+import threading
 import tkinter as tk
 from PIL import Image, ImageTk  # For resizing and displaying images
 from logic.board import Board
 
+POLL_INTERVAL_MS = 50  # How often the event loop checks whether the AI has finished
+RESULT_WINNERS = {"1-0": "White wins", "0-1": "Black wins"}
+
+logger = logging.getLogger(__name__)
+
 
 class ChessGUI:
-    def __init__(self, root):
+    def __init__(self, root, ai_depth=1, ai_time_limit=None):
+        """
+        :param root: Tk root window.
+        :param ai_depth: Plies the AI searches; 1 plays the best-scored reply directly.
+        :param ai_time_limit: Seconds the AI may think when ai_depth > 1, or None for no limit.
+        """
         self.root = root
         self.root.title("Chess Game")
+        self.ai_depth = ai_depth
+        self.ai_time_limit = ai_time_limit
 
         # Create the chessboard
         self.canvas = tk.Canvas(root, width=800, height=800)
         self.canvas.pack()
 
+        # Status line with the thinking indicator and a button to cancel the AI
+        status_bar = tk.Frame(root)
+        status_bar.pack(fill=tk.X)
+        self.status = tk.Label(status_bar, text="White to move", anchor="w")
+        self.status.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.cancel_button = tk.Button(status_bar, text="Cancel", command=self.cancel_ai_move, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT, padx=5, pady=2)
+        self.root.bind("<Escape>", lambda event: self.cancel_ai_move())
+
         # Load piece images
         self.piece_images = {}
         self.load_images()
@@ -23,6 +47,13 @@ class ChessGUI:
         self.selected_piece = None
         self.selected_pos = None
 
+        # AI worker state. The worker thread owns self.board while thinking is True, so the event
+        # loop must not read or change the board until the result has been collected.
+        self.thinking = False
+        self.ai_stop = threading.Event()  # Set to cancel the move being chosen
+        self.ai_results = queue.Queue()
+        self._thinking_ticks = 0
+
         # Draw the board and pieces
         self.draw_board()
         self.draw_pieces()
@@ -69,21 +100,24 @@ class ChessGUI:
                     self.canvas.create_image(x, y, image=self.piece_images[image_key], tags="piece")
 
     def on_click(self, event):
+        if self.thinking:
+            return  # Input is blocked while the AI is thinking
         col, row = event.x // 100, event.y // 100
         piece = self.board.board[row][col]
 
         if piece and piece.color == self.board.current_turn:
             self.selected_piece = piece
             self.selected_pos = (row, col)
-            print(f"{self.board.current_turn.capitalize()} selected {piece.__class__.__name__} at {self.selected_pos}")
+            logger.info("%s selected %s at %s", self.board.current_turn.capitalize(), piece.__class__.__name__,
+                        self.selected_pos)
         else:
-            print(f"Invalid selection: It's {self.board.current_turn.capitalize()}'s turn.")
+            logger.info("Invalid selection: It's %s's turn.", self.board.current_turn.capitalize())
 
     def on_drag(self, event):
         """
         Drag the selected piece visually.
         """
-        if self.selected_piece:
+        if self.selected_piece and not self.thinking:
             self.canvas.delete("drag_piece")
             image_key = f"{self.selected_piece.color}_{self.selected_piece.__class__.__name__.lower()}"
             self.canvas.create_image(event.x, event.y, image=self.piece_images[image_key], tags="drag_piece")
@@ -92,8 +126,9 @@ class ChessGUI:
         """
         Handle dropping the piece on a new square.
         """
-        if not self.selected_piece:
+        if not self.selected_piece or self.thinking:
             return
+        self.canvas.delete("drag_piece")
 
         # Determine the destination square
         end_col, end_row = event.x // 100, event.y // 100
@@ -101,23 +136,109 @@ class ChessGUI:
 
         # Attempt to move the piece
         if self.board.move_piece((start_row, start_col), (end_row, end_col)):
-            print(f"Moved {self.selected_piece.__class__.__name__} to {(end_row, end_col)}")
+            logger.info("Moved %s to %s", self.selected_piece.__class__.__name__, (end_row, end_col))
             self.draw_board()
             self.draw_pieces()
 
-            # AI makes a move after the player's move
-            if self.board.current_turn == "black":
-                if self.board.make_ai_move():
-                    self.draw_board()
-                    self.draw_pieces()
+            # AI makes a move after the player's move, without blocking the event loop
+            if not self.show_game_over() and self.board.current_turn == "black":
+                self.start_ai_move()
 
         else:
-            print("Invalid move. Try again.")
+            logger.info("Invalid move. Try again.")
 
         # Clear selection
         self.selected_piece = None
         self.selected_pos = None
 
+    def start_ai_move(self):
+        """
+        Start choosing the AI's move on a worker thread and poll for it from the event loop.
+        """
+        self.thinking = True
+        self.ai_stop = threading.Event()
+        self._thinking_ticks = 0
+        self.canvas.config(cursor="watch")
+        self.cancel_button.config(state=tk.NORMAL)
+        threading.Thread(target=self._think, args=(self.ai_stop,), daemon=True).start()
+        self.root.after(POLL_INTERVAL_MS, self._poll_ai_move)
+
+    def _think(self, stop_event):
+        """
+        Worker thread: choose the move and hand it back through the queue.
+        """
+        try:
+            self.ai_results.put(self.board.choose_ai_move(depth=self.ai_depth, time_limit=self.ai_time_limit,
+                                                          stop_event=stop_event))
+        except Exception as e:
+            self.ai_results.put(e)
+
+    def _poll_ai_move(self):
+        try:
+            result = self.ai_results.get_nowait()
+        except queue.Empty:
+            self._thinking_ticks += 1
+            dots = "." * (self._thinking_ticks // 5 % 4)
+            self.status.config(text=f"AI is thinking{dots}")
+            self.root.after(POLL_INTERVAL_MS, self._poll_ai_move)
+            return
+        self._finish_ai_move(result)
+
+    def _finish_ai_move(self, result):
+        """
+        Play (or discard) the AI's move on the event loop thread and unblock input.
+        :param result: The move chosen by Board.choose_ai_move, None, or the exception it raised.
+        """
+        self.thinking = False
+        self.canvas.config(cursor="")
+        self.cancel_button.config(state=tk.DISABLED)
+
+        if self.ai_stop.is_set():
+            # Take back the player's move so they can choose another one
+            self.board.pop()
+            self.status.config(text="AI cancelled. White to move")
+        elif isinstance(result, Exception):
+            logger.error("AI error: %s", result)
+            self.status.config(text=f"AI error: {result}")
+        elif result is None:
+            if not self.show_game_over():
+                self.status.config(text="AI cannot play: Model not loaded")
+        else:
+            self.board.move_piece(*result)
+            if not self.show_game_over():
+                self.status.config(text="White to move")
+
+        self.draw_board()
+        self.draw_pieces()
+
+    def show_game_over(self):
+        """
+        Show the result in the status line if the game has ended.
+        :return: True if the game is over.
+        """
+        outcome = self.board.outcome()
+        if outcome is None:
+            return False
+        result, reason = outcome
+        if reason == "checkmate":
+            text = f"Checkmate! {RESULT_WINNERS[result]}"
+        elif reason == "stalemate":
+            text = "Stalemate! The game is a draw"
+        else:
+            text = f"Draw by {reason}"
+        logger.info("Game over: %s", text)
+        self.status.config(text=text)
+        return True
+
+    def cancel_ai_move(self):
+        """
+        Ask the AI to stop choosing its move. The move is discarded and the player's last move undone.
+        """
+        if not self.thinking or self.ai_stop.is_set():
+            return
+        self.ai_stop.set()
+        self.status.config(text="Cancelling...")
+
 
 if __name__ == "__main__":
     root = tk.Tk()
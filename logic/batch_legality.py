@@ -0,0 +1,307 @@
+"""
+Vectorized legal move generation for many positions at once.
+
+batch_legality() takes N positions as bitboards (or model planes) and returns, for all of them
+together, a from/to legal move mask, an in-check flag and a mobility count. Every step works on
+whole uint64 arrays of length N ("set-wise"): the pieces of one kind are shifted together in
+one direction instead of being visited one by one, so the Python overhead is per direction and
+piece type, not per position or per move.
+
+Positions with Black to move are mirrored vertically (a byte swap of every bitboard) and their
+colors swapped, so the generator itself only ever produces White's moves; the masks are flipped
+back at the end. Legality follows the usual pin and check masks:
+    - a pinned piece may only move along the line of its pin,
+    - in single check non-king moves must capture the checker or block its ray,
+    - in double check only the king moves,
+    - the king may not step onto a square attacked with itself removed from the board,
+    - en passant is checked by recomputing slider attacks on the king after the capture.
+
+Squares follow logic.bitboard: a1 = 0, h8 = 63. Promotions appear once in the mask but count
+four times in mobility, matching len(Board.legal_moves()).
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from logic.bitboard import WHITE_KINGSIDE, WHITE_QUEENSIDE
+
+BatchLegality = namedtuple("BatchLegality", ["masks", "in_check", "mobility"])
+
+FULL = np.uint64(0xFFFFFFFFFFFFFFFF)
+FILE_A = 0x0101010101010101
+FILE_B = FILE_A << 1
+FILE_G = FILE_A << 6
+FILE_H = FILE_A << 7
+RANK_3 = np.uint64(0xFF << 16)
+RANK_8 = np.uint64(0xFF << 56)
+
+# Square offset and mask of squares a shifted piece may land on (no wrapping around the board)
+NORTH, SOUTH, EAST, WEST = (8, FULL), (-8, FULL), (1, np.uint64(~FILE_A & 0xFFFFFFFFFFFFFFFF)), \
+    (-1, np.uint64(~FILE_H & 0xFFFFFFFFFFFFFFFF))
+NORTH_EAST, NORTH_WEST = (9, EAST[1]), (7, WEST[1])
+SOUTH_EAST, SOUTH_WEST = (-7, EAST[1]), (-9, WEST[1])
+# Sliding directions with the index of their pin axis (0 file, 1 rank, 2 a1-h8 diagonal, 3 a8-h1 diagonal)
+ORTHOGONALS = ((NORTH, 0), (SOUTH, 0), (EAST, 1), (WEST, 1))
+DIAGONALS = ((NORTH_EAST, 2), (SOUTH_WEST, 2), (NORTH_WEST, 3), (SOUTH_EAST, 3))
+NOT_AB = np.uint64(~(FILE_A | FILE_B) & 0xFFFFFFFFFFFFFFFF)
+NOT_GH = np.uint64(~(FILE_G | FILE_H) & 0xFFFFFFFFFFFFFFFF)
+KNIGHT_JUMPS = (
+    (17, EAST[1]), (15, WEST[1]), (10, NOT_AB), (6, NOT_GH),
+    (-6, NOT_AB), (-10, NOT_GH), (-15, EAST[1]), (-17, WEST[1]),
+)
+KING_STEPS = (NORTH, SOUTH, EAST, WEST, NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST)
+
+# White's castling: (right, squares that must be empty, squares the king crosses, king target)
+CASTLING = (
+    (WHITE_KINGSIDE, np.uint64((1 << 5) | (1 << 6)), np.uint64((1 << 4) | (1 << 5) | (1 << 6)), 6, 7),
+    (WHITE_QUEENSIDE, np.uint64((1 << 1) | (1 << 2) | (1 << 3)), np.uint64((1 << 4) | (1 << 3) | (1 << 2)), 2, 0),
+)
+MIRROR = np.arange(64) ^ 56  # Square index after flipping the board vertically
+MASK_CHUNK = 256  # Positions per block when building move masks
+# Set bits of every byte value, for counting bits where np.bitwise_count (NumPy 2) is missing
+BYTE_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.int64)
+
+
+def _shift(bitboards, direction):
+    offset, landing = direction
+    if offset > 0:
+        return (bitboards << np.uint64(offset)) & landing
+    return (bitboards >> np.uint64(-offset)) & landing
+
+
+def _slide(origins, empty, direction):
+    """
+    Squares reached from origins along one direction, up to and including the first occupied square.
+    """
+    reached = np.zeros_like(origins)
+    current = origins
+    for _ in range(7):
+        current = _shift(current, direction)
+        reached |= current
+        current &= empty
+        if not current.any():
+            break
+    return reached
+
+
+def _bits(bitboards):
+    """
+    (N,) uint64 -> (N, 64) bool, bit n of each bitboard in column n.
+    """
+    return np.unpackbits(bitboards.astype("<u8").view(np.uint8).reshape(-1, 8), axis=1,
+                         bitorder="little").view(bool)
+
+
+def _popcount(bitboards):
+    """
+    (N,) uint64 -> (N,) int64 number of set bits.
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bitboards).astype(np.int64)
+    return BYTE_POPCOUNT[bitboards.astype("<u8").view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+
+def _from_planes(planes):
+    """
+    (N, 8, 8, 12) model planes -> (N, 12) uint64 bitboards.
+    """
+    planes = np.asarray(planes)
+    squares = (planes.reshape(len(planes), 64, 12) > 0.5).transpose(0, 2, 1)
+    return np.packbits(squares, axis=-1, bitorder="little").view("<u8")[..., 0].astype(np.uint64)
+
+
+def _mirror(bitboards):
+    """
+    Flip (N, 12) bitboards vertically and swap the colors, so Black becomes White.
+    """
+    flipped = bitboards.byteswap()
+    return np.concatenate([flipped[:, 6:], flipped[:, :6]], axis=1)
+
+
+class _MoveMask:
+    """
+    Collects set-wise moves by square offset (target minus origin) and counts them as they come.
+    """
+
+    def __init__(self, count):
+        self.count = count
+        self.targets = {}  # offset -> (N,) uint64 target squares
+        self.mobility = np.zeros(count, dtype=np.int64)
+
+    def add(self, targets, offset, promotion_rank=None):
+        """
+        Record moves whose origin is offset squares before each target square. A from/to pair
+        is only ever added once, so counts can be taken here.
+        """
+        if not targets.any():
+            return
+        moves = _popcount(targets)
+        if promotion_rank is not None:
+            moves += 3 * _popcount(targets & promotion_rank)
+        self.mobility += moves
+        previous = self.targets.get(offset)
+        self.targets[offset] = targets if previous is None else previous | targets
+
+    def masks(self):
+        """
+        :return: (N, 64, 64) bool array, [n, from, to].
+        """
+        out = np.empty((self.count, 64 * 64), dtype=bool)
+        scatter = [(np.arange(max(offset, 0), min(64, 64 + offset)), offset, targets)
+                   for offset, targets in self.targets.items()]
+        # Built square-major so each scatter writes contiguous rows, in chunks that stay in cache
+        for start in range(0, self.count, MASK_CHUNK):
+            end = min(start + MASK_CHUNK, self.count)
+            flags = np.zeros((64 * 64, end - start), dtype=bool)
+            for to_squares, offset, targets in scatter:
+                bits = np.unpackbits(targets[start:end].astype("<u8").view(np.uint8).reshape(-1, 8).T, axis=0,
+                                     bitorder="little").view(bool)
+                flags[(to_squares - offset) * 64 + to_squares] |= bits[to_squares]
+            out[start:end] = flags.T
+        return out.reshape(self.count, 64, 64)
+
+
+def batch_legality(positions, white_to_move=True, castling=0, ep_squares=None, masks=True):
+    """
+    Legal moves, check status and mobility of N positions.
+    :param positions: (N, 12) uint64 bitboards in model channel order (see ai/packed_positions.py),
+                      or (N, 8, 8, 12) model planes.
+    :param white_to_move: Bool or (N,) bools.
+    :param castling: Castling right bits (logic.bitboard), an int or (N,) array. Planes and packed
+                     bitboards do not record rights, so the default is no castling.
+    :param ep_squares: None, or (N,) en passant target squares with values outside 0-63 for none.
+    :param masks: Build the move masks. They take 4 KB per position; without them only the
+                  check flags and mobility are returned, and masks is None.
+    :return: BatchLegality of masks, a (N, 64, 64) bool array with masks[n, from, to] set for
+             every legal move; in_check, (N,) bool; and mobility, (N,) legal move counts.
+    """
+    positions = np.asarray(positions)
+    bitboards = _from_planes(positions) if positions.ndim == 4 else positions.astype(np.uint64).reshape(-1, 12)
+    count = len(bitboards)
+    black = ~np.broadcast_to(np.asarray(white_to_move, dtype=bool), (count,))
+    castling = np.broadcast_to(np.asarray(castling, dtype=np.int64), (count,)).copy()
+    ep = np.full(count, -1, dtype=np.int64) if ep_squares is None else np.asarray(ep_squares, dtype=np.int64).copy()
+    ep[(ep < 0) | (ep > 63)] = -1
+
+    if black.any():
+        bitboards = bitboards.copy()
+        bitboards[black] = _mirror(bitboards[black])
+        castling[black] >>= 2  # Black's rights become White's
+        ep[black & (ep >= 0)] ^= 56
+
+    ours = [bitboards[:, channel] for channel in range(6)]
+    theirs = [bitboards[:, channel] for channel in range(6, 12)]
+    pawns, knights, bishops, rooks, queens, king = ours
+    own = np.bitwise_or.reduce(bitboards[:, :6], axis=1)
+    enemy = np.bitwise_or.reduce(bitboards[:, 6:], axis=1)
+    occupied = own | enemy
+    empty = ~occupied
+    enemy_diagonal = theirs[2] | theirs[4]
+    enemy_orthogonal = theirs[3] | theirs[4]
+    zero = np.zeros(count, dtype=np.uint64)
+
+    # Squares the enemy attacks, with our king taken off the board so it cannot hide behind itself
+    without_king = empty | king
+    attacked = _shift(theirs[0], SOUTH_EAST) | _shift(theirs[0], SOUTH_WEST)
+    for jump in KNIGHT_JUMPS:
+        attacked |= _shift(theirs[1], jump)
+    for step in KING_STEPS:
+        attacked |= _shift(theirs[5], step)
+    for (direction, _), sliders in zip(ORTHOGONALS + DIAGONALS, [enemy_orthogonal] * 4 + [enemy_diagonal] * 4):
+        if sliders.any():
+            attacked |= _slide(sliders, without_king, direction)
+
+    # Checkers, the squares that block or capture a single checker, and pins by axis
+    checkers = (_shift(king, NORTH_EAST) | _shift(king, NORTH_WEST)) & theirs[0]
+    for jump in KNIGHT_JUMPS:
+        checkers |= _shift(king, jump) & theirs[1]
+    evasions = checkers.copy()
+    pinned = [zero.copy() for _ in range(4)]
+    for (direction, axis), sliders in zip(ORTHOGONALS + DIAGONALS, [enemy_orthogonal] * 4 + [enemy_diagonal] * 4):
+        ray = _slide(king, empty, direction)
+        hit = ray & sliders
+        checkers |= hit
+        evasions |= np.where(hit != 0, ray, zero)
+        blocker = ray & own
+        beyond = _slide(blocker, empty, direction) & sliders
+        pinned[axis] |= np.where(beyond != 0, blocker, zero)
+    any_pin = pinned[0] | pinned[1] | pinned[2] | pinned[3]
+    in_check = checkers != 0
+    double_check = (checkers & (checkers - np.uint64(1))) != 0
+    # Non-king moves must land here: anywhere when not in check, nowhere in double check
+    allowed = np.where(in_check, evasions, FULL) & np.where(double_check, zero, FULL)
+    free = ~any_pin
+
+    moves = _MoveMask(count)
+
+    # Pawns: pushes stay on the file axis, captures on their diagonal
+    pushers = pawns & (free | pinned[0])
+    single = _shift(pushers, NORTH) & empty
+    moves.add(single & allowed, 8, RANK_8)
+    moves.add(_shift(single & RANK_3, NORTH) & empty & allowed, 16)
+    for direction, axis, back in ((NORTH_EAST, 2, SOUTH_WEST), (NORTH_WEST, 3, SOUTH_EAST)):
+        capturers = pawns & (free | pinned[axis])
+        moves.add(_shift(capturers, direction) & enemy & allowed, direction[0], RANK_8)
+
+        # En passant: play it on the bitboards and look for slider attacks on the king
+        has_ep = ep >= 0
+        if has_ep.any():
+            target = np.where(has_ep, np.uint64(1) << np.where(has_ep, ep, 0).astype(np.uint64), zero)
+            origin = _shift(target, back) & capturers
+            captured = _shift(target, SOUTH)
+            after = occupied ^ origin ^ target ^ captured
+            exposed = zero.copy()
+            for (ray_direction, _), sliders in zip(ORTHOGONALS + DIAGONALS,
+                                                    [enemy_orthogonal] * 4 + [enemy_diagonal] * 4):
+                exposed |= _slide(king, ~after, ray_direction) & sliders
+            # Knight or pawn checks other than by the captured pawn are not answered by the capture
+            other_checkers = checkers & ~(enemy_orthogonal | enemy_diagonal) & ~captured
+            legal = (origin != 0) & (exposed == 0) & (other_checkers == 0)
+            moves.add(np.where(legal, target, zero), direction[0])
+
+    # Knights: a pinned knight can never move
+    movable = knights & free
+    for jump in KNIGHT_JUMPS:
+        moves.add(_shift(movable, jump) & ~own & allowed, jump[0])
+
+    # Sliders: a pinned slider may still move along its pin axis
+    for directions, sliders in ((ORTHOGONALS, rooks | queens), (DIAGONALS, bishops | queens)):
+        for direction, axis in directions:
+            movable = sliders & (free | pinned[axis])
+            current = movable
+            for distance in range(1, 8):
+                current = _shift(current, direction)
+                moves.add(current & ~own & allowed, direction[0] * distance)
+                current &= empty
+                if not current.any():
+                    break
+
+    # King steps and castling
+    for step in KING_STEPS:
+        moves.add(_shift(king, step) & ~own & ~attacked, step[0])
+    home = np.uint64(1 << 4)
+    for right, path, crossed, target, rook_square in CASTLING:
+        can_castle = (
+                ((castling & right) != 0) & (king == home) & ((rooks & np.uint64(1 << rook_square)) != 0) &
+                ((occupied & path) == 0) & ((attacked & crossed) == 0)
+        )
+        moves.add(np.where(can_castle, np.uint64(1 << target), zero), target - 4)
+
+    move_masks = None
+    if masks:
+        move_masks = moves.masks()
+        if black.any():
+            move_masks[black] = move_masks[black][:, MIRROR][:, :, MIRROR]
+    return BatchLegality(move_masks, in_check, moves.mobility)
+
+
+def board_arrays(boards):
+    """
+    Batch inputs for a list of logic.board.Board objects.
+    :return: (bitboards, white_to_move, castling, ep_squares) for batch_legality().
+    """
+    data = np.frombuffer(b"".join(board.compact() for board in boards), dtype=np.uint8).reshape(len(boards), -1)
+    codes = data[:, :64]
+    planes = codes[:, None, :] == np.arange(1, 13, dtype=np.uint8)[None, :, None]
+    bitboards = np.packbits(planes, axis=-1, bitorder="little").view("<u8")[..., 0].astype(np.uint64)
+    return bitboards, data[:, 64] == 0, data[:, 65].astype(np.int64), data[:, 66].astype(np.int64)
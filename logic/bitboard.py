@@ -0,0 +1,566 @@
+"""
+Bitboard position representation and legal move generator.
+
+Squares are numbered like python-chess: a1 = 0, h1 = 7, a8 = 56, h8 = 63, so square
+(rank * 8 + file) matches the row/col layout of Board.fen_to_matrix. A Board square
+(row, col) maps to square (7 - row) * 8 + col.
+
+Piece bitboards are indexed by channel, in the same order as the model planes:
+white P, N, B, R, Q, K (0-5) followed by black p, n, b, r, q, k (6-11).
+"""
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+COLORS = ("white", "black")
+PIECE_NAMES = ("Pawn", "Knight", "Bishop", "Rook", "Queen", "King")
+PIECE_SYMBOLS = "pnbrqk"
+PROMOTION_PIECES = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+# Castling right bits
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+CASTLING_SYMBOLS = ((WHITE_KINGSIDE, "K"), (WHITE_QUEENSIDE, "Q"), (BLACK_KINGSIDE, "k"), (BLACK_QUEENSIDE, "q"))
+
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+def square_from_position(position):
+    """
+    Convert a Board (row, col) tuple into a square index.
+    """
+    row, col = position
+    return (7 - row) * 8 + col
+
+
+def position_from_square(square):
+    """
+    Convert a square index into a Board (row, col) tuple.
+    """
+    return 7 - (square >> 3), square & 7
+
+
+def square_name(square):
+    return "abcdefgh"[square & 7] + str((square >> 3) + 1)
+
+
+def parse_square(name):
+    return (int(name[1]) - 1) * 8 + "abcdefgh".index(name[0])
+
+
+def iter_bits(bb):
+    """
+    Yield the index of every set bit, lowest first.
+    """
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def _leaper_table(offsets):
+    table = []
+    for square in range(64):
+        rank, file = divmod(square, 8)
+        bb = 0
+        for dr, df in offsets:
+            r, f = rank + dr, file + df
+            if 0 <= r < 8 and 0 <= f < 8:
+                bb |= 1 << (r * 8 + f)
+        table.append(bb)
+    return table
+
+
+def _ray_table(dr, df):
+    table = []
+    for square in range(64):
+        rank, file = divmod(square, 8)
+        bb = 0
+        r, f = rank + dr, file + df
+        while 0 <= r < 8 and 0 <= f < 8:
+            bb |= 1 << (r * 8 + f)
+            r, f = r + dr, f + df
+        table.append(bb)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_table([(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)])
+KING_ATTACKS = _leaper_table([(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)])
+# PAWN_ATTACKS[color][square]: squares a pawn of that color on that square attacks
+PAWN_ATTACKS = (_leaper_table([(1, -1), (1, 1)]), _leaper_table([(-1, -1), (-1, 1)]))
+
+# Rays paired with whether they point towards higher square indices. The first blocker on a
+# positive ray is its lowest set bit, on a negative ray its highest.
+ROOK_RAYS = ((_ray_table(1, 0), True), (_ray_table(0, 1), True), (_ray_table(-1, 0), False), (_ray_table(0, -1), False))
+BISHOP_RAYS = ((_ray_table(1, 1), True), (_ray_table(1, -1), True), (_ray_table(-1, 1), False), (_ray_table(-1, -1), False))
+
+
+def _between_table():
+    table = [[0] * 64 for _ in range(64)]
+    for rays, _ in ROOK_RAYS + BISHOP_RAYS:
+        for square in range(64):
+            for target in iter_bits(rays[square]):
+                table[square][target] = rays[square] & ~rays[target] & ~(1 << target)
+    return table
+
+
+# BETWEEN[a][b]: squares strictly between a and b when they share a line, else 0
+BETWEEN = _between_table()
+
+# Castling rights that survive a move touching each square
+CASTLING_MASK = [15] * 64
+CASTLING_MASK[0] = 15 ^ WHITE_QUEENSIDE
+CASTLING_MASK[7] = 15 ^ WHITE_KINGSIDE
+CASTLING_MASK[4] = 15 ^ (WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASK[56] = 15 ^ BLACK_QUEENSIDE
+CASTLING_MASK[63] = 15 ^ BLACK_KINGSIDE
+CASTLING_MASK[60] = 15 ^ (BLACK_KINGSIDE | BLACK_QUEENSIDE)
+
+# (right, king from, king to, rook from, rook to, squares that must be empty, squares the king crosses)
+CASTLING_MOVES = (
+    (WHITE_KINGSIDE, 4, 6, 7, 5, (1 << 5) | (1 << 6), (4, 5, 6)),
+    (WHITE_QUEENSIDE, 4, 2, 0, 3, (1 << 1) | (1 << 2) | (1 << 3), (4, 3, 2)),
+    (BLACK_KINGSIDE, 60, 62, 63, 61, (1 << 61) | (1 << 62), (60, 61, 62)),
+    (BLACK_QUEENSIDE, 60, 58, 56, 59, (1 << 57) | (1 << 58) | (1 << 59), (60, 59, 58)),
+)
+
+
+def _slide(square, occupancy, rays):
+    attacks = 0
+    for table, positive in rays:
+        ray = table[square]
+        blockers = ray & occupancy
+        if blockers:
+            if positive:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= table[blocker]
+        attacks |= ray
+    return attacks
+
+
+def _attack_table(rays):
+    """
+    Slider attacks for every square and every occupancy of the squares that can block it.
+    :return: (masks, tables): masks[square] holds the blocking squares (the rays without their
+             last square, which never blocks anything), and tables[square] maps each subset of
+             that mask to the attacked squares.
+    """
+    masks, tables = [], []
+    for square in range(64):
+        mask = 0
+        for table, positive in rays:
+            ray = table[square]
+            if ray:
+                last = ray.bit_length() - 1 if positive else (ray & -ray).bit_length() - 1
+                mask |= ray ^ (1 << last)
+        attacks = {}
+        subset = 0
+        while True:
+            attacks[subset] = _slide(square, subset, rays)
+            subset = (subset - mask) & mask  # Next subset of the mask
+            if not subset:
+                break
+        masks.append(mask)
+        tables.append(attacks)
+    return masks, tables
+
+
+# One dict lookup per slider instead of walking its four rays: 102400 rook and 5248 bishop entries
+ROOK_MASKS, ROOK_TABLES = _attack_table(ROOK_RAYS)
+BISHOP_MASKS, BISHOP_TABLES = _attack_table(BISHOP_RAYS)
+
+
+def rook_attacks(square, occupancy):
+    return ROOK_TABLES[square][occupancy & ROOK_MASKS[square]]
+
+
+def bishop_attacks(square, occupancy):
+    return BISHOP_TABLES[square][occupancy & BISHOP_MASKS[square]]
+
+
+def queen_attacks(square, occupancy):
+    return ROOK_TABLES[square][occupancy & ROOK_MASKS[square]] | BISHOP_TABLES[square][occupancy & BISHOP_MASKS[square]]
+
+
+class BitboardPosition:
+    """
+    A chess position stored as twelve piece bitboards plus side to move, castling rights,
+    en passant square and halfmove clock.
+
+    Moves are (from_square, to_square, promotion) tuples, where promotion is a piece type
+    (KNIGHT..QUEEN) or None.
+    """
+
+    def __init__(self):
+        self.bitboards = [0] * 12
+        self.occupancy = [0, 0]
+        self.mailbox = [None] * 64  # Channel of the piece on each square
+        self.side = WHITE
+        self.castling = 0
+        self.ep_square = None
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    def put_piece(self, square, channel):
+        bit = 1 << square
+        self.bitboards[channel] |= bit
+        self.occupancy[channel // 6] |= bit
+        self.mailbox[square] = channel
+
+    @classmethod
+    def from_fen(cls, fen=STARTING_FEN):
+        """
+        Build a position from a FEN string.
+        """
+        fields = fen.split()
+        position = cls()
+        for i, rank_text in enumerate(fields[0].split("/")):
+            rank = 7 - i
+            file = 0
+            for char in rank_text:
+                if char.isdigit():
+                    file += int(char)
+                    continue
+                ptype = PIECE_SYMBOLS.index(char.lower())
+                position.put_piece(rank * 8 + file, ptype if char.isupper() else ptype + 6)
+                file += 1
+
+        position.side = WHITE if len(fields) < 2 or fields[1] == "w" else BLACK
+        if len(fields) > 2:
+            for right, symbol in CASTLING_SYMBOLS:
+                if symbol in fields[2]:
+                    position.castling |= right
+        if len(fields) > 3 and fields[3] != "-":
+            position.ep_square = parse_square(fields[3])
+        if len(fields) > 4:
+            position.halfmove_clock = int(fields[4])
+        if len(fields) > 5:
+            position.fullmove_number = int(fields[5])
+        return position
+
+    @classmethod
+    def from_board(cls, board, color=None):
+        """
+        Build a position from a logic.board.Board, straight from its square codes and castling,
+        en passant and halfmove clock fields.
+        :param board: Board object.
+        :param color: Side to move, defaults to board.current_turn.
+        """
+        position = cls()
+        bitboards = position.bitboards
+        occupancy = position.occupancy
+        mailbox = position.mailbox
+        for square, code in enumerate(board.squares):
+            if code:
+                channel = code - 1
+                bit = 1 << square
+                bitboards[channel] |= bit
+                occupancy[channel >= 6] |= bit
+                mailbox[square] = channel
+
+        color = color or board.current_turn
+        position.side = COLORS.index(color)
+        position.castling = board.castling
+        # The en passant square only exists for the side replying to the double step
+        position.ep_square = board.ep_square if color == board.current_turn else None
+        position.halfmove_clock = board.halfmove_clock
+        return position
+
+    def copy(self):
+        position = BitboardPosition()
+        position.bitboards = self.bitboards[:]
+        position.occupancy = self.occupancy[:]
+        position.mailbox = self.mailbox[:]
+        position.side = self.side
+        position.castling = self.castling
+        position.ep_square = self.ep_square
+        position.halfmove_clock = self.halfmove_clock
+        position.fullmove_number = self.fullmove_number
+        return position
+
+    def fen(self):
+        """
+        Serialize the position to FEN.
+        """
+        rows = []
+        for rank in range(7, -1, -1):
+            text = ""
+            empty = 0
+            for file in range(8):
+                channel = self.mailbox[rank * 8 + file]
+                if channel is None:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                symbol = PIECE_SYMBOLS[channel % 6]
+                text += symbol.upper() if channel < 6 else symbol
+            if empty:
+                text += str(empty)
+            rows.append(text)
+        castling = "".join(symbol for right, symbol in CASTLING_SYMBOLS if self.castling & right) or "-"
+        ep = square_name(self.ep_square) if self.ep_square is not None else "-"
+        return f"{'/'.join(rows)} {'wb'[self.side]} {castling} {ep} {self.halfmove_clock} {self.fullmove_number}"
+
+    # ------------------------------------------------------------------
+    # Attacks
+    # ------------------------------------------------------------------
+    def king_square(self, side):
+        return self.bitboards[side * 6 + KING].bit_length() - 1
+
+    def attackers_to(self, square, by_side, occupancy=None, removed=0):
+        """
+        Bitboard of by_side pieces attacking square.
+        :param occupancy: Occupancy to use for sliding pieces (defaults to the current one).
+        :param removed: Mask of squares whose pieces should be ignored (e.g. a piece just captured).
+        """
+        if occupancy is None:
+            occupancy = self.occupancy[WHITE] | self.occupancy[BLACK]
+        base = by_side * 6
+        bbs = self.bitboards
+        keep = ~removed
+        queens = bbs[base + QUEEN]
+        attackers = PAWN_ATTACKS[by_side ^ 1][square] & bbs[base + PAWN]
+        attackers |= KNIGHT_ATTACKS[square] & bbs[base + KNIGHT]
+        attackers |= KING_ATTACKS[square] & bbs[base + KING]
+        attackers |= BISHOP_TABLES[square][occupancy & BISHOP_MASKS[square]] & (bbs[base + BISHOP] | queens)
+        attackers |= ROOK_TABLES[square][occupancy & ROOK_MASKS[square]] & (bbs[base + ROOK] | queens)
+        return attackers & keep
+
+    def is_square_attacked(self, square, by_side):
+        return self.attackers_to(square, by_side) != 0
+
+    def in_check(self, side=None):
+        side = self.side if side is None else side
+        return self.attackers_to(self.king_square(side), side ^ 1) != 0
+
+    # ------------------------------------------------------------------
+    # Move generation
+    # ------------------------------------------------------------------
+    def pseudo_legal_moves(self):
+        """
+        Generate all moves that obey piece movement rules, ignoring whether they leave the king in
+        check (castling moves still require the king not to pass through an attacked square).
+        """
+        side = self.side
+        base = side * 6
+        bbs = self.bitboards
+        own = self.occupancy[side]
+        enemy = self.occupancy[side ^ 1]
+        occupancy = own | enemy
+        empty = ~occupancy & 0xFFFFFFFFFFFFFFFF
+        moves = []
+        append = moves.append
+
+        # Pawns
+        forward = 8 if side == WHITE else -8
+        start_rank = 1 if side == WHITE else 6
+        last_rank = 7 if side == WHITE else 0
+        ep_bit = 1 << self.ep_square if self.ep_square is not None else 0
+        attacks_table = PAWN_ATTACKS[side]
+        for square in iter_bits(bbs[base + PAWN]):
+            targets = attacks_table[square] & (enemy | ep_bit)
+            one = square + forward
+            if (empty >> one) & 1:
+                targets |= 1 << one
+                two = one + forward
+                if square >> 3 == start_rank and (empty >> two) & 1:
+                    targets |= 1 << two
+            for target in iter_bits(targets):
+                if target >> 3 == last_rank:
+                    for promotion in PROMOTION_PIECES:
+                        append((square, target, promotion))
+                else:
+                    append((square, target, None))
+
+        # Knights, bishops, rooks, queens, king
+        not_own = ~own
+        for square in iter_bits(bbs[base + KNIGHT]):
+            for target in iter_bits(KNIGHT_ATTACKS[square] & not_own):
+                append((square, target, None))
+        for square in iter_bits(bbs[base + BISHOP]):
+            for target in iter_bits(BISHOP_TABLES[square][occupancy & BISHOP_MASKS[square]] & not_own):
+                append((square, target, None))
+        for square in iter_bits(bbs[base + ROOK]):
+            for target in iter_bits(ROOK_TABLES[square][occupancy & ROOK_MASKS[square]] & not_own):
+                append((square, target, None))
+        for square in iter_bits(bbs[base + QUEEN]):
+            for target in iter_bits(queen_attacks(square, occupancy) & not_own):
+                append((square, target, None))
+        king_square = self.king_square(side)
+        if king_square >= 0:
+            for target in iter_bits(KING_ATTACKS[king_square] & not_own):
+                append((king_square, target, None))
+
+            # Castling
+            rights = self.castling & ((WHITE_KINGSIDE | WHITE_QUEENSIDE) if side == WHITE else (BLACK_KINGSIDE | BLACK_QUEENSIDE))
+            if rights:
+                enemy_side = side ^ 1
+                for right, king_from, king_to, _, _, between, crossed in CASTLING_MOVES:
+                    if rights & right and king_square == king_from and not between & occupancy:
+                        if not any(self.attackers_to(s, enemy_side, occupancy) for s in crossed):
+                            append((king_from, king_to, None))
+        return moves
+
+    def is_legal(self, move):
+        """
+        Check whether a pseudo-legal move leaves the mover's own king safe.
+        """
+        from_square, to_square, _ = move
+        side = self.side
+        enemy_side = side ^ 1
+        moved = self.mailbox[from_square]
+        from_bit = 1 << from_square
+        to_bit = 1 << to_square
+        occupancy = (self.occupancy[WHITE] | self.occupancy[BLACK]) & ~from_bit | to_bit
+
+        if moved == side * 6 + KING:
+            # The captured piece (if any) no longer attacks; the king no longer blocks its own rays
+            return self.attackers_to(to_square, enemy_side, occupancy, to_bit) == 0
+
+        removed = to_bit
+        if moved % 6 == PAWN and to_square == self.ep_square:
+            captured_square = to_square - 8 if side == WHITE else to_square + 8
+            removed |= 1 << captured_square
+            occupancy &= ~(1 << captured_square)
+        return self.attackers_to(self.king_square(side), enemy_side, occupancy, removed) == 0
+
+    def pinned(self, side=None):
+        """
+        Bitboard of side's pieces pinned to their own king.
+        """
+        side = self.side if side is None else side
+        king_square = self.king_square(side)
+        occupancy = self.occupancy[WHITE] | self.occupancy[BLACK]
+        base = (side ^ 1) * 6
+        bbs = self.bitboards
+        queens = bbs[base + QUEEN]
+        snipers = rook_attacks(king_square, 0) & (bbs[base + ROOK] | queens)
+        snipers |= bishop_attacks(king_square, 0) & (bbs[base + BISHOP] | queens)
+        pinned = 0
+        line = BETWEEN[king_square]
+        own = self.occupancy[side]
+        for square in iter_bits(snipers):
+            blockers = line[square] & occupancy
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pinned |= blockers
+        return pinned
+
+    def legal_moves(self):
+        """
+        Generate all legal moves for the side to move.
+
+        Only king moves, en passant captures, moves of pinned pieces and moves made while in check
+        can expose the king, so only those are verified with is_legal.
+        """
+        side = self.side
+        king_square = self.king_square(side)
+        if self.attackers_to(king_square, side ^ 1):
+            return [move for move in self.pseudo_legal_moves() if self.is_legal(move)]
+
+        pinned = self.pinned(side)
+        ep_square = self.ep_square
+        pawns = self.bitboards[side * 6 + PAWN]
+        moves = []
+        for move in self.pseudo_legal_moves():
+            from_square = move[0]
+            if (
+                    from_square == king_square or (pinned >> from_square) & 1 or
+                    (move[1] == ep_square and (pawns >> from_square) & 1)
+            ):
+                if not self.is_legal(move):
+                    continue
+            moves.append(move)
+        return moves
+
+    # ------------------------------------------------------------------
+    # Make / unmake
+    # ------------------------------------------------------------------
+    def _remove(self, square):
+        channel = self.mailbox[square]
+        bit = 1 << square
+        self.bitboards[channel] ^= bit
+        self.occupancy[channel // 6] ^= bit
+        self.mailbox[square] = None
+        return channel
+
+    def make_move(self, move):
+        """
+        Play a move and return the record needed by unmake_move.
+        """
+        from_square, to_square, promotion = move
+        side = self.side
+        undo = (move, self.mailbox[to_square], self.castling, self.ep_square, self.halfmove_clock)
+
+        channel = self._remove(from_square)
+        captured = self.mailbox[to_square]
+        if captured is not None:
+            self._remove(to_square)
+
+        ptype = channel % 6
+        self.halfmove_clock += 1
+        if ptype == PAWN:
+            self.halfmove_clock = 0
+            if to_square == self.ep_square:
+                self._remove(to_square - 8 if side == WHITE else to_square + 8)
+            if promotion is not None:
+                channel = side * 6 + promotion
+        elif ptype == KING and abs(to_square - from_square) == 2:
+            rook_from, rook_to = (from_square + 3, from_square + 1) if to_square > from_square else (from_square - 4, from_square - 1)
+            self.put_piece(rook_to, self._remove(rook_from))
+        if captured is not None:
+            self.halfmove_clock = 0
+        self.put_piece(to_square, channel)
+
+        self.ep_square = (from_square + to_square) // 2 if ptype == PAWN and abs(to_square - from_square) == 16 else None
+        self.castling &= CASTLING_MASK[from_square] & CASTLING_MASK[to_square]
+        if side == BLACK:
+            self.fullmove_number += 1
+        self.side = side ^ 1
+        return undo
+
+    def unmake_move(self, undo):
+        """
+        Take back the move recorded by make_move.
+        """
+        (from_square, to_square, promotion), captured, castling, ep_square, halfmove_clock = undo
+        self.side ^= 1
+        side = self.side
+        if side == BLACK:
+            self.fullmove_number -= 1
+
+        channel = self._remove(to_square)
+        if promotion is not None:
+            channel = side * 6 + PAWN
+        self.put_piece(from_square, channel)
+        if captured is not None:
+            self.put_piece(to_square, captured)
+
+        ptype = channel % 6
+        if ptype == PAWN and to_square == ep_square:
+            self.put_piece(to_square - 8 if side == WHITE else to_square + 8, (side ^ 1) * 6 + PAWN)
+        elif ptype == KING and abs(to_square - from_square) == 2:
+            rook_from, rook_to = (from_square + 3, from_square + 1) if to_square > from_square else (from_square - 4, from_square - 1)
+            self.put_piece(rook_from, self._remove(rook_to))
+
+        self.castling = castling
+        self.ep_square = ep_square
+        self.halfmove_clock = halfmove_clock
+
+    def perft(self, depth):
+        """
+        Count leaf nodes of the legal move tree to the given depth.
+        """
+        moves = self.legal_moves()
+        if depth <= 1:
+            return len(moves) if depth == 1 else 1
+        nodes = 0
+        for move in moves:
+            undo = self.make_move(move)
+            nodes += self.perft(depth - 1)
+            self.unmake_move(undo)
+        return nodes
@@ -4,18 +4,117 @@ from logic.pieces.knight import Knight
 from logic.pieces.bishop import Bishop
 from logic.pieces.queen import Queen
 from logic.pieces.king import King  # Add this line
+from logic.encoding import encode_board, encode_candidates
+from logic.bitboard import (
+    BitboardPosition, position_from_square, square_from_position, parse_square, PIECE_SYMBOLS, CASTLING_SYMBOLS,
+    WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE,
+)
+from logic.zobrist import PIECE_KEYS, BLACK_TO_MOVE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS, compute_hash
+import logging
 import random
-import tensorflow as tf
-import os
+from collections import namedtuple
 import numpy as np
 
+# Game events are logged at INFO, per-move diagnostics at DEBUG. Messages are only formatted when
+# a handler wants them, so move_piece and is_legal_move cost nothing extra inside search loops.
+logger = logging.getLogger(__name__)
+
+
+def _offset_targets(offsets):
+    """
+    For every square, list the on-board squares reached by the given (row, col) offsets.
+    """
+    return [[[(row + dr, col + dc) for dr, dc in offsets if 0 <= row + dr < 8 and 0 <= col + dc < 8]
+             for col in range(8)] for row in range(8)]
+
+
+def _ray_targets(directions):
+    """
+    For every square, list the squares along each direction, nearest first.
+    """
+    rays = [[[] for _ in range(8)] for _ in range(8)]
+    for row in range(8):
+        for col in range(8):
+            for dr, dc in directions:
+                ray = []
+                r, c = row + dr, col + dc
+                while 0 <= r < 8 and 0 <= c < 8:
+                    ray.append((r, c))
+                    r, c = r + dr, c + dc
+                if ray:
+                    rays[row][col].append(ray)
+    return rays
+
+
+KNIGHT_TARGETS = _offset_targets([(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)])
+KING_TARGETS = _offset_targets([(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)])
+ORTHOGONAL_RAYS = _ray_targets([(1, 0), (-1, 0), (0, 1), (0, -1)])
+DIAGONAL_RAYS = _ray_targets([(1, 1), (1, -1), (-1, 1), (-1, -1)])
+
+# Everything Board.pop() needs to take back a move played with Board.push()
+UndoRecord = namedtuple("UndoRecord", [
+    "move", "piece", "had_moved", "captured", "captured_square", "rook", "rook_had_moved",
+    "last_move", "halfmove_clock", "castling", "ep_square", "zobrist_hash",
+])
+
+# Board.compact(): 64 square codes, then side to move, castling rights, en passant square and
+# halfmove clock, one byte each
+COMPACT_SIZE = 68
+NO_EN_PASSANT = 64  # En passant byte of a compact position without an en passant square
+MODEL_WAIT_INTERVAL = 0.05  # Seconds between stop checks while choose_ai_move waits for the model
+
+# (castling right, home row, rook column) for each castling option
+CASTLING_SQUARES = [
+    (WHITE_KINGSIDE, 7, 7), (WHITE_QUEENSIDE, 7, 0), (BLACK_KINGSIDE, 0, 7), (BLACK_QUEENSIDE, 0, 0),
+]
+SQUARE_POSITIONS = [position_from_square(square) for square in range(64)]  # Bitboard square -> (row, col)
+
 class Board:
-    def __init__(self):
+    PIECE_SYMBOLS = {"Pawn": "p", "Knight": "n", "Bishop": "b", "Rook": "r", "Queen": "q", "King": "k"}
+    SYMBOL_CLASSES = {"p": Pawn, "n": Knight, "b": Bishop, "r": Rook, "q": Queen, "k": King}
+    PROMOTION_CLASSES = {"q": Queen, "r": Rook, "b": Bishop, "n": Knight}
+    CHANNEL_CLASSES = (Pawn, Knight, Bishop, Rook, Queen, King)  # Indexed by channel % 6
+    MOVE_GENERATORS = ("bitboard", "pieces")
+
+    def __init__(self, move_generator="bitboard", eval_cache_size=100000, preload_model=True, model_path=None,
+                 model_backend="keras", opening_book=True, tablebase=True):
+        """
+        :param move_generator: 'bitboard' to generate legal moves with logic.bitboard, or 'pieces' to
+                               ask every piece's is_valid_move about all 64x64 square pairs.
+        :param eval_cache_size: Number of model scores remembered by position hash, or 0 to disable
+                                the evaluation cache.
+        :param preload_model: Start loading the shared model in a background thread right away.
+                              Otherwise it is loaded the first time Board.model is used.
+        :param model_path: Model file to play with, default ai/chess_model.h5. A .tflite file
+                           converted by ai/model_inference.py runs without TensorFlow.
+        :param model_backend: 'keras', or 'numpy' to evaluate the .h5 weights with a NumPy forward
+                              pass, which is faster for the small batches the search scores.
+        :param opening_book: Book file built by ai/opening_book.py that make_ai_move plays from
+                             before asking the model, True for ai/opening_book.npy, or None to
+                             always search. A missing file is the same as no book.
+        :param tablebase: Directory of endgame tables generated by ai/tablebase.py, used for
+                          positions with few pieces before searching or asking the model, True
+                          for ai/tablebases, or None to never use them. Missing tables are skipped.
+        """
+        if move_generator not in self.MOVE_GENERATORS:
+            raise ValueError(f"Unknown move generator: {move_generator}")
         self.board = [[None for _ in range(8)] for _ in range(8)]
         self.initialize_pieces()
         self.current_turn = "white"
         self.last_move = None
-        self.model = self.load_model()  # Load the trained model
+        self.halfmove_clock = 0  # Plies since the last capture or pawn move
+        self.move_stack = []  # UndoRecords for push/pop
+        self.index_pieces()
+        self.move_generator = move_generator
+        if eval_cache_size:
+            from ai.eval_cache import EvaluationCache
+            self.eval_cache = EvaluationCache(eval_cache_size)
+        else:
+            self.eval_cache = None
+        self._model_loader = None
+        self.opening_book = opening_book
+        self.use_tablebase(tablebase)
+        self.use_model(model_path, model_backend, preload_model)
 
     def initialize_pieces(self):
         """
@@ -59,134 +158,354 @@ class Board:
         self.board[7][4] = King('white', (7, 4))  # White king on bottom row
         self.board[0][4] = King('black', (0, 4))  # Black king on top row
 
-    def move_piece(self, start, end):
-        print(f"Attempting move: {self.current_turn.capitalize()} from {start} to {end}")
+    def set_fen(self, fen):
+        """
+        Replace the current position with the one described by a FEN string.
+        Castling rights become has_moved flags on the kings and rooks, and an en passant square
+        becomes the pawn double step stored in last_move.
+        :param fen: A FEN string.
+        """
+        fields = fen.split()
+        squares = bytearray(64)
+        for row, rank_text in enumerate(fields[0].split("/")):
+            col = 0
+            for char in rank_text:
+                if char.isdigit():
+                    col += int(char)
+                    continue
+                channel = PIECE_SYMBOLS.index(char.lower()) + (0 if char.isupper() else 6)
+                squares[(7 - row) * 8 + col] = channel + 1
+                col += 1
+
+        castling = 0
+        for right, symbol in CASTLING_SYMBOLS:
+            if len(fields) > 2 and symbol in fields[2]:
+                castling |= right
+        ep_square = parse_square(fields[3]) if len(fields) > 3 and fields[3] != "-" else None
+        self._load_position(squares, len(fields) < 2 or fields[1] == "w", castling, ep_square,
+                            int(fields[4]) if len(fields) > 4 else 0)
+
+    def compact(self):
+        """
+        Pack the position into COMPACT_SIZE bytes: the square codes of Board.squares followed by
+        side to move (0 white, 1 black), castling rights, en passant square (NO_EN_PASSANT if none)
+        and halfmove clock. The bytes are hashable and cheap to send to worker processes.
+        """
+        ep_square = NO_EN_PASSANT if self.ep_square is None else self.ep_square
+        return bytes(self.squares) + bytes((self.current_turn != "white", self.castling, ep_square,
+                                            min(self.halfmove_clock, 255)))
+
+    def set_compact(self, data):
+        """
+        Replace the current position with one packed by compact().
+        """
+        ep_square = data[66] if data[66] != NO_EN_PASSANT else None
+        self._load_position(bytearray(data[:64]), data[64] == 0, data[65], ep_square, data[67])
+
+    def copy(self):
+        """
+        Copy the position into a new Board that shares this board's model and evaluation cache.
+        The copy remembers the positions played so far for repetition detection, but starts
+        with an empty move stack, so it cannot pop() past the moment of copying.
+        """
+        board = Board.__new__(Board)
+        board.move_generator = self.move_generator
+        board.eval_cache = self.eval_cache
+        board._model_loader = self._model_loader
+        board.opening_book = self.opening_book
+        board.tablebase = self.tablebase
+        board._load_position(bytearray(self.squares), self.current_turn == "white", self.castling,
+                             self.ep_square, self.halfmove_clock)
+        board.position_counts = dict(self.position_counts)
+        return board
+
+    def _load_position(self, squares, white_to_move, castling, ep_square, halfmove_clock):
+        """
+        Rebuild the grid of Piece objects from square codes and the plain position fields.
+        Castling rights become has_moved flags on the kings and rooks, and an en passant square
+        becomes the pawn double step stored in last_move.
+        """
+        grid = [[None] * 8 for _ in range(8)]
+        classes = self.CHANNEL_CLASSES
+        for square, code in enumerate(squares):
+            if code:
+                position = SQUARE_POSITIONS[square]
+                piece = classes[(code - 1) % 6]("white" if code <= 6 else "black", position)
+                # Kings and rooks may only castle if a castling right is granted below
+                piece.has_moved = piece.kind == King.kind or piece.kind == Rook.kind
+                grid[position[0]][position[1]] = piece
+        self.board = grid
+
+        self.current_turn = "white" if white_to_move else "black"
+        for right, row, rook_col in CASTLING_SQUARES:
+            king = self.board[row][4]
+            rook = self.board[row][rook_col]
+            if castling & right and isinstance(king, King) and isinstance(rook, Rook):
+                king.has_moved = False
+                rook.has_moved = False
+
+        self.halfmove_clock = halfmove_clock
+        self.move_stack = []
+        self.last_move = None
+        if ep_square is not None:
+            col = ep_square & 7
+            if ep_square >> 3 == 2:
+                self.last_move = ((6, col), (4, col))  # White pawn just advanced two squares
+            else:
+                self.last_move = ((1, col), (3, col))  # Black pawn just advanced two squares
+
+        self.index_pieces()
+
+    def index_pieces(self):
+        """
+        Rebuild the per-color piece lists and king positions from the grid. push() and pop()
+        keep them up to date afterwards.
+        """
+        self.pieces = {"white": [], "black": []}
+        self.king_positions = {}
+        self.squares = squares = bytearray(64)  # channel + 1 of the piece on each square (a1 = 0), 0 if empty
+        placed = []  # (channel, square) for the hash
+        for row, rank in enumerate(self.board):
+            for col, piece in enumerate(rank):
+                if piece:
+                    square = (7 - row) * 8 + col
+                    self.pieces[piece.color].append(piece)
+                    squares[square] = piece.channel + 1
+                    placed.append((piece.channel, square))
+                    if piece.kind == King.kind:
+                        self.king_positions[piece.color] = (row, col)
+
+        self.castling = self.castling_rights()
+        self.ep_square = None
+        if self.last_move:
+            start, end = self.last_move
+            if abs(start[0] - end[0]) == 2 and isinstance(self.board[end[0]][end[1]], Pawn):
+                self.ep_square = square_from_position(((start[0] + end[0]) // 2, end[1]))
+        self.zobrist_hash = compute_hash(placed, self.current_turn == "white", self.castling, self.en_passant_file())
+        self.position_counts = {self.zobrist_hash: 1}
+
+    def castling_rights(self):
+        """
+        Castling rights implied by the has_moved flags of the kings and rooks on their home squares.
+        :return: Bitmask of the logic.bitboard castling right bits.
+        """
+        rights = 0
+        for right, row, rook_col in CASTLING_SQUARES:
+            color = "white" if row == 7 else "black"
+            king = self.board[row][4]
+            rook = self.board[row][rook_col]
+            if (
+                    isinstance(king, King) and king.color == color and not king.has_moved and
+                    isinstance(rook, Rook) and rook.color == color and not rook.has_moved
+            ):
+                rights |= right
+        return rights
+
+    def en_passant_file(self):
+        """
+        File of the pawn that just advanced two squares, or None.
+        """
+        return None if self.ep_square is None else self.ep_square & 7
+
+    def is_repetition(self, count=3):
+        """
+        Check whether the current position has occurred at least count times.
+        """
+        return self.position_counts.get(self.zobrist_hash, 0) >= count
+
+    def move_piece(self, start, end, promotion="q"):
+        """
+        Validate and play a move for the side to move.
+        :param promotion: Piece a pawn promotes to when it reaches the last rank ('q', 'r', 'b' or 'n').
+        """
+        logger.debug("Attempting move: %s from %s to %s", self.current_turn.capitalize(), start, end)
 
         piece = self.board[start[0]][start[1]]
         if not piece or piece.color != self.current_turn:
-            print(f"Invalid move: It's {self.current_turn.capitalize()}'s turn.")
+            logger.info("Invalid move: It's %s's turn.", self.current_turn.capitalize())
             return False
 
-        # Handle castling
-        if isinstance(piece, King) and abs(end[1] - start[1]) == 2:  # Castling move
-            if self._handle_castling(start, end, piece):
-                self.toggle_turn()
-                return True
-
-        # Handle en passant
-        if isinstance(piece, Pawn) and abs(start[1] - end[1]) == 1 and self.is_empty(end):
-            last_move = self.last_move
-            if last_move:
-                last_start, last_end = last_move
-                captured_pawn = self.board[last_end[0]][last_end[1]]
-                if (
-                        captured_pawn and
-                        captured_pawn.__class__.__name__ == "Pawn" and
-                        abs(last_end[0] - last_start[0]) == 2 and
-                        last_end == (start[0], end[1])
-                ):
-                    # Simulate en passant
-                    self.board[end[0]][end[1]] = piece
-                    self.board[start[0]][start[1]] = None
-                    self.board[last_end[0]][last_end[1]] = None  # Remove the captured pawn
-                    piece.position = end
-                    self.last_move = (start, end)
-
-                    # Check if the king is still in check
-                    if self.is_in_check(self.current_turn):
-                        print(f"Invalid move: {self.current_turn.capitalize()} is still in check!")
-                        # Undo the move
-                        self.board[start[0]][start[1]] = piece
-                        self.board[end[0]][end[1]] = None
-                        self.board[last_end[0]][last_end[1]] = captured_pawn
-                        piece.position = start
-                        return False
-
-                    print(f"{self.current_turn.capitalize()} performed en passant.")
-                    self.toggle_turn()
-                    return True
-
-        # Standard move
         if not self.is_legal_move(start, end, self.current_turn):
-            print(f"Invalid move: {self.current_turn.capitalize()} cannot make this move.")
+            logger.info("Invalid move: %s cannot make this move.", self.current_turn.capitalize())
             return False
 
-        # Perform the move
-        self.board[end[0]][end[1]] = piece
-        self.board[start[0]][start[1]] = None
-        piece.position = end
-        piece.has_moved = True
-        self.last_move = (start, end)
-        print(f"{self.current_turn.capitalize()} moved {piece.__class__.__name__} to {end}")
-
-        # Handle pawn promotion
-        if isinstance(piece, Pawn) and (end[0] == 0 or end[0] == 7):
-            self._handle_pawn_promotion(end, piece)
-
-        # Check if the move resolved the check
-        if self.is_in_check(self.current_turn):
-            print(f"Invalid move: {self.current_turn.capitalize()} is still in check!")
-            # Undo the move
-            self.board[start[0]][start[1]] = piece
-            self.board[end[0]][end[1]] = None
-            piece.position = start
-            return False
+        self.push((start, end, promotion))
+        record = self.move_stack[-1]
+        if record.rook:
+            logger.info("%s performed %s castling.", piece.color.capitalize(),
+                        "kingside" if end[1] > start[1] else "queenside")
+        elif record.captured_square != end:
+            logger.info("%s performed en passant.", piece.color.capitalize())
+        else:
+            logger.info("%s moved %s to %s", piece.color.capitalize(), piece.__class__.__name__, end)
+
+        promoted = self.board[end[0]][end[1]]
+        if promoted is not piece:
+            logger.info("%s promoted a pawn to a %s at %s.", piece.color.capitalize(),
+                        promoted.__class__.__name__.lower(), end)
 
         # Check if the opponent's king is in check or checkmate
-        opponent_color = "black" if piece.color == "white" else "white"
+        opponent_color = self.current_turn
         if self.is_in_check(opponent_color):
-            print(f"{opponent_color.capitalize()} is in check!")
+            logger.info("%s is in check!", opponent_color.capitalize())
             if self.is_checkmate(opponent_color):
-                print(f"{opponent_color.capitalize()} is in checkmate! {piece.color.capitalize()} wins!")
+                logger.info("%s is in checkmate! %s wins!", opponent_color.capitalize(), piece.color.capitalize())
 
-        # Toggle the turn only for valid moves
-        self.toggle_turn()
+        logger.debug("Turn toggled. It's now %s's turn.", self.current_turn)
         return True
 
-    def _handle_castling(self, start, end, king):
+    def push(self, move):
         """
-        Handle castling logic.
+        Play a move without validating it and record what pop() needs to take it back.
+        Handles captures, castling, en passant, promotion and the has_moved flags.
+        :param move: (start, end) or (start, end, promotion) tuple. Pawns promote to a queen unless
+                     promotion is 'r', 'b' or 'n'.
         """
-        rook_start_col = 0 if end[1] < start[1] else 7  # Determine kingside or queenside
-        rook_end_col = end[1] - 1 if end[1] > start[1] else end[1] + 1
-
-        # Ensure the rook exists and is in the correct position
-        rook = self.board[start[0]][rook_start_col]
-        if not rook or rook.color != king.color or rook.__class__.__name__ != "Rook":
-            print("Invalid castling: Rook not found or in the wrong position.")
-            return False
-
-        # Move the rook
-        self.board[start[0]][rook_end_col] = rook
-        self.board[start[0]][rook_start_col] = None
-        rook.position = (start[0], rook_end_col)
-        rook.has_moved = True
+        start, end = move[0], move[1]
+        grid = self.board
+        squares = self.squares
+        piece = grid[start[0]][start[1]]
+        captured = grid[end[0]][end[1]]
+        captured_square = end
+        rook = None
+        rook_had_moved = False
+        ep_file = self.en_passant_file()
+        from_square = (7 - start[0]) * 8 + start[1]
+        to_square = (7 - end[0]) * 8 + end[1]
+
+        if isinstance(piece, King) and abs(end[1] - start[1]) == 2:
+            # Castling: bring the rook to the square the king crossed
+            rook_start_col = 0 if end[1] < start[1] else 7
+            rook_end_col = (start[1] + end[1]) // 2
+            rook = grid[start[0]][rook_start_col]
+            rook_had_moved = rook.has_moved
+            grid[start[0]][rook_end_col] = rook
+            grid[start[0]][rook_start_col] = None
+            rook.position = (start[0], rook_end_col)
+            rook.has_moved = True
+            squares[from_square - start[1] + rook_end_col] = squares[from_square - start[1] + rook_start_col]
+            squares[from_square - start[1] + rook_start_col] = 0
+        elif isinstance(piece, Pawn) and start[1] != end[1] and captured is None:
+            # En passant: the captured pawn sits beside the start square
+            captured_square = (start[0], end[1])
+            captured = grid[start[0]][end[1]]
+            grid[start[0]][end[1]] = None
+            squares[from_square - start[1] + end[1]] = 0
+
+        if captured:
+            self.pieces[captured.color].remove(captured)
+
+        self.move_stack.append(UndoRecord(
+            move, piece, piece.has_moved, captured, captured_square, rook, rook_had_moved,
+            self.last_move, self.halfmove_clock, self.castling, self.ep_square, self.zobrist_hash,
+        ))
+
+        key = self.zobrist_hash ^ BLACK_TO_MOVE_KEY ^ PIECE_KEYS[piece.channel][from_square]
+        if ep_file is not None:
+            key ^= EN_PASSANT_KEYS[ep_file]
+        if captured:
+            key ^= PIECE_KEYS[captured.channel][(7 - captured_square[0]) * 8 + captured_square[1]]
+        if rook:
+            rook_channel = rook.channel
+            key ^= PIECE_KEYS[rook_channel][(7 - start[0]) * 8 + (0 if end[1] < start[1] else 7)]
+            key ^= PIECE_KEYS[rook_channel][(7 - start[0]) * 8 + rook.position[1]]
+
+        grid[end[0]][end[1]] = piece
+        grid[start[0]][start[1]] = None
+        piece.position = end
+        piece.has_moved = True
 
-        # Move the king
-        self.board[end[0]][end[1]] = king
-        self.board[start[0]][start[1]] = None
-        king.position = end
-        king.has_moved = True
+        if isinstance(piece, Pawn) or captured:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
 
-        print(f"{king.color.capitalize()} performed {'kingside' if end[1] > start[1] else 'queenside'} castling.")
-        return True
+        if isinstance(piece, Pawn) and (end[0] == 0 or end[0] == 7):
+            promotion = move[2] if len(move) > 2 else "q"
+            promoted = self.PROMOTION_CLASSES[promotion](piece.color, end)
+            promoted.has_moved = True
+            grid[end[0]][end[1]] = promoted
+            own_pieces = self.pieces[piece.color]
+            own_pieces[own_pieces.index(piece)] = promoted
+        elif isinstance(piece, King):
+            self.king_positions[piece.color] = end
 
-    def _handle_en_passant(self, start, end, pawn):
-        """
-        Handle en passant logic.
-        """
-        captured_pawn_row = start[0]
-        captured_pawn_col = end[1]
-        self.board[captured_pawn_row][captured_pawn_col] = None  # Remove the captured pawn
-        print(f"{pawn.color.capitalize()} performed en passant.")
+        self.last_move = (start, end)
+        self.current_turn = "black" if self.current_turn == "white" else "white"
 
-    def _handle_pawn_promotion(self, end, pawn):
+        channel = grid[end[0]][end[1]].channel
+        squares[from_square] = 0
+        squares[to_square] = channel + 1
+        key ^= PIECE_KEYS[channel][to_square]
+        if self.castling and (isinstance(piece, (King, Rook)) or isinstance(captured, Rook)):
+            rights = self.castling_rights()
+            key ^= CASTLING_KEYS[self.castling] ^ CASTLING_KEYS[rights]
+            self.castling = rights
+        if isinstance(piece, Pawn) and abs(start[0] - end[0]) == 2:
+            key ^= EN_PASSANT_KEYS[end[1]]
+            self.ep_square = (from_square + to_square) >> 1
+        else:
+            self.ep_square = None
+        self.zobrist_hash = key
+        self.position_counts[key] = self.position_counts.get(key, 0) + 1
+
+    def pop(self):
         """
-        Handle pawn promotion logic. Automatically promote to a queen for simplicity.
+        Take back the last move played with push().
+        :return: The move that was taken back.
         """
-        from logic.pieces.queen import Queen
-        self.board[end[0]][end[1]] = Queen(pawn.color, end)  # Replace the pawn with a queen
-        print(f"{pawn.color.capitalize()} promoted a pawn to a queen at {end}.")
+        record = self.move_stack.pop()
+        start, end = record.move[0], record.move[1]
+        grid = self.board
+        piece = record.piece
+
+        moved = grid[end[0]][end[1]]
+        if moved is not piece:
+            # Undo a promotion
+            own_pieces = self.pieces[piece.color]
+            own_pieces[own_pieces.index(moved)] = piece
+        elif isinstance(piece, King):
+            self.king_positions[piece.color] = start
+
+        squares = self.squares
+        grid[start[0]][start[1]] = piece
+        grid[end[0]][end[1]] = None
+        piece.position = start
+        piece.has_moved = record.had_moved
+        squares[(7 - start[0]) * 8 + start[1]] = piece.channel + 1
+        squares[(7 - end[0]) * 8 + end[1]] = 0
+
+        captured = record.captured
+        if captured:
+            captured_row, captured_col = record.captured_square
+            grid[captured_row][captured_col] = captured
+            squares[(7 - captured_row) * 8 + captured_col] = captured.channel + 1
+            self.pieces[captured.color].append(captured)
+
+        rook = record.rook
+        if rook:
+            rook_start_col = 0 if end[1] < start[1] else 7
+            home = (7 - start[0]) * 8
+            grid[start[0]][rook.position[1]] = None
+            squares[home + rook.position[1]] = 0
+            grid[start[0]][rook_start_col] = rook
+            squares[home + rook_start_col] = rook.channel + 1
+            rook.position = (start[0], rook_start_col)
+            rook.has_moved = record.rook_had_moved
+
+        count = self.position_counts[self.zobrist_hash] - 1
+        if count:
+            self.position_counts[self.zobrist_hash] = count
+        else:
+            del self.position_counts[self.zobrist_hash]
+
+        self.last_move = record.last_move
+        self.halfmove_clock = record.halfmove_clock
+        self.castling = record.castling
+        self.ep_square = record.ep_square
+        self.zobrist_hash = record.zobrist_hash
+        self.current_turn = "black" if self.current_turn == "white" else "white"
+        return record.move
 
     def is_in_check(self, color):
         """
@@ -194,88 +513,109 @@ class Board:
         :param color: 'white' or 'black'
         :return: True if the king is in check, False otherwise
         """
-        # Find the king's position
-        king_position = None
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece and piece.__class__.__name__ == "King" and piece.color == color:
-                    king_position = (row, col)
-                    break  # Exit the inner loop when the king is found
-            if king_position:  # Exit the outer loop if the king is found
-                break
-        else:  # Executes only if the king is not found after checking the entire board
+        king_position = self.king_positions.get(color)
+        if king_position is None:
             raise ValueError(f"No king found for color {color}")
+        return self.is_square_attacked(king_position, "black" if color == "white" else "white")
 
-        # Check if any opponent piece can attack the king's position
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece and piece.color != color and piece.is_valid_move((row, col), king_position, self):
-                    return True
+    def is_square_attacked(self, position, by_color):
+        """
+        Check whether any piece of by_color attacks a square. Looks outward from the square
+        (knight jumps, king steps, pawn diagonals and the first piece along each ray) instead of
+        asking every piece on the board.
+        :param position: Tuple (row, col)
+        :param by_color: Color of the attacking side
+        :return: True if the square is attacked, False otherwise
+        """
+        row, col = position
+        grid = self.board
+
+        for r, c in KNIGHT_TARGETS[row][col]:
+            piece = grid[r][c]
+            if piece and piece.color == by_color and isinstance(piece, Knight):
+                return True
 
+        for r, c in KING_TARGETS[row][col]:
+            piece = grid[r][c]
+            if piece and piece.color == by_color and isinstance(piece, King):
+                return True
+
+        # White pawns attack towards row 0, so a white attacker sits one row below the square
+        pawn_row = row + 1 if by_color == "white" else row - 1
+        if 0 <= pawn_row < 8:
+            for c in (col - 1, col + 1):
+                if 0 <= c < 8:
+                    piece = grid[pawn_row][c]
+                    if piece and piece.color == by_color and isinstance(piece, Pawn):
+                        return True
+
+        for rays, slider in ((ORTHOGONAL_RAYS, Rook), (DIAGONAL_RAYS, Bishop)):
+            for ray in rays[row][col]:
+                for r, c in ray:
+                    piece = grid[r][c]
+                    if piece:
+                        if piece.color == by_color and isinstance(piece, (slider, Queen)):
+                            return True
+                        break
         return False
 
+    def is_insufficient_material(self):
+        """
+        True when neither side can possibly mate: bare kings, or kings and a single knight or bishop.
+        """
+        white, black = self.pieces["white"], self.pieces["black"]
+        if len(white) + len(black) > 3:
+            return False
+        return all(isinstance(piece, (King, Knight, Bishop)) for piece in white + black)
+
+    def outcome(self, moves=None):
+        """
+        Check whether the game is over for the side to move.
+        :param moves: Legal moves of the side to move, if already generated.
+        :return: None while the game goes on, otherwise (result, reason) with result '1-0', '0-1' or
+                 '1/2-1/2' and reason 'checkmate', 'stalemate', 'fifty-move rule',
+                 'threefold repetition' or 'insufficient material'.
+        """
+        color = self.current_turn
+        if moves is None:
+            moves = self.legal_moves(color)
+        if not moves:
+            if self.is_in_check(color):
+                return ("0-1" if color == "white" else "1-0"), "checkmate"
+            return "1/2-1/2", "stalemate"
+        if self.halfmove_clock >= 100:
+            return "1/2-1/2", "fifty-move rule"
+        if self.is_repetition(3):
+            return "1/2-1/2", "threefold repetition"
+        if self.is_insufficient_material():
+            return "1/2-1/2", "insufficient material"
+        return None
+
     def is_checkmate(self, color):
         """
         Determine if the given color is in checkmate.
         :param color: 'white' or 'black'
         :return: True if the color is in checkmate, False otherwise
         """
-        if not self.is_in_check(color):
-            return False
-
-        # Check if any legal move can remove the threat
-        for start_row in range(8):
-            for start_col in range(8):
-                piece = self.board[start_row][start_col]
-                if piece and piece.color == color:
-                    for end_row in range(8):
-                        for end_col in range(8):
-                            if piece.is_valid_move((start_row, start_col), (end_row, end_col), self):
-                                # Simulate the move
-                                captured_piece = self.board[end_row][end_col]
-                                self.board[end_row][end_col] = piece
-                                self.board[start_row][start_col] = None
-
-                                if not self.is_in_check(color):  # If move resolves the check
-                                    # Undo the simulated move
-                                    self.board[start_row][start_col] = piece
-                                    self.board[end_row][end_col] = captured_piece
-                                    return False
-
-                                # Undo the simulated move
-                                self.board[start_row][start_col] = piece
-                                self.board[end_row][end_col] = captured_piece
-
-        return True
+        return self.is_in_check(color) and not self.legal_moves(color)
 
     def is_legal_move(self, start, end, color):
         piece = self.board[start[0]][start[1]]
         if not piece or piece.color != color:
-            print(f"Illegal move: No valid piece at {start} for {color}.")
+            logger.debug("Illegal move: No valid piece at %s for %s.", start, color)
             return False
 
         if not piece.is_valid_move(start, end, self):
-            print(f"Illegal move: {piece.__class__.__name__} cannot move from {start} to {end}.")
+            logger.debug("Illegal move: %s cannot move from %s to %s.", piece.__class__.__name__, start, end)
             return False
 
-        # Simulate the move
-        captured_piece = self.board[end[0]][end[1]]
-        self.board[end[0]][end[1]] = piece
-        self.board[start[0]][start[1]] = None
-        piece.position = end
-
-        # Check if the king is still in check
+        # Play the move and see whether it leaves the king attacked
+        self.push((start, end))
         king_in_check = self.is_in_check(color)
-
-        # Undo the simulated move
-        self.board[start[0]][start[1]] = piece
-        self.board[end[0]][end[1]] = captured_piece
-        piece.position = start
+        self.pop()
 
         if king_in_check:
-            print(f"Illegal move: {color.capitalize()} would still be in check after this move.")
+            logger.debug("Illegal move: %s would still be in check after this move.", color.capitalize())
         return not king_in_check
 
     def toggle_turn(self):
@@ -283,7 +623,7 @@ class Board:
         Toggle the current turn between 'white' and 'black'.
         """
         self.current_turn = "black" if self.current_turn == "white" else "white"
-        print(f"Turn toggled. It's now {self.current_turn}'s turn.")  # Debugging
+        logger.debug("Turn toggled. It's now %s's turn.", self.current_turn)
 
     def is_empty(self, position):
         """
@@ -312,25 +652,117 @@ class Board:
         :param color: Current player's color
         :return: True if the position is under attack, False otherwise
         """
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece and piece.color != color and piece.is_valid_move((row, col), position, self):
-                    return True
-        return False
+        return self.is_square_attacked(position, "black" if color == "white" else "white")
+
+    @property
+    def model(self):
+        """
+        The trained neural network model, or None if it could not be loaded. Waits if the model
+        is still loading in the background.
+        """
+        return self._model_loader.get()
 
-    def load_model(self):
+    @property
+    def model_ready(self):
         """
-        Load the trained neural network model.
+        True once the background model load has finished, so reading Board.model will not block.
         """
-        model_path = os.path.join(os.path.dirname(__file__), "../ai/chess_model.h5")
-        try:
-            model = tf.keras.models.load_model(model_path)
-            print("Model loaded successfully.")
-            return model
-        except Exception as e:
-            print(f"Error loading model: {e}")
+        return self._model_loader.ready
+
+    def use_model(self, model_path=None, model_backend="keras", preload=True):
+        """
+        Switch the model this board evaluates with. Models are shared across Boards, so switching
+        back and forth between two models does not reload them.
+        :param model_path: Model file, default ai/chess_model.h5.
+        :param model_backend: 'keras' or 'numpy', as for the constructor.
+        :param preload: Start loading the model in the background right away.
+        """
+        from ai.model_loader import DEFAULT_MODEL_PATH, get_model_loader
+        loader = get_model_loader(model_path or DEFAULT_MODEL_PATH, model_backend)
+        if loader is not self._model_loader:
+            self._model_loader = loader
+            if self.eval_cache is not None:
+                self.eval_cache.clear()  # Cached scores belong to the previous model
+        if preload:
+            loader.start()
+
+    def load_model(self, wait=True):
+        """
+        Load the trained neural network model, shared by every Board in the process.
+        :param wait: Block until loading is done. If False, loading continues in the background.
+        :return: The model (None if it failed to load), or None when not waiting.
+        """
+        self._model_loader.start()
+        return self._model_loader.get() if wait else None
+
+    def book_move(self, rng=None):
+        """
+        Look the position up in the opening book.
+        :param rng: random.Random to vary the choice by how often each move was played; without
+                    one the most played move is returned.
+        :return: A legal move for the side to move, or None when there is no book or the position
+                 is not in it.
+        """
+        if self.opening_book is None:
+            return None
+        from ai.opening_book import BOOK_PATH, get_opening_book
+        book = get_opening_book(BOOK_PATH if self.opening_book is True else self.opening_book)
+        return book.choose(self, rng) if book is not None else None
+
+    def use_tablebase(self, tablebase=True):
+        """
+        Switch the endgame tables this board probes. The directory is opened here, once, so probes
+        during a search never touch the file system for a missing directory.
+        :param tablebase: Directory of tables, True for ai/tablebases, or None to never use them.
+        """
+        if tablebase is None:
+            self.tablebase = None
+            return
+        from ai.tablebase import TABLEBASE_DIR, get_tablebase
+        self.tablebase = get_tablebase(TABLEBASE_DIR if tablebase is True else tablebase)
+
+    def tablebase_probe(self):
+        """
+        Look the position up in the endgame tablebase.
+        :return: The ai/tablebase.py value for the side to move (0 draw, positive wins, negative
+                 loses, abs(value) - 1 plies to mate), or None when the position has too many
+                 pieces, castling rights or an en passant capture, or its table is missing.
+        """
+        tablebase = self.tablebase
+        white, black = self.pieces["white"], self.pieces["black"]
+        if tablebase is None or len(white) + len(black) > tablebase.max_pieces or self.castling:
             return None
+        if self.ep_square is not None:
+            # Tables ignore en passant, so only probe when no pawn can take it
+            pawn_code, rank_offset = (1, -8) if self.current_turn == "white" else (7, 8)
+            origin = self.ep_square + rank_offset
+            file = self.ep_square & 7
+            if ((file > 0 and self.squares[origin - 1] == pawn_code) or
+                    (file < 7 and self.squares[origin + 1] == pawn_code)):
+                return None
+        pieces = [(piece.color == "white", piece.kind, square_from_position(piece.position)) for piece in white + black]
+        return tablebase.probe(pieces, self.current_turn == "white")
+
+    def tablebase_move(self):
+        """
+        Best move by the endgame tablebase: the quickest mate when winning, a drawing move when
+        drawn and the longest resistance when losing.
+        :return: A legal move, or None when the position or one of its successors cannot be probed.
+        """
+        if self.tablebase_probe() is None:
+            return None
+        from ai.tablebase import mover_value, preference
+        best_move, best_key = None, None
+        for move in self.legal_moves(self.current_turn):
+            self.push(move)
+            value = self.tablebase_probe()
+            self.pop()
+            if value is None:
+                return None
+            key = int(preference(mover_value(value)))
+            if best_key is None or key > best_key:
+                best_move, best_key = move, key
+        return best_move
 
     def fen_to_matrix(self, fen):
         """
@@ -353,45 +785,210 @@ class Board:
 
         return matrix
 
-    def make_ai_move(self):
+    def legal_moves(self, color):
         """
-        AI logic for Black using the trained neural network.
+        Generate every legal move for the given color with the configured move generator.
+        :param color: 'white' or 'black'
+        :return: List of (start, end) tuples. Promotions are (start, end, piece) with piece one of
+                 'q', 'r', 'b', 'n' when the bitboard generator is used.
         """
-        if not self.model:
-            print("AI cannot play: Model not loaded.")
-            return False
+        if self.move_generator == "bitboard":
+            return self.legal_moves_bitboard(color)
+        return self.legal_moves_pieces(color)
 
-        legal_moves = []
-        move_scores = []
+    def legal_moves_bitboard(self, color):
+        """
+        Generate legal moves through a BitboardPosition built from the current board.
+        """
+        positions = SQUARE_POSITIONS
+        return [(positions[from_square], positions[to_square]) if promotion is None else
+                (positions[from_square], positions[to_square], PIECE_SYMBOLS[promotion])
+                for from_square, to_square, promotion in BitboardPosition.from_board(self, color).legal_moves()]
 
-        # Generate all legal moves for Black
+    def legal_moves_pieces(self, color):
+        """
+        Generate legal moves by asking each piece about every destination square.
+        """
+        legal_moves = []
         for start_row in range(8):
             for start_col in range(8):
                 piece = self.board[start_row][start_col]
-                if piece and piece.color == "black":
+                if piece and piece.color == color:
                     for end_row in range(8):
                         for end_col in range(8):
                             if piece.is_valid_move((start_row, start_col), (end_row, end_col), self):
-                                if self.is_legal_move((start_row, start_col), (end_row, end_col), "black"):
-                                    legal_moves.append(((start_row, start_col), (end_row, end_col)))
+                                if self.is_legal_move((start_row, start_col), (end_row, end_col), color):
+                                    if isinstance(piece, Pawn) and end_row in (0, 7):
+                                        for promotion in self.PROMOTION_CLASSES:
+                                            legal_moves.append(((start_row, start_col), (end_row, end_col), promotion))
+                                    else:
+                                        legal_moves.append(((start_row, start_col), (end_row, end_col)))
+        return legal_moves
+
+    def perft(self, depth):
+        """
+        Count the leaf nodes of the legal move tree to the given depth, using the configured move
+        generator. Node counts can be compared against published perft results.
+        :param depth: Number of plies to search.
+        :return: Number of leaf nodes.
+        """
+        moves = self.legal_moves(self.current_turn)
+        if depth <= 1:
+            return len(moves) if depth == 1 else 1
+
+        nodes = 0
+        for move in moves:
+            self.push(move)
+            nodes += self.perft(depth - 1)
+            self.pop()
+        return nodes
+
+    def make_ai_move(self, batched=True, depth=1, time_limit=None):
+        """
+        AI logic for Black using the trained neural network: choose_ai_move, then play the move.
+        :return: The move played, or None when there was none to play.
+        """
+        move = self.choose_ai_move(batched, depth, time_limit)
+        if move is not None:
+            self.move_piece(*move)
+        return move
+
+    def choose_ai_move(self, batched=True, depth=1, time_limit=None, stop_event=None):
+        """
+        Pick the AI's move without playing it: a book move, a tablebase move, or the model's choice.
+        :param batched: Score every candidate position in a single forward pass. Set to False to
+                        fall back to one model.predict call per legal move.
+        :param depth: Plies to look ahead. 1 plays the best-scored reply directly; deeper values run
+                      the alpha-beta search in ai/search.py, which falls back to material counting
+                      when no model is loaded.
+        :param time_limit: Seconds the search may use when depth > 1, or None for no limit.
+        :param stop_event: threading.Event another thread sets to abandon the move, also while
+                           waiting for the model to load.
+        :return: The chosen move, or None when there is no legal move, no model to play with at
+                 depth 1, or stop_event was set.
+        """
+        # Book positions are answered without generating candidates or running the model
+        book_move = self.book_move()
+        if book_move is not None:
+            logger.info("AI plays book move: %s", book_move)
+            return book_move
+        # So are endgames with few enough pieces for the tablebase
+        tablebase_move = self.tablebase_move()
+        if tablebase_move is not None:
+            logger.info("AI plays tablebase move: %s", tablebase_move)
+            return tablebase_move
+
+        if stop_event is not None:
+            self.load_model(wait=False)
+            while not self.model_ready:
+                if stop_event.wait(MODEL_WAIT_INTERVAL):
+                    return None
+        if not self.model and depth == 1:
+            logger.warning("AI cannot play: Model not loaded.")
+            return None
+
+        # Generate all legal moves for Black
+        legal_moves = self.legal_moves("black")
 
         if not legal_moves:
             if self.is_in_check("black"):
-                print("Black is in checkmate! White wins!")
+                logger.info("Black is in checkmate! White wins!")
             else:
-                print("Stalemate! The game is a draw.")
-            return False
+                logger.info("Stalemate! The game is a draw.")
+            return None
+
+        if depth > 1:
+            from ai.search import Search
+            result = Search(self, max_depth=depth, time_limit=time_limit, stop_event=stop_event).run()
+            if stop_event is not None and stop_event.is_set():
+                return None
+            logger.info("AI selects move: %s with score %.3f (depth %d, %d nodes, %.2fs)",
+                        result.best_move, result.score, result.depth, result.nodes, result.elapsed)
+            return result.best_move
 
         # Evaluate all legal moves
-        for move in legal_moves:
-            start, end = move
+        if batched:
+            move_scores = self.score_moves_batched(legal_moves)
+        else:
+            move_scores = self.score_moves_sequential(legal_moves)
+        if stop_event is not None and stop_event.is_set():
+            return None
+
+        # The model scores positions for White (+1 means White wins), so Black wants the lowest score
+        best_move_idx = np.argmin(move_scores)
+        best_move = legal_moves[best_move_idx]
+        logger.info("AI selects move: %s with score %s", best_move, move_scores[best_move_idx])
+        return best_move
+
+    def candidate_matrices(self, moves):
+        """
+        Build the model input for every candidate move.
+        :param moves: List of (start, end) or (start, end, promotion) tuples.
+        :return: A float32 array of shape (len(moves), 8, 8, 12).
+        """
+        return encode_candidates(self, moves)
+
+    def to_matrix(self, out=None):
+        """
+        Encode the current position as 8x8x12 planes without going through FEN.
+        :param out: Optional preallocated (8, 8, 12) array to fill.
+        :return: The same layout as fen_to_matrix(get_fen()), as float32.
+        """
+        return encode_board(self, out)
+
+    def to_bitboards(self):
+        """
+        Pack the position as twelve bitboards in model channel order (see ai/packed_positions.py).
+        :return: List of twelve ints, bit n set for square n (a1 = 0).
+        """
+        bitboards = [0] * 12
+        for square, code in enumerate(self.squares):
+            if code:
+                bitboards[code - 1] |= 1 << square
+        return bitboards
+
+    def score_moves_batched(self, moves):
+        """
+        Score all candidate moves with a single forward pass of the model. Positions already in the
+        evaluation cache are not sent to the model again.
+        :param moves: List of (start, end) or (start, end, promotion) tuples.
+        :return: A 1D array of model scores, one per move.
+        """
+        cache = self.eval_cache
+        if cache is None:
+            return self.predict_batch(self.candidate_matrices(moves))
+
+        keys = []
+        for move in moves:
+            self.push(move)
+            keys.append(self.zobrist_hash)
+            self.pop()
+
+        scores = np.empty(len(moves), dtype=np.float32)
+        missing = []
+        for index, key in enumerate(keys):
+            score = cache.get(key)
+            if score is None:
+                missing.append(index)
+            else:
+                scores[index] = score
 
-            # Simulate the move
-            piece = self.board[start[0]][start[1]]
-            captured_piece = self.board[end[0]][end[1]]
-            self.board[end[0]][end[1]] = piece
-            self.board[start[0]][start[1]] = None
-            piece.position = end
+        if missing:
+            predicted = self.predict_batch(self.candidate_matrices([moves[index] for index in missing]))
+            for index, score in zip(missing, predicted):
+                scores[index] = score
+                cache.put(keys[index], float(score))
+        return scores
+
+    def score_moves_sequential(self, moves):
+        """
+        Score candidate moves one model.predict call at a time (the original evaluation path).
+        :param moves: List of (start, end) or (start, end, promotion) tuples.
+        :return: A list of model scores, one per move.
+        """
+        move_scores = []
+        for move in moves:
+            self.push(move)
 
             # Convert the board to FEN and predict the score
             fen = self.get_fen()  # Method to get the current board's FEN string
@@ -399,20 +996,17 @@ class Board:
             score = self.model.predict(board_matrix[np.newaxis, ...])[0][0]  # Predict score
             move_scores.append(score)
 
-            # Undo the move
-            self.board[start[0]][start[1]] = piece
-            self.board[end[0]][end[1]] = captured_piece
-            piece.position = start
+            self.pop()
 
-        # Select the move with the highest score
-        best_move_idx = np.argmax(move_scores)
-        best_move = legal_moves[best_move_idx]
-        print(f"AI selects move: {best_move} with score {move_scores[best_move_idx]}")
+        return move_scores
 
-        # Perform the best move
-        start, end = best_move
-        self.move_piece(start, end)
-        return True
+    def predict_batch(self, batch):
+        """
+        Run the model on a batch of board matrices through a compiled inference function.
+        :param batch: Array of shape (N, 8, 8, 12).
+        :return: A 1D array of N scores.
+        """
+        return self._model_loader.predict(batch)
 
     def get_fen(self):
         """
@@ -428,7 +1022,7 @@ class Board:
             for col in range(8):
                 piece = self.board[row][col]
                 if piece:
-                    symbol = piece.__class__.__name__[0].lower()  # Get piece symbol
+                    symbol = self.PIECE_SYMBOLS[piece.__class__.__name__]  # Get piece symbol
                     if piece.color == 'white':
                         symbol = symbol.upper()  # White pieces are uppercase
                     square = chess.square(col, 7 - row)  # Translate to 0-indexed square
@@ -440,8 +1034,9 @@ class Board:
         # Handle castling rights
         castling_rights = ""
         for row, rook_col in [(7, 0), (7, 7), (0, 0), (0, 7)]:
+            king = self.board[row][4]
             rook = self.board[row][rook_col]
-            if isinstance(rook, Rook) and not rook.has_moved:
+            if isinstance(king, King) and not king.has_moved and isinstance(rook, Rook) and not rook.has_moved:
                 if rook.color == 'white' and row == 7:
                     castling_rights += "Q" if rook_col == 0 else "K"
                 elif rook.color == 'black' and row == 0:
@@ -453,7 +1048,8 @@ class Board:
             start, end = self.last_move
             if isinstance(self.board[end[0]][end[1]], Pawn):
                 if abs(start[0] - end[0]) == 2:  # Pawn moved two spaces
-                    board.ep_square = chess.square(end[1], 7 - end[0])
+                    board.ep_square = chess.square(end[1], 7 - (start[0] + end[0]) // 2)
 
+        board.halfmove_clock = self.halfmove_clock
         return board.fen()
 
@@ -0,0 +1,85 @@
+import numpy as np
+
+from logic.pieces.pawn import Pawn
+from logic.pieces.rook import Rook
+from logic.pieces.knight import Knight
+from logic.pieces.bishop import Bishop
+from logic.pieces.queen import Queen
+from logic.pieces.king import King
+
+# Channel layout used by fen_to_matrix: white P, N, B, R, Q, K then black p, n, b, r, q, k
+PIECE_TO_CHANNEL = {Pawn: 0, Knight: 1, Bishop: 2, Rook: 3, Queen: 4, King: 5}
+BLACK_CHANNEL_OFFSET = 6
+# Channel distance from a pawn to the piece it promotes to
+PROMOTION_CHANNELS = {"q": 4, "r": 3, "b": 2, "n": 1}
+
+
+def piece_channel(piece):
+    """
+    Return the plane index of a piece in the 8x8x12 model input.
+    """
+    return piece.channel
+
+
+def encode_board(board, out=None):
+    """
+    Write the 8x8x12 planes for a Board directly from its square codes.
+
+    The layout matches Board.fen_to_matrix: matrix row 0 is rank 1 (board row 7), so a piece on
+    board square (row, col) lands at out[7 - row, col, channel]. Board.squares is indexed the
+    same way (a1 = 0) and holds channel + 1, so the planes are set with one scatter.
+    :param board: Board object.
+    :param out: Optional preallocated (8, 8, 12) array to fill. A float32 array is allocated if omitted.
+    :return: The filled array.
+    """
+    if out is None:
+        out = np.zeros((8, 8, 12), dtype=np.float32)
+    else:
+        out[...] = 0
+
+    codes = np.frombuffer(board.squares, dtype=np.uint8)
+    occupied = np.flatnonzero(codes)
+    out[occupied >> 3, occupied & 7, codes[occupied] - 1] = 1
+    return out
+
+
+def encode_candidates(board, moves, out=None):
+    """
+    Encode the position after each candidate move into one batch.
+
+    The current position is encoded once and each row of the batch only patches the squares a
+    move touches, with castling, en passant and promotion handled the same way as Board.push.
+    :param board: Board object.
+    :param moves: List of (start, end) or (start, end, promotion) tuples.
+    :param out: Optional preallocated (len(moves), 8, 8, 12) array to fill.
+    :return: The filled batch.
+    """
+    if out is None:
+        out = np.empty((len(moves), 8, 8, 12), dtype=np.float32)
+
+    out[:] = encode_board(board)
+    grid = board.board
+    for i, move in enumerate(moves):
+        start, end = move[0], move[1]
+        planes = out[i]
+        piece = grid[start[0]][start[1]]
+        captured_piece = grid[end[0]][end[1]]
+        channel = piece_channel(piece)
+
+        planes[7 - start[0], start[1], channel] = 0
+        if captured_piece:
+            planes[7 - end[0], end[1], piece_channel(captured_piece)] = 0
+
+        if isinstance(piece, King) and abs(end[1] - start[1]) == 2:
+            rook_channel = channel - PIECE_TO_CHANNEL[King] + PIECE_TO_CHANNEL[Rook]
+            planes[7 - start[0], 0 if end[1] < start[1] else 7, rook_channel] = 0
+            planes[7 - start[0], (start[1] + end[1]) // 2, rook_channel] = 1
+        elif isinstance(piece, Pawn):
+            if start[1] != end[1] and captured_piece is None:
+                # En passant: the captured pawn sits beside the start square
+                planes[7 - start[0], end[1], piece_channel(grid[start[0]][end[1]])] = 0
+            if end[0] == 0 or end[0] == 7:
+                channel += PROMOTION_CHANNELS[move[2] if len(move) > 2 else "q"]
+
+        planes[7 - end[0], end[1], channel] = 1
+    return out
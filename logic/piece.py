@@ -1,4 +1,8 @@
 class Piece:
+    # Pieces are created for every square of every position set up, so they carry no __dict__
+    __slots__ = ("color", "position", "has_moved", "channel")
+    kind = None  # Index in the model's piece order (pawn, knight, bishop, rook, queen, king), set by subclasses
+
     def __init__(self, color, position):
         """
         Base class for all chess pieces.
@@ -8,6 +12,8 @@ class Piece:
         self.color = color
         self.position = position
         self.has_moved = False # track if a piece has moved (for castling)
+        # Plane of the piece in the 8x8x12 model input, also its code in Board.squares minus one
+        self.channel = self.kind if color == "white" else self.kind + 6
 
     def is_valid_move(self, start, end, board):
         """
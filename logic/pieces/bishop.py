@@ -1,6 +1,9 @@
 from logic.piece import Piece
 
 class Bishop(Piece):
+    __slots__ = ()
+    kind = 2
+
     def is_valid_move(self, start, end, board):
         """
         Validate bishop-specific movement (diagonal).
@@ -1,6 +1,10 @@
 from logic.piece import Piece
+from logic.pieces.rook import Rook
 
 class King(Piece):
+    __slots__ = ()
+    kind = 5
+
     def is_valid_move(self, start, end, board):
         """
         Validate king-specific movement, including castling.
@@ -19,12 +23,12 @@ class King(Piece):
             rook = board.board[start_row][rook_col]
 
             # Ensure the rook is valid and hasn’t moved
-            if not rook or rook.has_moved or rook.__class__.__name__ != "Rook" or rook.color != self.color:
+            if not rook or rook.has_moved or rook.kind != Rook.kind or rook.color != self.color:
                 return False
 
             # Ensure all squares between king and rook are empty
             step = 1 if end_col > start_col else -1
-            for col in range(start_col + step, end_col + step, step):
+            for col in range(start_col + step, rook_col, step):
                 if not board.is_empty((start_row, col)):
                     return False
 
@@ -1,6 +1,9 @@
 from logic.piece import Piece
 
 class Knight(Piece):
+    __slots__ = ()
+    kind = 1
+
     def is_valid_move(self, start, end, board):
         """
         Validate knight-specific movement (L-shaped moves).
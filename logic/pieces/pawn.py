@@ -1,6 +1,9 @@
 from logic.piece import Piece
 
 class Pawn(Piece):
+    __slots__ = ()
+    kind = 0
+
     def is_valid_move(self, start, end, board):
         start_row, start_col = start
         end_row, end_col = end
@@ -27,7 +30,7 @@ class Pawn(Piece):
                 captured_piece = board.board[last_end[0]][last_end[1]]
                 if (
                         captured_piece and
-                        captured_piece.__class__.__name__ == "Pawn" and
+                        captured_piece.kind == Pawn.kind and
                         abs(last_end[0] - last_start[0]) == 2 and
                         last_end == (start_row, end_col)
                 ):
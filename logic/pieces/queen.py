@@ -1,6 +1,9 @@
 from logic.piece import Piece
 
 class Queen(Piece):
+    __slots__ = ()
+    kind = 4
+
     def is_valid_move(self, start, end, board):
         """
         Validate queen-specific movement (combines rook and bishop movement).
@@ -2,6 +2,9 @@ from logic.piece import Piece
 
 
 class Rook(Piece):
+    __slots__ = ()
+    kind = 3
+
     def is_valid_move(self, start, end, board):
         """
         Validate rook-specific movement (horizontal or vertical).
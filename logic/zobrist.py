@@ -0,0 +1,35 @@
+"""
+Zobrist keys for incremental position hashing.
+
+Squares and piece channels follow logic.bitboard: square = rank * 8 + file (a1 = 0) and channel
+0-5 for white P, N, B, R, Q, K, 6-11 for black. Castling rights use the bitboard right bits.
+"""
+import random
+
+_rng = random.Random(0x5EED_C4E55)
+
+PIECE_KEYS = [[_rng.getrandbits(64) for _ in range(64)] for _ in range(12)]
+BLACK_TO_MOVE_KEY = _rng.getrandbits(64)
+CASTLING_KEYS = [_rng.getrandbits(64) for _ in range(16)]
+EN_PASSANT_KEYS = [_rng.getrandbits(64) for _ in range(8)]
+CASTLING_KEYS[0] = 0  # No rights contributes nothing, so positions without castling hash the same
+
+
+def compute_hash(pieces, white_to_move, castling, ep_file=None):
+    """
+    Hash a position from scratch.
+    :param pieces: Iterable of (channel, square) pairs.
+    :param white_to_move: True if White is to move.
+    :param castling: Castling right bitmask.
+    :param ep_file: File (0-7) of the en passant square, or None.
+    :return: 64-bit hash.
+    """
+    key = 0
+    for channel, square in pieces:
+        key ^= PIECE_KEYS[channel][square]
+    if not white_to_move:
+        key ^= BLACK_TO_MOVE_KEY
+    key ^= CASTLING_KEYS[castling]
+    if ep_file is not None:
+        key ^= EN_PASSANT_KEYS[ep_file]
+    return key
@@ -1,7 +1,11 @@
+import logging
 import tkinter as tk
 from gui.chess_gui import ChessGUI
 
 if __name__ == "__main__":
+    # Show the board's game messages (moves, check, AI choices) on the console as before
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # Initialize the Tkinter root and ChessGUI
     root = tk.Tk()
     gui = ChessGUI(root)
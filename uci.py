@@ -0,0 +1,293 @@
+"""
+UCI (Universal Chess Interface) front-end for the engine.
+
+Reads commands on stdin and answers on stdout, so GUIs, match tools and load tests can drive the
+engine as a process. Searches run on a background thread and stop as soon as 'stop' arrives.
+Everything the engine itself prints goes to stderr to keep stdout to protocol lines only.
+
+Run from the project root:
+    python uci.py
+"""
+import math
+import sys
+import threading
+
+from ai.search import MATE_SCORE, MATE_THRESHOLD, Search, tablebase_score
+from ai.transposition import TranspositionTable
+from logic.bitboard import STARTING_FEN, parse_square, position_from_square, square_from_position, square_name
+from logic.board import Board
+
+ENGINE_NAME = "ML-Chess"
+ENGINE_AUTHOR = "ML-Chess contributors"
+MAX_DEPTH = 64  # Depth used by 'go infinite' and time-controlled searches
+DEFAULT_HASH_MB = 16
+MOVES_TO_GO = 30  # Moves the remaining clock time is spread over when the GUI does not say
+MOVE_OVERHEAD = 0.05  # Seconds kept back per move for communication delays
+# 'go' parameters followed by a number, and those without a value. 'ponder' is accepted but the
+# engine does not ponder, so the search runs as usual.
+GO_NUMBERS = ("depth", "movetime", "nodes", "wtime", "btime", "winc", "binc", "movestogo")
+GO_FLAGS = ("infinite", "ponder")
+# Seconds 'stop' waits for the search thread. A search still busy after that (e.g. inside one long
+# model call) is abandoned: it searches a copy of the board, and its best move so far is sent at once.
+STOP_TIMEOUT = 2.0
+
+
+def format_move(move):
+    """
+    Board move ((row, col), (row, col)[, promotion]) to UCI text such as 'e2e4' or 'e7e8q'.
+    """
+    text = square_name(square_from_position(move[0])) + square_name(square_from_position(move[1]))
+    return text + move[2] if len(move) > 2 else text
+
+
+def parse_move(text):
+    """
+    UCI move text to a Board move tuple.
+    """
+    start = position_from_square(parse_square(text[0:2]))
+    end = position_from_square(parse_square(text[2:4]))
+    return (start, end, text[4]) if len(text) > 4 else (start, end)
+
+
+def format_score(score):
+    """
+    Search score ([-1, 1] from the side to move, or a mate score) as a UCI 'score' field.
+    Evaluations are tanh-squashed, so they are mapped back to centipawns with atanh, the inverse
+    of the material evaluator's tanh(pawns / 10).
+    """
+    if score >= MATE_THRESHOLD:
+        return f"mate {(int(round(MATE_SCORE - score)) + 1) // 2}"
+    if score <= -MATE_THRESHOLD:
+        return f"mate -{(int(round(MATE_SCORE + score)) + 1) // 2}"
+    clamped = max(-0.9999, min(0.9999, score))
+    return f"cp {int(round(1000 * math.atanh(clamped)))}"
+
+
+class _SearchJob:
+    """
+    One 'go': the search, its thread and the best move found so far. bestmove is sent once per job,
+    by whichever of the search thread and stop_search gets there first.
+    """
+
+    def __init__(self, search, stop_event, fallback_move):
+        self.search = search
+        self.stop_event = stop_event
+        self.best_move = fallback_move
+        self.thread = None
+        self.answered = False
+
+
+class UCIEngine:
+    def __init__(self, output=sys.stdout):
+        """
+        :param output: Stream protocol responses are written to.
+        """
+        self.output = output
+        self._output_lock = threading.Lock()
+        self.model_path = None
+        self.model_backend = "numpy"
+        self.board = Board(model_backend=self.model_backend)
+        self.tt = TranspositionTable(DEFAULT_HASH_MB)
+        self.job = None
+
+    def send(self, line):
+        with self._output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def run(self, input_stream=sys.stdin):
+        """
+        Handle commands until 'quit' or end of input.
+        """
+        for line in input_stream:
+            if not self.handle(line.strip()):
+                break
+        self.stop_search()
+
+    def handle(self, line):
+        """
+        Execute one command line.
+        :return: False when the engine should exit.
+        """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send(f"option name Hash type spin default {DEFAULT_HASH_MB} min 1 max 4096")
+            self.send("option name ModelPath type string default <empty>")
+            self.send("option name ModelBackend type combo default numpy var numpy var keras")
+            self.send("option name OwnBook type check default true")
+            self.send("option name Tablebases type check default true")
+            self.send("uciok")
+        elif command == "isready":
+            self.board.load_model()  # Waits for the background model load, if any
+            self.send("readyok")
+        elif command == "setoption":
+            self.set_option(args)
+        elif command == "ucinewgame":
+            self.stop_search()
+            self.tt.clear()
+        elif command == "position":
+            self.stop_search()
+            self.set_position(args)
+        elif command == "go":
+            self.stop_search()
+            self.go(args)
+        elif command == "stop":
+            self.stop_search()
+        elif command == "quit":
+            return False
+        elif command == "d":
+            self.send(self.board.get_fen())
+        else:
+            print(f"Unknown command: {line}", file=sys.stderr)
+        return True
+
+    def set_option(self, args):
+        text = " ".join(args)
+        name, _, value = text.partition(" value ")
+        name = name.replace("name ", "", 1).strip().lower()
+        value = value.strip()
+        if name == "hash":
+            self.tt = TranspositionTable(int(value))
+        elif name == "modelpath":
+            self.model_path = None if value in ("", "<empty>") else value
+            self.board.use_model(self.model_path, self.model_backend)
+        elif name == "modelbackend":
+            self.model_backend = value
+            self.board.use_model(self.model_path, self.model_backend)
+        elif name == "ownbook":
+            self.board.opening_book = True if value.lower() == "true" else None
+        elif name == "tablebases":
+            self.board.use_tablebase(True if value.lower() == "true" else None)
+        else:
+            print(f"Unknown option: {name}", file=sys.stderr)
+
+    def set_position(self, args):
+        """
+        'position startpos [moves ...]' or 'position fen <fen> [moves ...]'.
+        """
+        if "moves" in args:
+            split = args.index("moves")
+            setup, moves = args[:split], args[split + 1:]
+        else:
+            setup, moves = args, []
+        if setup and setup[0] == "fen":
+            self.board.set_fen(" ".join(setup[1:]))
+        else:
+            self.board.set_fen(STARTING_FEN)
+        for text in moves:
+            move = parse_move(text)
+            legal = self.board.legal_moves(self.board.current_turn)
+            if move not in legal:
+                print(f"Illegal move in position command: {text}", file=sys.stderr)
+                return
+            self.board.push(move)
+
+    def go(self, args):
+        """
+        Start a search. Understands depth, movetime, nodes, infinite and wtime/btime/winc/binc/movestogo;
+        other parameters are skipped.
+        """
+        options = {}
+        index = 0
+        while index < len(args):
+            token = args[index]
+            index += 1
+            if token in GO_FLAGS:
+                options[token] = True
+            elif token in GO_NUMBERS:
+                if index < len(args) and args[index].lstrip("-").isdigit():
+                    options[token] = int(args[index])
+                    index += 1
+            elif token == "searchmoves":
+                # Not supported: skip the move list up to the next keyword
+                while index < len(args) and args[index] not in GO_NUMBERS + GO_FLAGS:
+                    index += 1
+            # Anything else is ignored
+
+        if not options.get("infinite"):
+            book_move = self.board.book_move()
+            if book_move is not None:
+                self.send(f"bestmove {format_move(book_move)}")
+                return
+            tablebase_move = self.board.tablebase_move()
+            if tablebase_move is not None:
+                score = format_score(tablebase_score(self.board.tablebase_probe()))
+                self.send(f"info depth 0 score {score} pv {format_move(tablebase_move)}")
+                self.send(f"bestmove {format_move(tablebase_move)}")
+                return
+
+        depth = options.get("depth", MAX_DEPTH)
+        time_limit = None
+        if "movetime" in options:
+            time_limit = options["movetime"] / 1000
+        elif not options.get("infinite"):
+            side = "w" if self.board.current_turn == "white" else "b"
+            if f"{side}time" in options:
+                remaining = options[f"{side}time"] / 1000
+                increment = options.get(f"{side}inc", 0) / 1000
+                moves_to_go = options.get("movestogo", MOVES_TO_GO)
+                time_limit = min(remaining / moves_to_go + increment * 0.8, remaining / 2) - MOVE_OVERHEAD
+                time_limit = max(time_limit, 0.01)
+
+        # The stop event exists before the thread starts, so a 'stop' at any point after 'go' is kept
+        stop_event = threading.Event()
+        legal = self.board.legal_moves(self.board.current_turn)
+        search = Search(self.board.copy(), max_depth=depth, time_limit=time_limit, node_limit=options.get("nodes"),
+                        transposition_table=self.tt, on_iteration=lambda result: self.report(job, result),
+                        stop_event=stop_event)
+        job = self.job = _SearchJob(search, stop_event, legal[0] if legal else None)
+        job.thread = threading.Thread(target=self._search, args=(job, options.get("infinite", False)), daemon=True)
+        job.thread.start()
+
+    def _search(self, job, infinite):
+        result = job.search.run()
+        if infinite:
+            job.stop_event.wait()  # UCI: an infinite search only reports its move after 'stop'
+        if result.best_move is not None:
+            job.best_move = result.best_move
+        self.send_bestmove(job)
+
+    def send_bestmove(self, job):
+        with self._output_lock:
+            if job.answered:
+                return
+            job.answered = True
+        self.send(f"bestmove {format_move(job.best_move) if job.best_move else '0000'}")
+
+    def report(self, job, result):
+        if job.answered:
+            return  # Abandoned by stop_search, which already sent bestmove
+        job.best_move = result.best_move
+        milliseconds = max(int(result.elapsed * 1000), 1)
+        self.send(f"info depth {result.depth} score {format_score(result.score)} nodes {result.nodes} "
+                  f"nps {result.nodes * 1000 // milliseconds} time {milliseconds} pv {format_move(result.best_move)}")
+
+    def stop_search(self):
+        """
+        Stop a running search and wait up to STOP_TIMEOUT for it to print its best move.
+        """
+        job = self.job
+        if job is None:
+            return
+        job.stop_event.set()
+        job.thread.join(STOP_TIMEOUT)
+        if job.thread.is_alive():
+            print("Search did not stop in time; sending its best move so far", file=sys.stderr)
+            self.send_bestmove(job)
+        self.job = None
+
+
+def main():
+    # Keep stdout for protocol responses; model loading and board messages go to stderr
+    protocol_output = sys.stdout
+    sys.stdout = sys.stderr
+    UCIEngine(protocol_output).run()
+
+
+if __name__ == "__main__":
+    main()